@@ -1,6 +1,17 @@
+import asyncio
 import datetime
 from abc import ABC, abstractmethod
-from typing import Optional, TypedDict
+from typing import (
+    AsyncGenerator,
+    Generator,
+    Iterable,
+    Optional,
+    TypedDict,
+    cast,
+)
+
+from .ResultCache import CacheKey, ResultCache
+from .utils import date_range
 
 
 class Result(TypedDict):
@@ -13,17 +24,31 @@ class AvailabilityFetcher(ABC):
     Protocol for classes that fetch availability for a given date range.
     """
 
-    @abstractmethod
+    _booking_id: str | int
+
     def get_availability(
         self,
         start: datetime.date,
         end: datetime.date,
-        cache: Optional[dict[datetime.date, Result]] = None,
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
+    ) -> dict[datetime.date, Result]:
+        """
+        Synchronous wrapper around `aget_availability`. Must not be called
+        from a running event loop; await `aget_availability` there instead.
+        """
+        return asyncio.run(self.aget_availability(start, end, cache))
+
+    async def aget_availability(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
     ) -> dict[datetime.date, Result]:
         """
         Gets the availability for each day in the date range and returns a
         dictionary with dates as keys and a `Result` dictionary with the number
-        of beds available and detailed room availability.
+        of beds available and detailed room availability. Requests for
+        different dates may overlap, up to the rate limits of the site.
 
         Parameters
         ----------
@@ -31,9 +56,148 @@ class AvailabilityFetcher(ABC):
             The start date of the date range.
         end_date: datetime.date
             The end date of the date range (inclusive).
-        cache: Optional[dict]
-            A dictionary that contains the availability data for each day from
-            previous fetches. This can be useful to avoid fetching the same
-            data multiple times.
+        cache: Optional[ResultCache | dict]
+            Availability data for each day from previous fetches. Dates with a
+            fresh entry are not fetched again. A `ResultCache` is shared by
+            all fetchers and is updated with the newly fetched results. A
+            plain dictionary maps dates to results of this fetcher only, and
+            is not modified.
+
+        Dates whose requests failed are missing, as their availability is
+        unknown.
+        """
+        results = {
+            date: result
+            async for date, result in self.aiter_availability(
+                start, end, cache
+            )
+        }
+        return {
+            date: results[date]
+            for date in date_range(start, end)
+            if date in results
+        }
+
+    def iter_availability(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
+    ) -> Generator[tuple[datetime.date, Result], None, None]:
+        """
+        Synchronous wrapper around `aiter_availability`. Requests only make
+        progress while the consumer waits for the next result. Must not be
+        called from a running event loop.
+        """
+        with asyncio.Runner() as runner:
+            results = self.aiter_availability(start, end, cache)
+            try:
+                while True:
+                    try:
+                        yield runner.run(results.__anext__())
+                    except StopAsyncIteration:
+                        return
+            finally:
+                runner.run(results.aclose())
+
+    @abstractmethod
+    def aiter_availability(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
+    ) -> AsyncGenerator[tuple[datetime.date, Result], None]:
+        """
+        Yields a ``(date, result)`` pair for each day in the date range as
+        soon as it is resolved, so dates are not necessarily in order. Cached
+        dates come first, and dates whose requests failed are skipped. Newly
+        fetched results are added to a `ResultCache` as they are yielded. See
+        `aget_availability` for the parameters.
         """
         raise NotImplementedError
+
+    async def aget_available_dates(
+        self, dates: list[datetime.date], refresh: bool = False
+    ) -> dict[datetime.date, bool]:
+        """
+        Returns whether the site's calendar endpoints report any availability
+        on each of the given sorted dates, without fetching the room details.
+        Dates whose calendar requests failed are missing, so that an unknown
+        date is not mistaken for a sold-out one. The calendar answers are
+        shared with `aiter_availability` through the range planner, so a date
+        that was just checked is not requested again when its details are
+        fetched.
+
+        Fetchers without calendar endpoints can keep the default, which
+        fetches the full availability of the dates with `aget_availability`
+        and reports the dates with available beds. It always requests the
+        dates, as no results are cached between calls.
+
+        Parameters
+        ----------
+        dates
+            The sorted dates to check.
+        refresh
+            Whether to request the calendar even for dates that are known,
+            e.g., to poll for changes.
+        """
+        if not dates:
+            return {}
+
+        # The dates in between that were not asked for are skipped as if
+        # they were cached.
+        skip = {
+            date: Result({"num_available": 0, "rooms": {}})
+            for date in date_range(dates[0], dates[-1])
+        }
+        for date in dates:
+            skip.pop(date, None)
+
+        results = await self.aget_availability(dates[0], dates[-1], skip)
+        return {
+            date: results[date]["num_available"] > 0
+            for date in dates
+            if date in results and date not in skip
+        }
+
+    def _cache_key(
+        self, date: datetime.date, guest_count: Optional[int] = None
+    ) -> CacheKey:
+        return (type(self).__name__, str(self._booking_id), date, guest_count)
+
+    def _from_cache(
+        self,
+        dates: Iterable[datetime.date],
+        cache: Optional[ResultCache | dict[datetime.date, Result]],
+        guest_count: Optional[int] = None,
+    ) -> dict[datetime.date, Result]:
+        """
+        Returns the cached results for the given dates that are still fresh.
+        """
+        if cache is None:
+            return {}
+
+        if isinstance(cache, ResultCache):
+            hits = {}
+            for date in dates:
+                key = self._cache_key(date, guest_count)
+                # Keys of a fetcher type only ever store its results.
+                if (result := cache.get(key)) is not None:
+                    hits[date] = cast("Result", result)
+
+            return hits
+
+        return {date: cache[date] for date in dates if date in cache}
+
+    def _to_cache(
+        self,
+        results: dict[datetime.date, Result],
+        cache: Optional[ResultCache | dict[datetime.date, Result]],
+        guest_count: Optional[int] = None,
+    ):
+        """
+        Stores newly fetched results if the cache is a `ResultCache`.
+        """
+        if isinstance(cache, ResultCache):
+            for date, result in results.items():
+                cache.set(self._cache_key(date, guest_count), result)
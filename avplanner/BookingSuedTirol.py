@@ -1,13 +1,18 @@
+import asyncio
 import datetime
 from collections import defaultdict
 from datetime import timedelta
-from typing import Optional
+from typing import AsyncGenerator, ClassVar, Optional, Sequence
 
 import requests
 
+from . import transport
 from .AvailabilityFetcher import AvailabilityFetcher, Result
-from .RateLimiter import RateLimiter
-from .utils import date_range
+from .Metrics import get_metrics
+from .RangePlanner import get_range_planner, window_values
+from .RateLimiter import get_rate_limiter, rate_limited
+from .ResultCache import ResultCache
+from .utils import date_range, iter_completed
 
 # Get room types
 BASE_URL = (
@@ -18,48 +23,149 @@ QUERY = "?from={start:%Y-%m-%d}&to={end:%Y-%m-%d}&guestCount={guest_count}&guest
 AVAILABILITIES_URL = BASE_URL + "availabilities" + QUERY
 DETAILS_URL = BASE_URL + "offers" + QUERY
 
+GUEST_COUNTS = range(1, 5)
+
+# The global availability API accepts at most 61 days (60 days after the
+# start date).
+GLOBAL_SPAN = 61
+
 
 def _format_guests(num_guests: int) -> str:
     return str([[18] * num_guests])
 
 
+def _covering_guest_counts(
+    candidates: list[int], occupancy: list[tuple[int, int]]
+) -> list[int]:
+    """
+    Returns a minimal subset of the candidate guest counts such that every
+    (min, max) occupancy range that contains a candidate also contains a
+    selected guest count. This is the classic greedy for stabbing intervals:
+    visit the ranges by increasing maximum, and stab each range that is not
+    yet stabbed with the largest candidate it contains.
+    """
+    selected: list[int] = []
+
+    for low, high in sorted(occupancy, key=lambda bounds: bounds[1]):
+        if any(low <= count <= high for count in selected):
+            continue
+
+        if inside := [count for count in candidates if low <= count <= high]:
+            selected.append(max(inside))
+
+    return sorted(selected)
+
+
+def _implies(
+    smaller: int, larger: int, occupancy: list[tuple[int, int]]
+) -> bool:
+    """
+    Returns whether every occupancy range that contains the larger guest
+    count also contains the smaller one. Then dates without availability for
+    the smaller guest count have no availability for the larger one either.
+    """
+    return all(
+        low <= smaller for low, high in occupancy if low <= larger <= high
+    )
+
+
+def _any_available(
+    dates: list[datetime.date], totals: dict[int, dict[datetime.date, bool]]
+) -> dict[datetime.date, bool]:
+    """
+    Returns whether each date has availability for any guest count. A date
+    is unknown, and missing, if no guest count has availability and one of
+    them is unknown.
+    """
+    known = {}
+    for date in dates:
+        values = [found.get(date) for found in totals.values()]
+        if any(values):
+            known[date] = True
+        elif None not in values:
+            known[date] = False
+
+    return known
+
+
 class APIClient:
     """
     MonTMB API client to get availability for a given date.
+
+    Parameters
+    ----------
+    booking_id
+        The property ID.
+    rate_limits
+        Optional overrides of ``RATE_LIMITS``, mapping endpoint names to
+        ``(max_calls, period)`` tuples. Limits apply per property, so clients
+        for different properties do not throttle each other.
     """
 
-    def __init__(self, booking_id: str | int):
+    # Endpoint name -> (max_calls, period in seconds).
+    RATE_LIMITS: ClassVar[dict[str, tuple[int, float]]] = {
+        "details": (1, 5),
+        "global": (1, 10),
+    }
+
+    def __init__(
+        self,
+        booking_id: str | int,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+    ):
         self._booking_id = booking_id
 
-    def get_room_types(self) -> dict[int, int]:
+        limits = self.RATE_LIMITS | (rate_limits or {})
+        self._rate_limiters = {
+            name: get_rate_limiter(
+                ("bookingsuedtirol", str(booking_id), name), *limit
+            )
+            for name, limit in limits.items()
+        }
+
+    def get_room_occupancy(self) -> dict[int, tuple[int, int]]:
         """
-        Get the room types and their room size (maximum occupancy).
+        Get the room types and their minimum and maximum occupancy.
 
         Returns
         -------
-        dict[int, int]
-            A dictionary mapping room type IDs to their room size.
+        dict[int, tuple[int, int]]
+            A dictionary mapping room type IDs to their (minimum, maximum)
+            number of guests.
         """
         url = ROOMS_URL.format(booking_id=self._booking_id)
 
         try:
-            response = requests.get(url)
+            response = transport.request(
+                "GET", url, endpoint="bookingsuedtirol.rooms"
+            )
             response.raise_for_status()
-            data = response.json()
+            with get_metrics().parsing("bookingsuedtirol.rooms"):
+                data = response.json()
 
-            # TODO should probably also check min because people can get those
-            # rooms with less people than capacity.
-            return {room["room_id"]: room["occupancy"]["max"] for room in data}
+            return {
+                room["room_id"]: (
+                    room["occupancy"].get("min", 1),
+                    room["occupancy"]["max"],
+                )
+                for room in data
+            }
 
         except requests.RequestException as e:
             print(f"Request error: {e}")
 
         return {}
 
-    @RateLimiter(max_calls=1, period=5)
+    async def aget_room_occupancy(self) -> dict[int, tuple[int, int]]:
+        """
+        Async version of `get_room_occupancy`.
+        """
+        return await asyncio.to_thread(self.get_room_occupancy)
+
+    @rate_limited("details", "bookingsuedtirol.offers")
     def get_detailed_availability(
         self, date: datetime.date, guest_count: int
-    ) -> dict[datetime.date, dict[int, int]]:
+    ) -> dict[int, int]:
         """
         Get the detailed day availability for a specific date and guest count.
 
@@ -73,9 +179,26 @@ class APIClient:
 
         Returns
         -------
-        dict[datetime.date, dict[int, int]]
+        dict[int, int]
             A dictionary mapping room IDs to the number of available rooms.
         """
+        return self._get_detailed_availability(date, guest_count)
+
+    @rate_limited("details", "bookingsuedtirol.offers")
+    async def aget_detailed_availability(
+        self, date: datetime.date, guest_count: int
+    ) -> dict[int, int]:
+        """
+        Async version of `get_detailed_availability`. The request itself runs
+        in a worker thread, so requests for different dates can overlap.
+        """
+        return await asyncio.to_thread(
+            self._get_detailed_availability, date, guest_count
+        )
+
+    def _get_detailed_availability(
+        self, date: datetime.date, guest_count: int
+    ) -> dict[int, int]:
         url = DETAILS_URL.format(
             booking_id=self._booking_id,
             start=date,
@@ -85,9 +208,12 @@ class APIClient:
         )
 
         try:
-            response = requests.get(url)
+            response = transport.request(
+                "GET", url, endpoint="bookingsuedtirol.offers"
+            )
             response.raise_for_status()
-            data = response.json()
+            with get_metrics().parsing("bookingsuedtirol.offers"):
+                data = response.json()
 
             return {
                 room["room_id"]: room["room_free"] for room in data["rooms"]
@@ -97,13 +223,13 @@ class APIClient:
 
         return {}
 
-    @RateLimiter(max_calls=1, period=10)
+    @rate_limited("global", "bookingsuedtirol.availabilities")
     def get_global_availability(
         self,
         start: datetime.date,
         end: datetime.date,
         guest_count: int,
-    ) -> list[datetime.date]:
+    ) -> Optional[list[datetime.date]]:
         """
         Returns the dates with possible availability for the given date range
         and guest count.
@@ -119,14 +245,36 @@ class APIClient:
 
         Returns
         -------
-        list[datetime.date]
-            A list of dates with availability.
+        Optional[list[datetime.date]]
+            A list of dates with availability, or None if the request failed.
 
         Raises
         ------
         ValueError
             If the date range is greater than 60 days.
         """
+        return self._get_global_availability(start, end, guest_count)
+
+    @rate_limited("global", "bookingsuedtirol.availabilities")
+    async def aget_global_availability(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        guest_count: int,
+    ) -> Optional[list[datetime.date]]:
+        """
+        Async version of `get_global_availability`.
+        """
+        return await asyncio.to_thread(
+            self._get_global_availability, start, end, guest_count
+        )
+
+    def _get_global_availability(
+        self,
+        start: datetime.date,
+        end: datetime.date,
+        guest_count: int,
+    ) -> Optional[list[datetime.date]]:
         if end - start > timedelta(days=60):
             raise ValueError("Date range must be less or equal than 60 days.")
 
@@ -139,9 +287,12 @@ class APIClient:
         )
 
         try:
-            response = requests.get(url)
+            response = transport.request(
+                "GET", url, endpoint="bookingsuedtirol.availabilities"
+            )
             response.raise_for_status()
-            data = response.json()
+            with get_metrics().parsing("bookingsuedtirol.availabilities"):
+                data = response.json()
 
             return [
                 datetime.datetime.strptime(item["date"], "%Y-%m-%d").date()
@@ -153,78 +304,235 @@ class APIClient:
         except ValueError as e:
             print(f"JSON parsing error: {e}")
 
-        return []
+        return None
 
 
 class BookingSuedTirol(AvailabilityFetcher):
     """
     Fetcher for BookingSuedTirol systems.
+
+    Parameters
+    ----------
+    booking_id
+        The property ID.
+    rate_limits
+        Optional overrides of the API client's rate limits.
+    batch_details
+        Whether to query the detailed availability of each date only for a
+        minimal set of guest counts that covers the occupancy range of every
+        room type, rather than for every guest count with availability. The
+        offers for a guest count list the free rooms whose occupancy range
+        contains that guest count, so both return the same rooms.
+    guest_counts
+        The guest counts whose availability is queried. Defaults to
+        ``GUEST_COUNTS``.
+    prune_guest_counts
+        Whether to query the global calendar only for a minimal set of the
+        guest counts that covers the occupancy range of every room type, and
+        for each larger guest count only on the dates with availability for
+        a smaller guest count that fits all of its rooms. Otherwise, the
+        full date range is queried for every guest count.
+    global_span
+        The maximum number of days per global calendar request. Defaults to
+        ``GLOBAL_SPAN``, the largest span that the API accepts; larger
+        spans raise a ValueError.
     """
 
-    def __init__(self, booking_id: str | int):
-        self._booking_id = booking_id
-        self._client = APIClient(booking_id)
+    def __init__(
+        self,
+        booking_id: str | int,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+        batch_details: bool = True,
+        guest_counts: Sequence[int] = GUEST_COUNTS,
+        prune_guest_counts: bool = True,
+        global_span: int = GLOBAL_SPAN,
+    ):
+        if not 1 <= global_span <= GLOBAL_SPAN:
+            raise ValueError(
+                f"Global span must be between 1 and {GLOBAL_SPAN} days."
+            )
 
-    def _get_total_availability(
-        self, start: datetime.date, end: datetime.date, num_guests: int
-    ) -> list[datetime.date]:
+        self._booking_id = booking_id
+        self._client = APIClient(booking_id, rate_limits)
+        self._batch_details = batch_details
+        self._guest_counts = sorted(guest_counts)
+        self._prune_guest_counts = prune_guest_counts
+        self._global_span = global_span
+        self._occupancy: dict[int, tuple[int, int]] = {}
+
+    async def _aget_total_availability(
+        self,
+        dates: list[datetime.date],
+        num_guests: int,
+        refresh: bool = False,
+    ) -> dict[datetime.date, bool]:
         """
-        Gets the total global availability for a given date range. Repeatedly
-        calls the global availability API to get the availability for 60 days.
+        Gets the total global availability of the given sorted dates. Calls
+        the global availability API for the fewest windows of up to
+        ``global_span`` days that cover the dates which the range planner
+        does not know yet.
 
         Returns
         -------
-        list[datetime.date]
-            A list of dates with availability.
-        """
-        availability = []
-        current = start
-        while current <= end:
-            data = self._client.get_global_availability(
-                current, current + timedelta(days=60), num_guests
+        dict[datetime.date, bool]
+            Whether each of the given dates has availability. Dates whose
+            request failed are missing.
+        """
+
+        async def fetch_window(
+            start: datetime.date, end: datetime.date
+        ) -> dict[datetime.date, bool]:
+            found = await self._client.aget_global_availability(
+                start, end, num_guests
             )
-            availability.extend(data)
-            current += timedelta(days=61)  # +1 because end date is inclusive
+            if found is None:
+                return {}
 
-        return availability
+            return window_values(start, end, found)
 
-    def get_availability(
+        key = (
+            "bookingsuedtirol.availabilities",
+            str(self._booking_id),
+            num_guests,
+        )
+        return await get_range_planner().afetch(
+            key, dates, self._global_span, fetch_window, refresh=refresh
+        )
+
+    async def _aget_guest_count_availability(
+        self,
+        dates: list[datetime.date],
+        occupancy: dict[int, tuple[int, int]],
+        refresh: bool = False,
+    ) -> dict[int, dict[datetime.date, bool]]:
+        """
+        Gets whether each date has availability for each guest count, with
+        the dates whose request failed missing. When pruning, only the guest
+        counts that cover all occupancy ranges are queried, by increasing
+        size, and each one only on the dates with availability for every
+        smaller guest count that implies it. Dates without availability for
+        one of them are unavailable, and dates where one of them is unknown
+        are unknown.
+        """
+        if not self._prune_guest_counts or not occupancy:
+            totals = await asyncio.gather(
+                *[
+                    self._aget_total_availability(dates, num_guests, refresh)
+                    for num_guests in self._guest_counts
+                ]
+            )
+            return dict(zip(self._guest_counts, totals))
+
+        ranges = list(occupancy.values())
+        available: dict[int, dict[datetime.date, bool]] = {}
+        for num_guests in _covering_guest_counts(self._guest_counts, ranges):
+            implied = [
+                found
+                for smaller, found in available.items()
+                if _implies(smaller, num_guests, ranges)
+            ]
+            candidates = []
+            sold_out = []
+            for date in dates:
+                values = [found.get(date) for found in implied]
+                if False in values:
+                    sold_out.append(date)
+                elif None not in values:
+                    candidates.append(date)
+
+            found = await self._aget_total_availability(
+                candidates, num_guests, refresh
+            )
+            available[num_guests] = dict.fromkeys(sold_out, False) | found
+
+        return available
+
+    async def _aget_room_occupancy(self) -> dict[int, tuple[int, int]]:
+        """
+        Returns the room occupancy, which is only requested until it was
+        fetched once.
+        """
+        if not self._occupancy:
+            self._occupancy = await self._client.aget_room_occupancy()
+
+        return self._occupancy
+
+    async def aget_available_dates(
+        self, dates: list[datetime.date], refresh: bool = False
+    ) -> dict[datetime.date, bool]:
+        occupancy = await self._aget_room_occupancy()
+        totals = await self._aget_guest_count_availability(
+            dates, occupancy, refresh
+        )
+        return _any_available(dates, totals)
+
+    async def aiter_availability(
         self,
         start: datetime.date,
         end: datetime.date,
-        cache: Optional[dict[datetime.date, Result]] = None,
-    ) -> dict[datetime.date, Result]:
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
+    ) -> AsyncGenerator[tuple[datetime.date, Result], None]:
         """
-        Fetches the availability for a given date range.
+        Yields the availability for a given date range.
         """
-        availability = {}
+        dates = date_range(start, end)
+        max_guests = max(self._guest_counts)
+        availability = self._from_cache(dates, cache, max_guests)
+        for item in availability.items():
+            yield item
+
+        missing = [date for date in dates if date not in availability]
+        if not missing:
+            return
 
         # First use the global calendar to find which (date, num_guests)
-        # combination has rooms.
+        # combination has rooms. The occupancy of the room types tells which
+        # guest counts need to be queried.
+        occupancy = await self._aget_room_occupancy()
+        room_types = {room: high for room, (_, high) in occupancy.items()}
+
         has_rooms = defaultdict(list)
-        for num_guests in range(1, 5):
-            dates = self._get_total_availability(start, end, num_guests)
-            for date in dates:
-                has_rooms[date].append(num_guests)
+        totals = await self._aget_guest_count_availability(missing, occupancy)
+        for num_guests, found in totals.items():
+            for date, available in found.items():
+                if available:
+                    has_rooms[date].append(num_guests)
+
+        # Dates whose global request failed are skipped.
+        known = _any_available(missing, totals)
+
+        # For each specific date find the room IDs that are available. The
+        # detail requests of all dates overlap up to the rate limit.
+
+        async def fetch(date: datetime.date) -> tuple[datetime.date, Result]:
+            guest_counts = has_rooms[date]
+            if self._batch_details:
+                guest_counts = _covering_guest_counts(
+                    guest_counts, list(occupancy.values())
+                )
+
+            details = await asyncio.gather(
+                *[
+                    self._client.aget_detailed_availability(date, num_guests)
+                    for num_guests in guest_counts
+                ]
+            )
 
-        # For each specific date find the room IDs that are available.
-        room_types = self._client.get_room_types()  # room_id -> size
-        for date in date_range(start, end):
             room2num: dict[int, int] = {}  # room_id: num_rooms_available
-            for num_guests in has_rooms[date]:
+            for detail in details:
                 # Overriding here is OK because room availability is the same
                 # regardless of the number of guests queried.
-                room2num |= self._client.get_detailed_availability(
-                    date, num_guests
-                )
+                room2num |= detail
 
             rooms = {room_types[k]: v for k, v in room2num.items()}
             num_available = sum(k * v for k, v in rooms.items())
-            availability[date] = Result(
+            return date, Result(
                 {
                     "num_available": num_available,
                     "rooms": rooms,
                 }
             )
 
-        return availability
+        async for date, result in iter_completed(map(fetch, known)):
+            self._to_cache({date: result}, cache, max_guests)
+            yield date, result
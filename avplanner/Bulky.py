@@ -1,12 +1,15 @@
+import asyncio
 import datetime
-from collections import defaultdict
-from typing import Optional
-
-import requests
-from bs4 import BeautifulSoup
+from typing import AsyncGenerator, ClassVar, Optional
 
+from . import transport
 from .AvailabilityFetcher import AvailabilityFetcher, Result
-from .utils import date_range
+from .Metrics import get_metrics
+from .RangePlanner import get_range_planner
+from .RateLimiter import get_rate_limiter, rate_limited
+from .ResultCache import ResultCache
+from .parsers import parse_bulky_detail, parse_bulky_widget
+from .utils import date_range, iter_completed
 
 _HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10.15; rv:129.0) Gecko/20100101 Firefox/129.0",  # noqa
@@ -33,27 +36,71 @@ DETAIL_URL = (
     "https://{slug}.bukly.com/en-us/hotel/{date:%Y-%m-%d}/{end:%Y-%m-%d}/"
 )
 
-
-def month_abbrev_to_number(abbrev):
-    datetime_object = datetime.datetime.strptime(abbrev, "%b")
-    return datetime_object.month
+# The nominal number of days of a widget window. The widget decides which
+# dates it covers, so this is only used to skip ahead when a request fails.
+WINDOW_SIZE = 15
 
 
 class APIClient:
-    def __init__(self, booking_id: str):
+    """
+    Client for the Bulky booking widget and hotel pages.
+
+    Parameters
+    ----------
+    booking_id
+        The hotel slug.
+    rate_limits
+        Optional overrides of ``RATE_LIMITS``, mapping endpoint names to
+        ``(max_calls, period)`` tuples. Limits apply per hotel.
+    """
+
+    # Endpoint name -> (max_calls, period in seconds). Bulky does not
+    # publish rate limits, so these are conservative.
+    RATE_LIMITS: ClassVar[dict[str, tuple[int, float]]] = {
+        "widget": (1, 1),
+        "detail": (2, 1),
+    }
+
+    def __init__(
+        self,
+        booking_id: str,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+    ):
         self.booking_id = booking_id  # slug
 
-    def get_half_month_availability(
+        limits = self.RATE_LIMITS | (rate_limits or {})
+        self._rate_limiters = {
+            name: get_rate_limiter(("bulky", booking_id, name), *limit)
+            for name, limit in limits.items()
+        }
+
+    @rate_limited("widget", "bulky.widget")
+    def get_widget_window(
         self, date: datetime.date
-    ) -> list[datetime.date]:
+    ) -> dict[datetime.date, bool]:
         """
-        Fetches the half month availability for a date from the API.
+        Fetches the availability widget for a date from the API.
 
         Returns
         -------
-        list[datetime.date]
-            List of dates with availability.
+        dict[datetime.date, bool]
+            Whether any room is available, for each date that the widget
+            covers. Empty if the request fails.
         """
+        return self._get_widget_window(date)
+
+    @rate_limited("widget", "bulky.widget")
+    async def aget_widget_window(
+        self, date: datetime.date
+    ) -> dict[datetime.date, bool]:
+        """
+        Async version of `get_widget_window`.
+        """
+        return await asyncio.to_thread(self._get_widget_window, date)
+
+    def _get_widget_window(
+        self, date: datetime.date
+    ) -> dict[datetime.date, bool]:
         url = URL.format(slug=self.booking_id, date=date)
 
         try:
@@ -61,145 +108,125 @@ class APIClient:
             _headers["Referer"] = _headers["Referer"].format(
                 slug=self.booking_id
             )
-            response = requests.get(url, headers=_headers)
+            response = transport.request(
+                "GET", url, endpoint="bulky.widget", headers=_headers
+            )
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
-
-            table = soup.find("table")
-
-            # Extract the header information
-            headers = []
-            for th in table.find_all("th"):
-                year = date.year
-                month_abbrev = th.find("span", class_="month")
-                day = th.find("span", class_="day")
-                if day:
-                    month = month_abbrev_to_number(month_abbrev.text)
-                    date = datetime.date(year, month, int(day.text))
-                    headers.append(date)
-
-            # Extract the rows
-            rows = []
-            for tr in table.find_all("tr")[1:]:  # Skip the header row
-                cells = tr.find_all("td")
-                row = [cell.text.strip() for cell in cells]
-                row = row[1:]  # skip name
-                rows.append(row)
-
-            candidate = []
-            for datum, *vals in zip(headers, *rows):
-                if any(vals):
-                    candidate.append(datum)
-
-            return candidate
+            with get_metrics().parsing("bulky.widget"):
+                return parse_bulky_widget(response.content, date)
 
         except Exception as e:
             print(e)
             pass
 
-        return []
+        return {}
+
+    @rate_limited("detail", "bulky.detail")
+    async def aget_detailed_availability(
+        self, date: datetime.date
+    ) -> dict[int, int]:
+        """
+        Async version of `get_detailed_availability`.
+        """
+        return await asyncio.to_thread(self._get_detailed_availability, date)
 
+    @rate_limited("detail", "bulky.detail")
     def get_detailed_availability(self, date: datetime.date) -> dict[int, int]:
+        return self._get_detailed_availability(date)
+
+    def _get_detailed_availability(
+        self, date: datetime.date
+    ) -> dict[int, int]:
         end = date + datetime.timedelta(days=1)
         url = DETAIL_URL.format(slug=self.booking_id, date=date, end=end)
-        response = requests.get(url)
+        response = transport.request("GET", url, endpoint="bulky.detail")
         response.raise_for_status()
-        soup = BeautifulSoup(response.content, "html.parser")
-
-        # Find all divs that appear to contain hotel room information
-        result: dict[int, int] = defaultdict(int)
-        hotel_rooms = soup.find_all("div", {"class": "hotel-room__sub"})
-
-        for hotel_room in hotel_rooms:
-            _ = hotel_room.find(
-                "h4", {"class": "hotel-room__sub-title"}
-            ).text.strip()  # room name
-
-            # Locate the number of beds from hidden input elements
-            beds_input = hotel_room.find(
-                "input", {"name": lambda x: x and "beds" in x}
-            )
-            max_beds = (
-                beds_input.get("value") if beds_input else "Not specified"
-            )
-
-            # Locate the select element for room quantity
-            qty_select = hotel_room.find(
-                "select", {"name": lambda x: x and "qty" in x}
-            )
-            if qty_select:
-                # Extract available quantities from option elements
-                quantities = [
-                    option.text for option in qty_select.find_all("option")
-                ]
-                qty = ", ".join(quantities)
-            else:
-                qty = "0"  # not specified
-
-            # Find the maximum quantity that can be booked.
-            max_qty = max([int(char) for char in qty if char.isdigit()])
-
-            if "room" in qty:
-                # If the quantity is specified in terms of rooms, we can
-                # only book the entire room.
-                result[int(max_beds)] += max_qty
-            else:
-                # Otherwise, we can book individual beds.
-                result[1] += max_qty
-
-        return dict(result)
+        with get_metrics().parsing("bulky.detail"):
+            return parse_bulky_detail(response.content)
 
 
 class Bulky(AvailabilityFetcher):
-    def __init__(self, booking_id: str):
+    """
+    Fetcher for Bulky hotels.
+
+    Parameters
+    ----------
+    booking_id
+        The hotel slug.
+    rate_limits
+        Optional overrides of the API client's rate limits.
+    max_concurrency
+        The maximum number of detail pages that are fetched at the same
+        time, within the rate limits.
+    """
+
+    def __init__(
+        self,
+        booking_id: str,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+        max_concurrency: int = 4,
+    ):
         self._booking_id = booking_id
-        self._client = APIClient(booking_id)
+        self._client = APIClient(booking_id, rate_limits)
+        self._max_concurrency = max_concurrency
 
-    def _get_total_availability(
-        self, start: datetime.date, end: datetime.date
-    ) -> list[datetime.date]:
+    async def aget_available_dates(
+        self, dates: list[datetime.date], refresh: bool = False
+    ) -> dict[datetime.date, bool]:
         """
-        Gets the total global availability for a given date range. Repeatedly
-        calls the global availability API to get the availability for 30 days.
-
-        Returns
-        -------
-        list[datetime.date]
-            A list of dates with availability.
+        Gets the total global availability of the given sorted dates. Each
+        widget request starts at the first date that is neither known to the
+        range planner nor covered by the windows fetched so far, so no date
+        is fetched twice.
         """
-        availability = []
-        current = start
-        while current <= end:
-            data = self._client.get_half_month_availability(current)
-            availability.extend(data)
-            current += datetime.timedelta(days=15)
-
-        return availability
-
-    def get_availability(
+        key = ("bulky.widget", str(self._booking_id), None)
+        return await get_range_planner().afetch(
+            key,
+            dates,
+            WINDOW_SIZE,
+            lambda start, _: self._client.aget_widget_window(start),
+            sequential=True,
+            refresh=refresh,
+        )
+
+    async def aiter_availability(
         self,
         start: datetime.date,
         end: datetime.date,
-        cache: Optional[dict[datetime.date, Result]] = None,
-    ) -> dict[datetime.date, Result]:
-        availability: dict[datetime.date, Result] = {}
-        total = self._get_total_availability(start, end)
-
-        for date in date_range(start, end):
-            if date in total:
-                rooms = self._client.get_detailed_availability(date)
-            else:
-                rooms = {}
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
+    ) -> AsyncGenerator[tuple[datetime.date, Result], None]:
+        dates = date_range(start, end)
+        availability = self._from_cache(dates, cache)
+        for item in availability.items():
+            yield item
+
+        missing = [date for date in dates if date not in availability]
+        if not missing:
+            return
+
+        # Dates whose widget request failed are skipped.
+        total = await self.aget_available_dates(missing)
+        semaphore = asyncio.Semaphore(self._max_concurrency)
+
+        async def fetch(date: datetime.date) -> tuple[datetime.date, Result]:
+            rooms: dict[int, int] = {}
+            if total[date]:
+                async with semaphore:
+                    rooms = await self._client.aget_detailed_availability(date)
 
             num_available = sum(k * v for k, v in rooms.items())
-            availability[date] = Result(
+            return date, Result(
                 {
                     "num_available": num_available,
                     "rooms": rooms,
                 }
             )
 
-        return availability
+        # Detail pages are fetched concurrently, up to the concurrency and
+        # rate limits.
+        async for date, result in iter_completed(map(fetch, total)):
+            self._to_cache({date: result}, cache)
+            yield date, result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,106 @@
+import contextlib
+import datetime
+import json
+import os
+from typing import Optional
+
+
+class Checkpoint:
+    """
+    Durable journal of the completed work units of a crawl run, so that a
+    restarted run with the same run ID can skip them. A work unit is a hut
+    and an (inclusive) range of booking dates. The journal is a JSON lines
+    file: the first line stores the fetch datetime of the run, and each
+    further line marks one unit as done. Every line is flushed to disk as
+    soon as it is written.
+
+    Results of a unit should be written to storage before the unit is marked
+    as done. A run that is killed in between fetches that unit again, and
+    writes its records again with the same fetch datetime.
+
+    Parameters
+    ----------
+    path
+        The path of the journal file. An existing journal is resumed.
+    fetch_datetime
+        The fetch datetime of a new run. Defaults to now. Ignored when an
+        existing journal is resumed.
+    """
+
+    def __init__(
+        self, path: str, fetch_datetime: Optional[datetime.datetime] = None
+    ):
+        self.path = path
+        self._done: set[tuple[str, datetime.date, datetime.date]] = set()
+
+        if os.path.exists(path) and os.path.getsize(path):
+            with open(path, "r") as fh:
+                content = fh.read()
+
+            header, *lines = content.splitlines()
+            for line in lines:
+                # Skips a partially written line of a killed run.
+                with contextlib.suppress(json.JSONDecodeError):
+                    self._done.add(_unit(**json.loads(line)))
+
+            self.fetch_datetime = datetime.datetime.fromisoformat(
+                json.loads(header)["fetch_datetime"]
+            )
+            if not content.endswith("\n"):
+                with open(path, "a") as fh:
+                    fh.write("\n")
+        else:
+            self.fetch_datetime = fetch_datetime or datetime.datetime.today()
+            self._write({"fetch_datetime": self.fetch_datetime.isoformat()})
+
+    @classmethod
+    def for_run(
+        cls, out: str, run_id: str, directory: Optional[str] = None
+    ) -> "Checkpoint":
+        """
+        Opens the journal of the given run that writes to the output path.
+        The journal is stored next to the output, unless a directory is
+        given.
+        """
+        directory = directory or os.path.dirname(out) or "."
+        name = f"{os.path.basename(out)}.{run_id}.checkpoint"
+        return cls(os.path.join(directory, name))
+
+    def _write(self, record: dict):
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(record) + "\n")
+            fh.flush()
+            os.fsync(fh.fileno())
+
+    def __len__(self) -> int:
+        return len(self._done)
+
+    def is_done(
+        self, hut_name: str, start: datetime.date, end: datetime.date
+    ) -> bool:
+        return (hut_name, start, end) in self._done
+
+    def mark_done(
+        self, hut_name: str, start: datetime.date, end: datetime.date
+    ):
+        """
+        Marks the work unit as done, and flushes it to disk.
+        """
+        self._done.add((hut_name, start, end))
+        self._write(
+            {
+                "hut_name": hut_name,
+                "start": start.isoformat(),
+                "end": end.isoformat(),
+            }
+        )
+
+
+def _unit(
+    hut_name: str, start: str, end: str
+) -> tuple[str, datetime.date, datetime.date]:
+    return (
+        hut_name,
+        datetime.date.fromisoformat(start),
+        datetime.date.fromisoformat(end),
+    )
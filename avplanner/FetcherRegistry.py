@@ -0,0 +1,185 @@
+import importlib
+import json
+from importlib.metadata import entry_points
+from typing import Any, Callable, TypeVar
+
+from .AvailabilityFetcher import AvailabilityFetcher
+from .Hut import Hut
+
+# Entry point group of fetchers that are provided by other packages, e.g.,
+# ``planyo = "mypackage.planyo:Planyo"``.
+ENTRY_POINT_GROUP = "avplanner.fetchers"
+
+# Built-in fetchers by booking type, as "module:class" specs.
+BUILTIN_FETCHERS = {
+    "bookingsuedtirol": "avplanner.BookingSuedTirol:BookingSuedTirol",
+    "bulky": "avplanner.Bulky:Bulky",
+    "staulanza": "avplanner.Staulanza:Staulanza",
+}
+
+F = TypeVar("F", bound=type[AvailabilityFetcher])
+
+
+class FetcherRegistry:
+    """
+    Maps the booking types of huts to fetcher classes and their options.
+    Fetchers are registered as "module:class" specs and only imported when
+    a fetcher of their type is first created, so that a run that needs one
+    backend does not import the others and their dependencies.
+
+    Besides the built-in fetchers, fetchers are registered by installed
+    packages through the ``avplanner.fetchers`` entry point group, or by
+    decorating a class with `register_fetcher`.
+
+    The options of a booking type, e.g., ``rate_limits`` or the
+    ``guest_counts`` of BookingSuedTirol, are passed to the constructor of
+    its fetcher along with the booking ID. Options of a single hut, e.g.,
+    the guest counts that its rooms actually take, override those of its
+    booking type.
+    """
+
+    def __init__(self, fetchers: dict[str, str] = BUILTIN_FETCHERS):
+        self._specs = dict(fetchers)
+        self._classes: dict[str, type[AvailabilityFetcher]] = {}
+        self._options: dict[str, dict[str, Any]] = {}
+        self._hut_options: dict[str, dict[str, Any]] = {}
+        self._loaded_entry_points = False
+
+    def _load_entry_points(self):
+        if self._loaded_entry_points:
+            return
+
+        self._loaded_entry_points = True
+        for entry_point in entry_points(group=ENTRY_POINT_GROUP):
+            self._specs.setdefault(entry_point.name, entry_point.value)
+
+    def register(
+        self,
+        booking_type: str,
+        fetcher: str | type[AvailabilityFetcher],
+        **options,
+    ):
+        """
+        Registers a fetcher class, or its "module:class" spec, for the
+        booking type, replacing any previous fetcher. Options are passed to
+        the fetcher as in `configure`.
+        """
+        self._classes.pop(booking_type, None)
+        if isinstance(fetcher, str):
+            self._specs[booking_type] = fetcher
+        else:
+            self._specs[booking_type] = (
+                f"{fetcher.__module__}:{fetcher.__qualname__}"
+            )
+            self._classes[booking_type] = fetcher
+
+        if options:
+            self.configure(booking_type, **options)
+
+    def configure(self, booking_type: str, **options):
+        """
+        Sets options that are passed to each new fetcher of the booking type.
+        """
+        self._options.setdefault(booking_type, {}).update(options)
+
+    def configure_hut(self, hut_name: str, **options):
+        """
+        Sets options that are passed to each new fetcher of the hut. They
+        override the options of its booking type.
+        """
+        self._hut_options.setdefault(hut_name, {}).update(options)
+
+    def load_config(self, path: str):
+        """
+        Configures the booking types from a JSON file that maps each booking
+        type to its options, e.g.,
+        ``{"bulky": {"rate_limits": {"widget": [1, 2]}}}``. The options of
+        single huts are mapped by hut name under the ``huts`` key, e.g.,
+        ``{"huts": {"Rifugio Fanes": {"guest_counts": [2, 4, 6]}}}``.
+        """
+        with open(path, "r") as fh:
+            config = json.load(fh)
+
+        for hut_name, options in config.pop("huts", {}).items():
+            self.configure_hut(hut_name, **options)
+
+        for booking_type, options in config.items():
+            self.configure(booking_type, **options)
+
+    def booking_types(self) -> list[str]:
+        """
+        Returns the booking types that have a fetcher, without importing
+        them.
+        """
+        self._load_entry_points()
+        return list(self._specs)
+
+    def get_class(self, booking_type: str) -> type[AvailabilityFetcher]:
+        """
+        Returns the fetcher class of the booking type, and imports it on
+        first use.
+        """
+        if booking_type in self._classes:
+            return self._classes[booking_type]
+
+        self._load_entry_points()
+        if booking_type not in self._specs:
+            raise ValueError(f"Unknown booking type: {booking_type}")
+
+        module_name, _, class_name = self._specs[booking_type].partition(":")
+        obj: Any = importlib.import_module(module_name)
+        for attr in class_name.split("."):
+            obj = getattr(obj, attr)
+
+        self._classes[booking_type] = obj
+        return obj
+
+    def create(self, hut: Hut, **options) -> AvailabilityFetcher:
+        """
+        Creates the fetcher of the hut, with the configured options of its
+        booking type updated by those of the hut and by the given options.
+        """
+        # Fetchers take the booking ID and their own keyword options.
+        cls: Callable[..., AvailabilityFetcher] = self.get_class(
+            hut.booking_type
+        )
+        options = (
+            self._options.get(hut.booking_type, {})
+            | self._hut_options.get(hut.name, {})
+            | options
+        )
+        return cls(hut.booking_id, **options)
+
+
+_registry = FetcherRegistry()
+
+
+def get_fetcher_registry() -> FetcherRegistry:
+    """
+    Returns the fetcher registry that is used by the scripts.
+    """
+    return _registry
+
+
+def get_fetcher(hut: Hut, **options) -> AvailabilityFetcher:
+    """
+    Creates the fetcher of the hut from the shared registry.
+    """
+    return _registry.create(hut, **options)
+
+
+def register_fetcher(booking_type: str, **options) -> Callable[[F], F]:
+    """
+    Class decorator that registers a fetcher for the booking type in the
+    shared registry:
+
+        @register_fetcher("planyo")
+        class Planyo(AvailabilityFetcher):
+            ...
+    """
+
+    def decorator(cls: F) -> F:
+        _registry.register(booking_type, cls, **options)
+        return cls
+
+    return decorator
@@ -0,0 +1,254 @@
+import hashlib
+import io
+import json
+import sqlite3
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+# Endpoint name -> TTL (in seconds) after which a cached response is stale.
+DEFAULT_TTLS: dict[str, float] = {
+    "bookingsuedtirol.rooms": 24 * 60 * 60,
+    "bookingsuedtirol.availabilities": 10 * 60,
+    "bookingsuedtirol.offers": 10 * 60,
+    "bulky.widget": 10 * 60,
+    "bulky.detail": 10 * 60,
+    "staulanza.month": 10 * 60,
+    "staulanza.details": 10 * 60,
+}
+
+# POST endpoints that only query data and may be cached like GET requests.
+# Responses of other POST requests are never cached.
+CACHEABLE_POST_ENDPOINTS = frozenset({"staulanza.details"})
+
+# Headers that describe the transfer rather than the (decoded) content.
+_SKIP_HEADERS = {"content-encoding", "content-length", "transfer-encoding"}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    endpoint TEXT NOT NULL,
+    url TEXT NOT NULL,
+    status INTEGER NOT NULL,
+    headers TEXT NOT NULL,
+    content BLOB NOT NULL,
+    etag TEXT,
+    last_modified TEXT,
+    stored_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS responses_accessed_at
+    ON responses (accessed_at);
+"""
+
+
+@dataclass
+class CachedResponse:
+    url: str
+    status: int
+    headers: dict[str, str]
+    content: bytes
+    etag: Optional[str]
+    last_modified: Optional[str]
+    stored_at: float
+
+    def to_response(self) -> requests.Response:
+        """
+        Rebuilds a ``requests.Response`` from the cached data.
+        """
+        response = requests.Response()
+        response.url = self.url
+        response.status_code = self.status
+        response.headers = CaseInsensitiveDict(self.headers)
+        response.encoding = get_encoding_from_headers(response.headers)
+        response.raw = io.BytesIO(self.content)
+        return response
+
+
+class HTTPCache:
+    """
+    Persistent SQLite-backed cache of raw HTTP responses, shared by all API
+    clients. Fresh responses are returned without touching the network.
+    Stale responses that carry an ETag or Last-Modified header are
+    revalidated with a conditional request, so unchanged pages cost a 304
+    instead of a full download.
+
+    Parameters
+    ----------
+    path
+        The path of the SQLite database file.
+    ttls
+        Overrides of ``DEFAULT_TTLS``, mapping endpoint names to the number of
+        seconds after which their responses become stale.
+    default_ttl
+        The TTL (in seconds) of endpoints that are not in ``ttls``.
+    max_bytes
+        The maximum total size of cached response bodies. The least recently
+        used responses are evicted when the cache grows beyond this size.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttls: Optional[dict[str, float]] = None,
+        default_ttl: float = 10 * 60,
+        max_bytes: int = 256 * 1024**2,
+    ):
+        self.path = path
+        self.ttls = DEFAULT_TTLS | (ttls or {})
+        self.default_ttl = default_ttl
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.executescript(_SCHEMA)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def cacheable(method: str, endpoint: str) -> bool:
+        """
+        Returns whether responses of the request may be cached: GET requests
+        and the POST requests of ``CACHEABLE_POST_ENDPOINTS``.
+        """
+        match method.upper():
+            case "GET":
+                return True
+            case "POST":
+                return endpoint in CACHEABLE_POST_ENDPOINTS
+            case _:
+                return False
+
+    @staticmethod
+    def key(
+        method: str,
+        url: str,
+        data: Optional[dict] = None,
+        params: Optional[dict] = None,
+        json_data: Optional[dict] = None,
+    ) -> str:
+        """
+        Returns the cache key of a request, from its method, URL, query
+        parameters and form or JSON body.
+        """
+        parts = {"params": params, "data": data, "json": json_data}
+        body = json.dumps(
+            {name: part for name, part in parts.items() if part},
+            sort_keys=True,
+            default=str,
+        )
+        raw = f"{method.upper()} {url} {body}".encode()
+        return hashlib.sha256(raw).hexdigest()
+
+    def ttl(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def is_fresh(self, entry: CachedResponse, endpoint: str) -> bool:
+        return time.time() - entry.stored_at < self.ttl(endpoint)
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        """
+        Returns the cached response for the key, fresh or not, or None if
+        there is no such response.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT url, status, headers, content, etag, last_modified, "
+                "stored_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+
+            if row is None:
+                return None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+
+        url, status, headers, content, etag, last_modified, stored_at = row
+        return CachedResponse(
+            url,
+            status,
+            json.loads(headers),
+            content,
+            etag,
+            last_modified,
+            stored_at,
+        )
+
+    def put(self, key: str, endpoint: str, response: requests.Response):
+        """
+        Stores a successful response and evicts the least recently used
+        responses if the cache exceeds its size limit.
+        """
+        headers = {
+            k: v
+            for k, v in response.headers.items()
+            if k.lower() not in _SKIP_HEADERS
+        }
+        content = response.content
+        now = time.time()
+
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses VALUES "
+                "(?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    key,
+                    endpoint,
+                    response.url,
+                    response.status_code,
+                    json.dumps(headers),
+                    content,
+                    response.headers.get("ETag"),
+                    response.headers.get("Last-Modified"),
+                    now,
+                    now,
+                    len(content),
+                ),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def touch(self, key: str):
+        """
+        Marks a cached response as fresh again after a successful
+        revalidation.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE responses SET stored_at = ? WHERE key = ?",
+                (time.time(), key),
+            )
+            self._conn.commit()
+
+    def _evict(self):
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at"
+        ).fetchall()
+        evict = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+
+            evict.append((key,))
+            total -= size
+
+        self._conn.executemany("DELETE FROM responses WHERE key = ?", evict)
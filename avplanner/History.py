@@ -0,0 +1,240 @@
+import bisect
+import datetime
+from array import array
+from typing import Iterable, Optional
+
+import numpy as np
+
+from .Storage import Availability, ChangeLogStorage, Storage
+
+MISSING = -1
+
+
+class History:
+    """
+    Dense, vectorized view of availability snapshots. The number of available
+    beds is stored in a single ``(num_huts, num_fetches, num_dates)`` array,
+    where missing observations are marked with ``MISSING``. Queries reduce
+    over this array with numpy instead of scanning records in Python.
+
+    Parameters
+    ----------
+    hut_names
+        The hut names, in the order of the first axis.
+    fetch_datetimes
+        The sorted fetch datetimes, in the order of the second axis.
+    first_date
+        The booking date of the first index of the third axis.
+    num_available
+        The ``(num_huts, num_fetches, num_dates)`` array of available beds.
+    """
+
+    def __init__(
+        self,
+        hut_names: list[str],
+        fetch_datetimes: list[datetime.datetime],
+        first_date: datetime.date,
+        num_available: np.ndarray,
+    ):
+        self.hut_names = hut_names
+        self.fetch_datetimes = fetch_datetimes
+        self.first_date = first_date
+        self.num_available = num_available
+
+        self._hut2idx = {name: idx for idx, name in enumerate(hut_names)}
+        self._filled = _forward_fill(num_available)
+
+    @classmethod
+    def from_records(
+        cls, records: Iterable[Availability], forward_fill: bool = False
+    ) -> "History":
+        """
+        Builds the history from availability records.
+
+        Parameters
+        ----------
+        records
+            The availability records.
+        forward_fill
+            Whether each fetch should carry over the last known value of
+            dates that were not fetched. This is needed for change logs,
+            which only contain records that differ from the previous fetch.
+        """
+        # Records are only passed once, into compact integer buffers, so
+        # they do not need to be held in memory.
+        hut2idx: dict[str, int] = {}
+        fetch2idx: dict[datetime.datetime, int] = {}
+        huts, fetch_idcs, dates, values = (array("i") for _ in range(4))
+        for rec in records:
+            huts.append(hut2idx.setdefault(rec.hut_name, len(hut2idx)))
+            fetch_idcs.append(
+                fetch2idx.setdefault(rec.fetch_datetime, len(fetch2idx))
+            )
+            dates.append(rec.booking_date.toordinal())
+            values.append(rec.num_available)
+
+        if not huts:
+            return cls(
+                [], [], datetime.date.today(), np.empty((0, 0, 0), np.int32)
+            )
+
+        hut_names = list(hut2idx)
+        fetches = sorted(fetch2idx)
+
+        # Renumber the fetches in the order of their datetimes.
+        order = np.empty(len(fetches), np.int32)
+        order[[fetch2idx[fetch] for fetch in fetches]] = range(len(fetches))
+
+        ordinals = np.frombuffer(dates, np.int32)
+        first_ordinal = int(ordinals.min())
+        first = datetime.date.fromordinal(first_ordinal)
+        last = datetime.date.fromordinal(int(ordinals.max()))
+
+        shape = (len(hut_names), len(fetches), (last - first).days + 1)
+        num_available = np.full(shape, MISSING, dtype=np.int32)
+        num_available[
+            np.frombuffer(huts, np.int32),
+            order[np.frombuffer(fetch_idcs, np.int32)],
+            ordinals - first_ordinal,
+        ] = np.frombuffer(values, np.int32)
+
+        if forward_fill:
+            num_available = _forward_fill(num_available)
+
+        return cls(hut_names, fetches, first, num_available)
+
+    @classmethod
+    def from_storage(
+        cls,
+        storage: Storage,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> "History":
+        """
+        Builds the history from all records in the storage. Change logs are
+        forward-filled automatically.
+        """
+        forward_fill = isinstance(storage, ChangeLogStorage)
+        records = storage.read(start=start, end=end)
+        return cls.from_records(records, forward_fill)
+
+    @property
+    def filled(self) -> np.ndarray:
+        """
+        The available beds array where each fetch carries over the last
+        observed value of dates that it did not observe.
+        """
+        return self._filled
+
+    @property
+    def dates(self) -> list[datetime.date]:
+        num_dates = self.num_available.shape[2]
+        return [
+            self.first_date + datetime.timedelta(days=idx)
+            for idx in range(num_dates)
+        ]
+
+    def _date_idx(self, date: datetime.date) -> int:
+        idx = (date - self.first_date).days
+        if not 0 <= idx < self.num_available.shape[2]:
+            raise KeyError(f"No history for {date}.")
+
+        return idx
+
+    def series(self, hut_name: str, date: datetime.date) -> np.ndarray:
+        """
+        Returns the available beds of the hut on the given date, as known at
+        each fetch datetime. Fetches before the first observation are
+        ``MISSING``.
+        """
+        return self._filled[self._hut2idx[hut_name], :, self._date_idx(date)]
+
+    def latest(self) -> np.ndarray:
+        """
+        Returns the ``(num_huts, num_dates)`` array with the latest known
+        number of available beds of each hut and date.
+        """
+        return self._filled[:, -1, :]
+
+    def latest_availability(self, hut_name: str) -> dict[datetime.date, int]:
+        """
+        Returns the latest known number of available beds of the hut for
+        each booking date with at least one observation.
+        """
+        latest = self.latest()[self._hut2idx[hut_name]]
+        (idcs,) = np.nonzero(latest != MISSING)
+        return {
+            self.first_date
+            + datetime.timedelta(days=int(idx)): int(latest[idx])
+            for idx in idcs
+        }
+
+    def sold_out(self, hut_name: str) -> np.ndarray:
+        """
+        Returns, for each booking date, the index of the fetch at which the
+        hut went from available to sold out and stayed sold out since, or
+        ``MISSING`` if that has not been observed.
+        """
+        filled = self._filled[self._hut2idx[hut_name]]
+        prev, curr = filled[:-1], filled[1:]
+        sells_out = (prev > 0) & (curr == 0)
+
+        # Index of the last transition along the fetch axis.
+        num_fetches = filled.shape[0]
+        last = num_fetches - 1 - np.argmax(sells_out[::-1], axis=0)
+        sold_out = sells_out.any(axis=0) & (filled[-1] == 0)
+        return np.where(sold_out, last, MISSING)
+
+    def sold_out_at(
+        self, hut_name: str, date: datetime.date
+    ) -> Optional[datetime.datetime]:
+        """
+        Returns the fetch datetime at which the hut was first seen sold out
+        for the given date (after last being available), or None if the hut
+        is not sold out or has not been observed selling out.
+        """
+        idx = self.sold_out(hut_name)[self._date_idx(date)]
+        return self.fetch_datetimes[idx] if idx != MISSING else None
+
+    def velocity(
+        self, since: Optional[datetime.datetime] = None
+    ) -> dict[str, float]:
+        """
+        Returns the booking velocity of each hut: the average number of beds
+        booked per day, summed over all booking dates. Only decreases in
+        availability between consecutive fetches count as bookings.
+
+        Parameters
+        ----------
+        since
+            Only consider fetches at or after this datetime, if given.
+        """
+        start = 0
+        if since is not None:
+            start = bisect.bisect_left(self.fetch_datetimes, since)
+
+        filled = self._filled[:, start:, :]
+        fetches = self.fetch_datetimes[start:]
+        if len(fetches) < 2:
+            return {name: 0.0 for name in self.hut_names}
+
+        prev, curr = filled[:, :-1, :], filled[:, 1:, :]
+        observed = (prev != MISSING) & (curr != MISSING)
+        booked = np.where(observed, np.clip(prev - curr, 0, None), 0)
+
+        days = (fetches[-1] - fetches[0]).total_seconds() / 86_400
+        per_hut = booked.sum(axis=(1, 2)) / max(days, 1)
+        return dict(zip(self.hut_names, per_hut.tolist()))
+
+
+def _forward_fill(values: np.ndarray) -> np.ndarray:
+    """
+    Replaces missing values along the fetch axis by the last observed value.
+    """
+    if values.size == 0:
+        return values.copy()
+
+    fetch_idcs = np.arange(values.shape[1])[None, :, None]
+    last_seen = np.where(values != MISSING, fetch_idcs, 0)
+    np.maximum.accumulate(last_seen, axis=1, out=last_seen)
+    return np.take_along_axis(values, last_seen, axis=1)
@@ -0,0 +1,71 @@
+import csv
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Optional
+
+HUTS_PATH = "data/huts.csv"
+
+# Matches stage header rows such as "**Stage 1: Lago di Braies - ...**".
+_STAGE_PATTERN = re.compile(r"^\*\*(.+)\*\*$")
+
+
+@dataclass
+class Hut:
+    name: str
+    booking_type: str
+    booking_id: str
+    stage: str = ""
+
+
+@dataclass
+class Stage:
+    name: str
+    huts: list[Hut] = field(default_factory=list)
+
+
+def load_stages(path: str = HUTS_PATH) -> list[Stage]:
+    """
+    Loads the route stages and their huts from the huts CSV file, in route
+    order. Stages are marked by header rows of the form ``**<name>**``, and
+    all named huts below a header belong to that stage. A header that
+    combines several stages, such as ``**Stages 8-10**``, is loaded as a
+    single stage.
+    """
+    stages: list[Stage] = []
+
+    with open(path, "r") as fh:
+        for row in csv.DictReader(fh):
+            name = row["name"].strip()
+            if match := _STAGE_PATTERN.match(name):
+                stages.append(Stage(match.group(1)))
+                continue
+
+            if not name or not stages:
+                continue
+
+            hut = Hut(
+                name=name,
+                booking_type=row["booking_type"],
+                booking_id=row["booking_id"],
+                stage=stages[-1].name,
+            )
+            stages[-1].huts.append(hut)
+
+    return stages
+
+
+def load_huts(
+    path: str = HUTS_PATH, booking_types: Optional[Iterable[str]] = None
+) -> list[Hut]:
+    """
+    Loads the huts from the huts CSV file, optionally only those with one of
+    the given booking types. Huts without a booking ID cannot be fetched, so
+    they are skipped when filtering by booking type.
+    """
+    types = set(booking_types) if booking_types is not None else None
+    return [
+        hut
+        for stage in load_stages(path)
+        for hut in stage.huts
+        if types is None or (hut.booking_type in types and hut.booking_id)
+    ]
@@ -0,0 +1,259 @@
+import contextlib
+import contextvars
+import json
+import logging
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+# EndpointStats attribute -> (Prometheus metric name, help text).
+_PROMETHEUS_METRICS = {
+    "num_requests": ("requests_total", "HTTP requests."),
+    "num_errors": ("request_errors_total", "Failed requests."),
+    "num_cached": ("cached_responses_total", "Responses from the cache."),
+    "num_retries": ("request_retries_total", "Retried requests."),
+    "num_bytes": ("response_bytes_total", "Response body bytes."),
+    "request_time": ("request_seconds_total", "Time waiting for responses."),
+    "max_request_time": ("request_seconds_max", "Slowest request."),
+    "wait_time": ("rate_limit_wait_seconds_total", "Rate limiter waits."),
+    "parse_time": ("parse_seconds_total", "CPU time parsing responses."),
+    "num_parse_errors": ("parse_errors_total", "Failed parses."),
+}
+
+# The hut on whose behalf requests are sent, see `hut_label`.
+_hut: contextvars.ContextVar[str] = contextvars.ContextVar("hut", default="")
+
+
+@dataclass
+class EndpointStats:
+    """
+    Aggregated request, rate limiter and parse statistics of one endpoint of
+    one hut. Times are in seconds.
+    """
+
+    num_requests: int = 0
+    num_errors: int = 0
+    num_cached: int = 0
+    num_retries: int = 0
+    num_bytes: int = 0
+    request_time: float = 0
+    max_request_time: float = 0
+    wait_time: float = 0
+    parse_time: float = 0
+    num_parse_errors: int = 0
+    statuses: Counter[int] = field(default_factory=Counter)
+
+
+class Metrics:
+    """
+    Collects per-request latency, status, size and retries, rate limiter
+    wait times and parse times, labelled by hut and endpoint. Every event is
+    also emitted as a JSON structured log record on the ``avplanner.Metrics``
+    logger at debug level.
+
+    The totals of a hut tell network-bound, throttle-bound and CPU-bound
+    runs apart: see `bottleneck`.
+    """
+
+    def __init__(self):
+        self._stats: dict[tuple[str, str], EndpointStats] = {}
+        self._lock = threading.Lock()
+
+    def _update(self, endpoint: str, **event) -> EndpointStats:
+        hut = _hut.get()
+        if logger.isEnabledFor(logging.DEBUG):
+            record = {"time": time.time(), "hut": hut, "endpoint": endpoint}
+            logger.debug(json.dumps(record | event))
+
+        return self._stats.setdefault((hut, endpoint), EndpointStats())
+
+    def record_request(
+        self,
+        endpoint: str,
+        elapsed: float,
+        status: Optional[int] = None,
+        num_bytes: int = 0,
+        num_retries: int = 0,
+        cached: bool = False,
+        error: Optional[str] = None,
+    ):
+        """
+        Records a request. Requests that raised have no status and the name
+        of the raised exception as error.
+        """
+        with self._lock:
+            stats = self._update(
+                endpoint,
+                event="request",
+                elapsed=elapsed,
+                status=status,
+                bytes=num_bytes,
+                retries=num_retries,
+                cached=cached,
+                error=error,
+            )
+            stats.num_requests += 1
+            stats.num_errors += error is not None or (status or 0) >= 400
+            stats.num_cached += cached
+            stats.num_retries += num_retries
+            stats.num_bytes += num_bytes
+            stats.request_time += elapsed
+            stats.max_request_time = max(stats.max_request_time, elapsed)
+            if status is not None:
+                stats.statuses[status] += 1
+
+    def record_wait(self, endpoint: str, wait: float):
+        """
+        Records the time spent waiting for a rate limiter.
+        """
+        with self._lock:
+            stats = self._update(endpoint, event="wait", wait=wait)
+            stats.wait_time += wait
+
+    def record_parse(
+        self, endpoint: str, elapsed: float, error: Optional[str] = None
+    ):
+        """
+        Records the CPU time spent parsing a response.
+        """
+        with self._lock:
+            stats = self._update(
+                endpoint, event="parse", elapsed=elapsed, error=error
+            )
+            stats.parse_time += elapsed
+            stats.num_parse_errors += error is not None
+
+    @contextlib.contextmanager
+    def parsing(self, endpoint: str) -> Iterator[None]:
+        """
+        Context manager that records the CPU time of its body as parse time
+        of the endpoint, including whether it raised.
+        """
+        start = time.thread_time()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = type(e).__name__
+            raise
+        finally:
+            self.record_parse(endpoint, time.thread_time() - start, error)
+
+    def stats(self) -> dict[tuple[str, str], EndpointStats]:
+        """
+        Returns a copy of the statistics per (hut, endpoint).
+        """
+        with self._lock:
+            return {
+                key: EndpointStats(
+                    **{**vars(stats), "statuses": +stats.statuses}
+                )
+                for key, stats in self._stats.items()
+            }
+
+    def clear(self):
+        with self._lock:
+            self._stats.clear()
+
+    def bottleneck(self, hut: str) -> str:
+        """
+        Returns what the hut spent most time on: "network" (waiting for
+        responses), "throttle" (waiting for rate limiters) or "cpu" (parsing
+        responses).
+        """
+        totals = {"network": 0.0, "throttle": 0.0, "cpu": 0.0}
+        for (name, _), stats in self.stats().items():
+            if name == hut:
+                totals["network"] += stats.request_time
+                totals["throttle"] += stats.wait_time
+                totals["cpu"] += stats.parse_time
+
+        return max(totals, key=totals.__getitem__)
+
+    def to_json(self) -> dict:
+        """
+        Returns the statistics as JSON-serializable dictionary, grouped by
+        hut and endpoint.
+        """
+        summary: dict[str, dict] = {}
+        for (hut, endpoint), stats in sorted(self.stats().items()):
+            entry = summary.setdefault(
+                hut, {"bottleneck": self.bottleneck(hut), "endpoints": {}}
+            )
+            statuses = {str(code): n for code, n in stats.statuses.items()}
+            entry["endpoints"][endpoint] = vars(stats) | {"statuses": statuses}
+
+        return summary
+
+    def to_prometheus(self) -> str:
+        """
+        Returns the statistics in the Prometheus text exposition format.
+        """
+        stats = sorted(self.stats().items())
+
+        lines = []
+        for attr, (name, help_text) in _PROMETHEUS_METRICS.items():
+            kind = "gauge" if name.endswith("_max") else "counter"
+            lines.append(f"# HELP avplanner_{name} {help_text}")
+            lines.append(f"# TYPE avplanner_{name} {kind}")
+            for (hut, endpoint), stat in stats:
+                labels = _labels(hut=hut, endpoint=endpoint)
+                lines.append(
+                    f"avplanner_{name}{{{labels}}} {getattr(stat, attr)}"
+                )
+
+        lines.append("# HELP avplanner_responses_total Responses by status.")
+        lines.append("# TYPE avplanner_responses_total counter")
+        for (hut, endpoint), stat in stats:
+            for status, count in sorted(stat.statuses.items()):
+                labels = _labels(hut=hut, endpoint=endpoint, status=status)
+                lines.append(f"avplanner_responses_total{{{labels}}} {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write(self, path: str):
+        """
+        Writes the summary to the given path, in the Prometheus text format if
+        the path ends in ``.prom`` and as JSON otherwise.
+        """
+        with open(path, "w") as fh:
+            if path.endswith(".prom"):
+                fh.write(self.to_prometheus())
+            else:
+                json.dump(self.to_json(), fh, indent=2)
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"')
+        return value.replace("\n", "\\n")
+
+    return ",".join(f'{key}="{escape(val)}"' for key, val in labels.items())
+
+
+_metrics = Metrics()
+
+
+def get_metrics() -> Metrics:
+    """
+    Returns the metrics collector that is used by all API clients.
+    """
+    return _metrics
+
+
+@contextlib.contextmanager
+def hut_label(hut: str) -> Iterator[None]:
+    """
+    Context manager that labels all metrics recorded in its body, including
+    in asyncio tasks and ``asyncio.to_thread`` calls started from it, with
+    the given hut name.
+    """
+    token = _hut.set(hut)
+    try:
+        yield
+    finally:
+        _hut.reset(token)
@@ -0,0 +1,227 @@
+import datetime
+import itertools
+from dataclasses import dataclass
+from math import prod
+from typing import Iterator, Mapping, Optional
+
+import numpy as np
+
+from .AvailabilityFetcher import Result
+from .History import MISSING, History
+from .Hut import Stage
+from .ResultSeries import ResultSeries
+from .utils import date_range
+
+
+@dataclass
+class Itinerary:
+    start: datetime.date
+    huts: list[str]  # hut name per night, one per stage
+
+    @property
+    def nights(self) -> list[tuple[datetime.date, str]]:
+        return [
+            (self.start + datetime.timedelta(days=idx), hut)
+            for idx, hut in enumerate(self.huts)
+        ]
+
+
+@dataclass
+class Plan:
+    """
+    All feasible itineraries that start on the same date, stored compactly as
+    the feasible huts of each night. Every combination of one hut per night
+    is a feasible itinerary.
+    """
+
+    start: datetime.date
+    options: list[list[str]]  # feasible hut names per night
+
+    @property
+    def num_itineraries(self) -> int:
+        return prod(len(huts) for huts in self.options)
+
+    def __iter__(self) -> Iterator[Itinerary]:
+        for huts in itertools.product(*self.options):
+            yield Itinerary(self.start, list(huts))
+
+
+class Planner:
+    """
+    Plans multi-hut itineraries along the route stages: one night per stage,
+    on consecutive nights, in a hut with enough free beds for the party.
+    Stages are planned as given: a combined header in the huts CSV file, such
+    as ``Stages 8-10``, is loaded as one stage and therefore one night. Pass
+    ``stages`` to `plan` to leave it out.
+
+    Each night only constrains the hut of that night, so the itinerary graph
+    is layered with complete connections between layers. Instead of
+    enumerating paths, the planner computes a ``(num_stages, num_dates)``
+    feasibility mask once per query and finds all feasible start dates by
+    combining its shifted rows. Itineraries are then only enumerated on
+    demand through the returned `Plan` objects.
+
+    Parameters
+    ----------
+    stages
+        The route stages, in order.
+    availability
+        A mapping from hut name to the fetched results of that hut, e.g., a
+        dictionary or a `ResultSeries`.
+    """
+
+    def __init__(
+        self,
+        stages: list[Stage],
+        availability: Mapping[str, Mapping[datetime.date, Result]],
+    ):
+        self.stages = stages
+        self.availability = availability
+
+    @classmethod
+    def from_history(cls, stages: list[Stage], history: History) -> "Planner":
+        """
+        Creates a planner from the latest known availability in the history.
+        Room details are not kept in the history, so only the number of
+        available beds is used.
+        """
+        latest = history.latest()
+        availability = {
+            name: ResultSeries(history.first_date, latest[hut_idx])
+            for hut_idx, name in enumerate(history.hut_names)
+        }
+
+        return cls(stages, availability)
+
+    def plan(
+        self,
+        first_start: datetime.date,
+        last_start: datetime.date,
+        party_size: int,
+        stages: Optional[list[Stage]] = None,
+    ) -> list[Plan]:
+        """
+        Returns the plans of all start dates in the window for which every
+        night has at least one hut with enough free beds for the party.
+
+        Parameters
+        ----------
+        first_start
+            The first possible start date (the date of the first night).
+        last_start
+            The last possible start date (inclusive).
+        party_size
+            The number of people that need a bed each night.
+        stages
+            The stages to plan, in order. Defaults to all stages.
+        """
+        stages = stages if stages is not None else self.stages
+        if not stages:
+            return []
+
+        num_nights = len(stages)
+        dates = date_range(
+            first_start,
+            last_start + datetime.timedelta(days=num_nights - 1),
+        )
+
+        # fits[stage][hut, date] is True when the hut can host the party on
+        # that date.
+        fits = [self._fits(stage, dates, party_size) for stage in stages]
+        feasible = np.array([mask.any(axis=0) for mask in fits])
+
+        # A start date is feasible if the night of stage i, i.e., date
+        # start + i, is feasible for every stage i.
+        num_starts = len(dates) - num_nights + 1
+        starts = np.ones(num_starts, dtype=bool)
+        for idx in range(num_nights):
+            starts &= feasible[idx, idx : idx + num_starts]
+
+        plans = []
+        for start_idx in np.flatnonzero(starts):
+            options = []
+            for idx, stage in enumerate(stages):
+                hut_idcs = np.flatnonzero(fits[idx][:, start_idx + idx])
+                options.append([stage.huts[hut].name for hut in hut_idcs])
+
+            plans.append(Plan(dates[start_idx], options))
+
+        return plans
+
+    def itineraries(
+        self,
+        first_start: datetime.date,
+        last_start: datetime.date,
+        party_size: int,
+        stages: Optional[list[Stage]] = None,
+    ) -> Iterator[Itinerary]:
+        """
+        Yields every feasible itinerary in the start date window. See `plan`
+        for the parameters.
+        """
+        for plan in self.plan(first_start, last_start, party_size, stages):
+            yield from plan
+
+    def _fits(
+        self, stage: Stage, dates: list[datetime.date], party_size: int
+    ) -> np.ndarray:
+        """
+        Returns a ``(num_huts, num_dates)`` mask of the stage's huts that can
+        host the party on each date. See `_capacity` for the number of beds
+        that a result offers to the party.
+        """
+        mask = np.zeros((len(stage.huts), len(dates)), dtype=bool)
+
+        for hut_idx, hut in enumerate(stage.huts):
+            results = self.availability.get(hut.name, {})
+            if isinstance(results, ResultSeries):
+                mask[hut_idx] = _series_capacity(results, dates) >= party_size
+                continue
+
+            mask[hut_idx] = [
+                date in results and _capacity(results[date]) >= party_size
+                for date in dates
+            ]
+
+        return mask
+
+
+def _capacity(result: Result) -> int:
+    """
+    Returns the number of beds that a result offers to a party. When the
+    fetcher reports rooms by size, the party books whole rooms, so this is
+    the total size of the available rooms. Results without rooms, or with
+    rooms reported by name whose size is unknown, fall back to the number of
+    available beds.
+    """
+    sizes = [
+        size * num
+        for size, num in result["rooms"].items()
+        if isinstance(size, int)
+    ]
+    if not sizes:
+        return result["num_available"]
+
+    return sum(sizes)
+
+
+def _series_capacity(
+    series: ResultSeries, dates: list[datetime.date]
+) -> np.ndarray:
+    """
+    Returns the capacity (see `_capacity`) of the series on each date, with
+    ``MISSING`` for dates without a result.
+    """
+    capacity = series.available_on(dates)
+    columns = [
+        idx for idx, key in enumerate(series.room_keys) if isinstance(key, int)
+    ]
+    if not columns:
+        return capacity
+
+    rooms = series.rooms_on(dates)[:, columns].astype(np.int32)
+    known = rooms != MISSING
+    sizes = np.array([series.room_keys[idx] for idx in columns])
+    has_rooms = known.any(axis=1) & (capacity != MISSING)
+    capacity[has_rooms] = (np.where(known, rooms, 0) @ sizes)[has_rooms]
+    return capacity
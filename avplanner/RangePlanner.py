@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+from typing import Awaitable, Callable, Iterable, Optional, Sequence
+
+from .ResultCache import ResultCache
+from .utils import date_range
+
+# (endpoint name, booking ID, guest count)
+SpanKey = tuple[str, str, Optional[int]]
+
+# Fetches the window from the start to the end date (inclusive), and returns
+# whether each date that the response covers is available.
+WindowFetcher = Callable[
+    [datetime.date, datetime.date], Awaitable[dict[datetime.date, bool]]
+]
+
+
+class RangePlanner:
+    """
+    Plans the window requests of calendar endpoints that return the
+    availability of a span of dates at once, such as the 60-day global
+    calendar of BookingSuedTirol or the monthly calendar of Staulanza.
+
+    The planner records which dates of each (endpoint, booking ID, guest
+    count) are known and still fresh, and requests only windows for the
+    remaining dates, using as few windows of the endpoint's maximum span as
+    possible. Responses are merged back per date, so overlapping queries,
+    e.g., a full season crawl and a weekend query afterwards, or work units
+    that split a season, do not request the same dates again.
+
+    Parameters
+    ----------
+    cache
+        The cache in which the known dates are stored, with date-dependent
+        expiry. Defaults to a new `ResultCache`.
+    """
+
+    def __init__(self, cache: Optional[ResultCache] = None):
+        self.cache = cache if cache is not None else ResultCache()
+
+    def known(
+        self, key: SpanKey, dates: Sequence[datetime.date]
+    ) -> dict[datetime.date, bool]:
+        """
+        Returns the fresh known availability of the given dates.
+        """
+        name, booking_id, guest_count = key
+        known = {}
+        for date in dates:
+            value = self.cache.get((name, booking_id, date, guest_count))
+            if value is not None:
+                known[date] = bool(value)
+
+        return known
+
+    def record(self, key: SpanKey, values: dict[datetime.date, bool]):
+        """
+        Records the availability of the dates that a response covered.
+        """
+        name, booking_id, guest_count = key
+        for date, available in values.items():
+            self.cache.set((name, booking_id, date, guest_count), available)
+
+    def plan(
+        self,
+        dates: Sequence[datetime.date],
+        span: int,
+        align: Optional[
+            Callable[[datetime.date], tuple[datetime.date, datetime.date]]
+        ] = None,
+    ) -> list[tuple[datetime.date, datetime.date]]:
+        """
+        Returns the fewest ``(start, end)`` windows that cover the given
+        sorted dates. Windows span at most ``span`` days and start at the
+        first date that is not yet covered, which is optimal for covering
+        points with intervals of fixed length. Endpoints that only accept
+        fixed windows, such as calendar months, instead pass ``align`` to
+        map a date to the window that contains it.
+        """
+        windows: list[tuple[datetime.date, datetime.date]] = []
+        for date in dates:
+            if windows and date <= windows[-1][1]:
+                continue
+
+            if align is not None:
+                windows.append(align(date))
+            else:
+                end = date + datetime.timedelta(days=span - 1)
+                windows.append((date, end))
+
+        return windows
+
+    async def afetch(
+        self,
+        key: SpanKey,
+        dates: Sequence[datetime.date],
+        span: int,
+        fetch_window: WindowFetcher,
+        align: Optional[
+            Callable[[datetime.date], tuple[datetime.date, datetime.date]]
+        ] = None,
+        sequential: bool = False,
+        refresh: bool = False,
+    ) -> dict[datetime.date, bool]:
+        """
+        Returns the availability of the given sorted dates, from fresh known
+        values where possible and from window requests for the other dates.
+        Dates that no response covered, e.g., because a request failed, are
+        missing from the result.
+
+        Parameters
+        ----------
+        key
+            The endpoint, booking ID and guest count.
+        dates
+            The sorted dates whose availability is needed.
+        span
+            The maximum number of days of a window.
+        fetch_window
+            Fetches one window, see `WindowFetcher`.
+        align
+            Maps a date to the fixed window that contains it, for endpoints
+            that do not accept arbitrary windows. See `plan`.
+        sequential
+            Whether to request the windows one after another, planning each
+            window after the previous response. Use this for endpoints that
+            decide themselves which dates a response covers. Otherwise, all
+            windows are planned upfront and requested concurrently.
+        refresh
+            Whether to request all dates, even those that are known, e.g.,
+            to poll for changes. The responses are recorded as usual.
+        """
+        values = self.known(key, dates) if not refresh else {}
+        pending = [date for date in dates if date not in values]
+
+        if not sequential:
+            windows = self.plan(pending, span, align)
+            responses = await asyncio.gather(
+                *[fetch_window(start, end) for start, end in windows]
+            )
+            for response in responses:
+                self.record(key, response)
+                values |= response
+        else:
+            while pending:
+                start, end = self.plan(pending[:1], span, align)[0]
+                response = await fetch_window(start, end)
+                self.record(key, response)
+                values |= response
+
+                # Skip the planned window if the response covered nothing.
+                last = max(response, default=end)
+                pending = [
+                    date
+                    for date in pending
+                    if date > last and date not in values
+                ]
+
+        return {date: values[date] for date in dates if date in values}
+
+
+def window_values(
+    start: datetime.date,
+    end: datetime.date,
+    available: Iterable[datetime.date],
+) -> dict[datetime.date, bool]:
+    """
+    Returns the availability of each date of a window whose response lists
+    the available dates.
+    """
+    return dict.fromkeys(date_range(start, end), False) | dict.fromkeys(
+        available, True
+    )
+
+
+_range_planner = RangePlanner()
+
+
+def set_range_planner(planner: RangePlanner):
+    """
+    Sets the range planner that is shared by all fetchers.
+    """
+    global _range_planner
+    _range_planner = planner
+
+
+def get_range_planner() -> RangePlanner:
+    return _range_planner
@@ -1,11 +1,24 @@
+import asyncio
+import inspect
+import threading
 import time
+from collections import deque
 from functools import wraps
+from typing import Hashable
+
+from .Metrics import get_metrics
 
 
 class RateLimiter:
     """
-    Rate limiter decorator to limit the number of calls to a function within a
-    certain period (in seconds).
+    Sliding window rate limiter that allows at most ``max_calls`` calls within
+    any window of ``period`` seconds. The limiter is thread-safe and can be
+    awaited from asyncio code: callers reserve the next free slot under a
+    lock, and then sleep outside of it until that slot is reached. A caller
+    that is cancelled while it sleeps releases its slot again.
+
+    The limiter can also be used as decorator for both regular functions and
+    coroutine functions.
 
     Parameters
     ----------
@@ -16,24 +29,142 @@ class RateLimiter:
         allowed.
     """
 
-    def __init__(self, max_calls: int, period: int):
+    def __init__(self, max_calls: int, period: float):
+        if max_calls < 1:
+            raise ValueError("max_calls must be at least 1.")
+
         self.max_calls = max_calls
         self.period = period
-        self.timestamps: list[float] = []
+        self.timestamps: deque[float] = deque()
+        self.waited = 0.0  # total seconds that callers had to wait
+        self._lock = threading.Lock()
 
-    def __call__(self, func):
-        @wraps(func)
-        def wrapper(*args, **kwargs):
+    def _reserve(self) -> tuple[float, float]:
+        """
+        Reserves the first available call slot and returns the slot and the
+        number of seconds to wait until it.
+        """
+        with self._lock:
             now = time.perf_counter()
-            self.timestamps = [
-                t for t in self.timestamps if now - t < self.period
-            ]
+            while self.timestamps and now - self.timestamps[0] >= self.period:
+                self.timestamps.popleft()
 
+            slot = now
             if len(self.timestamps) >= self.max_calls:
-                sleep_time = self.period - (now - self.timestamps[0])
-                time.sleep(max(sleep_time, 0))
+                slot = self.timestamps[-self.max_calls] + self.period
+
+            self.timestamps.append(slot)
+            wait = max(slot - now, 0)
+            self.waited += wait
+            return slot, wait
+
+    def _release(self, slot: float, wait: float):
+        """
+        Releases a reserved slot that will not be used.
+        """
+        with self._lock:
+            # Slots that are already outside the window were dropped.
+            if slot in self.timestamps:
+                self.timestamps.remove(slot)
+
+            self.waited -= wait
+
+    def acquire(self) -> float:
+        """
+        Blocks until a call is allowed. Returns the time spent waiting.
+        """
+        _, wait = self._reserve()
+        if wait > 0:
+            time.sleep(wait)
+
+        return wait
 
-            self.timestamps.append(time.perf_counter())
+    async def acquire_async(self) -> float:
+        """
+        Waits without blocking the event loop until a call is allowed. Returns
+        the time spent waiting.
+        """
+        slot, wait = self._reserve()
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            except asyncio.CancelledError:
+                self._release(slot, wait)
+                raise
+
+        return wait
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                await self.acquire_async()
+                return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            self.acquire()
             return func(*args, **kwargs)
 
         return wrapper
+
+
+_LIMITERS: dict[Hashable, RateLimiter] = {}
+_LIMITERS_LOCK = threading.Lock()
+
+
+def get_rate_limiter(
+    key: Hashable, max_calls: int, period: float
+) -> RateLimiter:
+    """
+    Returns the rate limiter registered under the given key, creating it with
+    the given limits if it does not exist yet. All callers that use the same
+    key, such as clients for the same host or booking ID, share one limiter.
+    """
+    with _LIMITERS_LOCK:
+        if key not in _LIMITERS:
+            _LIMITERS[key] = RateLimiter(max_calls, period)
+
+        return _LIMITERS[key]
+
+
+def get_rate_limiters() -> dict[Hashable, RateLimiter]:
+    """
+    Returns a copy of the registered rate limiters by key.
+    """
+    with _LIMITERS_LOCK:
+        return dict(_LIMITERS)
+
+
+def rate_limited(name: str, endpoint: str):
+    """
+    Method decorator that acquires the instance's rate limiter ``name`` from
+    its ``_rate_limiters`` dictionary before each call, and records the wait
+    time in the metrics under ``endpoint``, the label of the requests that
+    the method sends. Unlike decorating with a ``RateLimiter`` directly,
+    this limits each instance (and thus each host or booking ID) separately.
+    """
+
+    def decorator(func):
+        if inspect.iscoroutinefunction(func):
+
+            @wraps(func)
+            async def async_wrapper(self, *args, **kwargs):
+                wait = await self._rate_limiters[name].acquire_async()
+                get_metrics().record_wait(endpoint, wait)
+                return await func(self, *args, **kwargs)
+
+            return async_wrapper
+
+        @wraps(func)
+        def wrapper(self, *args, **kwargs):
+            wait = self._rate_limiters[name].acquire()
+            get_metrics().record_wait(endpoint, wait)
+            return func(self, *args, **kwargs)
+
+        return wrapper
+
+    return decorator
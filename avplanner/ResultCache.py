@@ -0,0 +1,99 @@
+import datetime
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence
+
+# (fetcher type, booking ID, date, guest count)
+CacheKey = tuple[str, str, datetime.date, Optional[int]]
+
+# Sorted (max days ahead, TTL in seconds) pairs. Dates further ahead than the
+# last entry use the TTL of the last entry.
+DEFAULT_TTLS: tuple[tuple[int, float], ...] = (
+    (7, 60 * 60),  # within a week: one hour
+    (30, 6 * 60 * 60),  # within a month: six hours
+    (90, 24 * 60 * 60),  # otherwise: one day
+)
+
+
+class ResultCache:
+    """
+    Thread-safe in-memory cache of fetched results with date-dependent expiry
+    and a least-recently-used size bound.
+
+    Near dates change more often than far-future dates, so entries expire
+    after a TTL that depends on how many days ahead of today their date is.
+
+    Parameters
+    ----------
+    maxsize
+        The maximum number of entries. The least recently used entries are
+        evicted when the cache is full.
+    ttls
+        Sorted ``(max_days_ahead, ttl)`` pairs, with TTLs in seconds. Dates
+        further ahead than the last entry use the TTL of the last entry.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 100_000,
+        ttls: Sequence[tuple[int, float]] = DEFAULT_TTLS,
+    ):
+        if not ttls:
+            raise ValueError("At least one TTL must be given.")
+
+        self.maxsize = maxsize
+        self.ttls = sorted(ttls)
+        self._data: OrderedDict[CacheKey, tuple[float, object]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def ttl(self, date: datetime.date) -> float:
+        """
+        Returns the TTL (in seconds) of entries for the given date.
+        """
+        days_ahead = (date - datetime.date.today()).days
+        for max_days, ttl in self.ttls:
+            if days_ahead <= max_days:
+                return ttl
+
+        return self.ttls[-1][1]
+
+    def get(self, key: CacheKey) -> Optional[object]:
+        """
+        Returns the cached value for the key, or None if there is no entry or
+        the entry has expired.
+        """
+        with self._lock:
+            if key not in self._data:
+                return None
+
+            expires, value = self._data[key]
+            if expires <= time.time():
+                del self._data[key]
+                return None
+
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: CacheKey, value: object):
+        """
+        Stores the value for the key, with an expiry based on the key's date.
+        """
+        expires = time.time() + self.ttl(key[2])
+
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        with self._lock:
+            self._data.clear()
@@ -0,0 +1,154 @@
+import datetime
+from typing import Iterator, Mapping, Optional, Sequence
+
+import numpy as np
+
+from .AvailabilityFetcher import Result
+from .History import MISSING
+
+
+class ResultSeries(Mapping[datetime.date, Result]):
+    """
+    Compact, read-only mapping from booking dates to the results of one hut.
+    Results are stored as arrays indexed by the offset of the booking date
+    from ``first_date`` instead of one dictionary per date: the number of
+    available beds in a ``(num_dates,)`` array, and the rooms in a
+    ``(num_dates, num_room_keys)`` array with one column per room key. Dates
+    and rooms without a result are marked with ``MISSING``.
+
+    Looking up a date builds the `Result` dictionary on demand, so the series
+    can be used wherever a ``dict[datetime.date, Result]`` is read.
+
+    Parameters
+    ----------
+    first_date
+        The booking date of the first index.
+    num_available
+        The ``(num_dates,)`` array of available beds.
+    room_keys
+        The room sizes or names, in the order of the columns of ``rooms``.
+    rooms
+        The ``(num_dates, num_room_keys)`` array of available rooms. Defaults
+        to no rooms.
+    """
+
+    __slots__ = ("first_date", "num_available", "room_keys", "rooms")
+
+    def __init__(
+        self,
+        first_date: datetime.date,
+        num_available: np.ndarray,
+        room_keys: Sequence[int | str] = (),
+        rooms: Optional[np.ndarray] = None,
+    ):
+        if rooms is None:
+            rooms = np.full((len(num_available), len(room_keys)), MISSING)
+
+        self.first_date = first_date
+        self.num_available = num_available.astype(np.int32, copy=False)
+        self.room_keys = list(room_keys)
+        self.rooms = rooms.astype(np.int16, copy=False)
+
+    @classmethod
+    def from_results(
+        cls, results: Mapping[datetime.date, Result]
+    ) -> "ResultSeries":
+        """
+        Packs the results of a fetcher into a series.
+        """
+        if not results:
+            return cls(datetime.date.today(), np.empty(0, np.int32))
+
+        first = min(results)
+        num_dates = (max(results) - first).days + 1
+        room_keys = list(
+            dict.fromkeys(
+                key for res in results.values() for key in res["rooms"]
+            )
+        )
+        key2idx = {key: idx for idx, key in enumerate(room_keys)}
+
+        num_available = np.full(num_dates, MISSING, dtype=np.int32)
+        rooms = np.full((num_dates, len(room_keys)), MISSING, dtype=np.int16)
+        for date, result in results.items():
+            idx = (date - first).days
+            num_available[idx] = result["num_available"]
+            for key, num in result["rooms"].items():
+                rooms[idx, key2idx[key]] = num
+
+        return cls(first, num_available, room_keys, rooms)
+
+    def _idx(self, date: datetime.date) -> int:
+        idx = (date - self.first_date).days
+        if not 0 <= idx < len(self.num_available):
+            return MISSING
+
+        return idx if self.num_available[idx] != MISSING else MISSING
+
+    def __getitem__(self, date: datetime.date) -> Result:
+        idx = self._idx(date)
+        if idx == MISSING:
+            raise KeyError(date)
+
+        # Room keys are sizes, or names for fetchers that report rooms by
+        # name, like the results they were packed from.
+        rooms: dict = {
+            key: int(num)
+            for key, num in zip(self.room_keys, self.rooms[idx])
+            if num != MISSING
+        }
+        return Result(
+            {"num_available": int(self.num_available[idx]), "rooms": rooms}
+        )
+
+    def __contains__(self, date: object) -> bool:
+        return isinstance(date, datetime.date) and self._idx(date) != MISSING
+
+    def __iter__(self) -> Iterator[datetime.date]:
+        for idx in np.flatnonzero(self.num_available != MISSING):
+            yield self.first_date + datetime.timedelta(days=int(idx))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.num_available != MISSING))
+
+    def available_on(self, dates: Sequence[datetime.date]) -> np.ndarray:
+        """
+        Returns the available beds on each of the given consecutive dates,
+        with ``MISSING`` for dates without a result.
+        """
+        values = np.full(len(dates), MISSING, dtype=np.int32)
+        if not dates:
+            return values
+
+        # Overlap of the dates with the stored range.
+        offset = (dates[0] - self.first_date).days
+        lo = max(0, -offset)
+        hi = min(len(dates), len(self.num_available) - offset)
+        if lo < hi:
+            values[lo:hi] = self.num_available[offset + lo : offset + hi]
+
+        return values
+
+    def rooms_on(self, dates: Sequence[datetime.date]) -> np.ndarray:
+        """
+        Returns the ``(num_dates, num_room_keys)`` available rooms on each of
+        the given consecutive dates, with ``MISSING`` for dates and rooms
+        without a result.
+        """
+        values = np.full((len(dates), len(self.room_keys)), MISSING, np.int16)
+        if not dates:
+            return values
+
+        offset = (dates[0] - self.first_date).days
+        lo = max(0, -offset)
+        hi = min(len(dates), len(self.num_available) - offset)
+        if lo < hi:
+            values[lo:hi] = self.rooms[offset + lo : offset + hi]
+
+        return values
+
+    def to_dict(self) -> dict[datetime.date, Result]:
+        """
+        Returns the results as a dictionary from dates to `Result` dicts.
+        """
+        return {date: self[date] for date in self}
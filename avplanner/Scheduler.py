@@ -0,0 +1,211 @@
+import datetime
+from typing import Optional
+
+import numpy as np
+
+from .History import MISSING, History
+from .Hut import Hut
+from .utils import date_range
+
+# Estimated number of requests needed to refresh one date, per booking type.
+REQUEST_COSTS: dict[str, float] = {
+    "bookingsuedtirol": 2,
+    "bulky": 1,
+    "staulanza": 2,
+}
+
+
+class Scheduler:
+    """
+    Decides which (hut, date) pairs to re-fetch within a fixed request budget.
+    Each pair gets a refresh priority that is the product of:
+
+    - its recent change rate: the fraction of recent consecutive fetches in
+      which its availability changed, plus a small baseline;
+    - its proximity: near-term dates matter more than far-away dates;
+    - its staleness: pairs that were not fetched for a while gain priority.
+
+    Pairs without any history get the highest priority. The budget is then
+    spent greedily on the pairs with the highest priority per request.
+
+    Parameters
+    ----------
+    history
+        The availability history to derive change rates from.
+    window
+        The number of most recent fetches used to compute change rates.
+    baseline
+        Change rate that is added to every pair, so that dates which have
+        not changed recently are still refreshed occasionally.
+    horizon
+        The number of days ahead at which the proximity is halved.
+    staleness
+        The number of days without fetch after which the priority doubles.
+    request_costs
+        Overrides of ``REQUEST_COSTS``.
+    last_fetched
+        The datetime of the last fetch of each (hut name, booking date), see
+        `ChangeLogStorage.last_fetched`. Change logs only store the fetches
+        in which a date changed, so the history alone would measure the
+        staleness of stable dates from their last change. Defaults to the
+        last fetch in the history that observed the date.
+    """
+
+    def __init__(
+        self,
+        history: History,
+        window: int = 14,
+        baseline: float = 0.05,
+        horizon: float = 14,
+        staleness: float = 7,
+        request_costs: Optional[dict[str, float]] = None,
+        last_fetched: Optional[
+            dict[tuple[str, datetime.date], datetime.datetime]
+        ] = None,
+    ):
+        self.history = history
+        self.window = window
+        self.baseline = baseline
+        self.horizon = horizon
+        self.staleness = staleness
+        self.request_costs = REQUEST_COSTS | (request_costs or {})
+        self.last_fetched = last_fetched
+
+    def priorities(
+        self,
+        huts: list[Hut],
+        dates: list[datetime.date],
+        today: Optional[datetime.date] = None,
+    ) -> np.ndarray:
+        """
+        Returns the ``(num_huts, num_dates)`` array of refresh priorities.
+        """
+        today = today or datetime.date.today()
+        change_rate, stale_days = self._observations(huts, dates, today)
+
+        days_ahead = np.array([(date - today).days for date in dates])
+        proximity = 1 / (1 + np.maximum(days_ahead, 0) / self.horizon)
+        staleness = 1 + stale_days / self.staleness
+
+        return (change_rate + self.baseline) * proximity * staleness
+
+    def _observations(
+        self,
+        huts: list[Hut],
+        dates: list[datetime.date],
+        today: datetime.date,
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the recent change rates and the number of days since the last
+        fetch of each hut and date. Pairs without history get a change rate
+        of one and, unless ``last_fetched`` knows them, zero days since the
+        last fetch.
+        """
+        history = self.history
+        change_rate = np.ones((len(huts), len(dates)))
+        stale_days = np.zeros((len(huts), len(dates)))
+
+        if not history.fetch_datetimes:
+            return change_rate, stale_days
+
+        # Change rate of each hut and date over the most recent fetches.
+        recent = history.filled[:, -self.window - 1 :, :]
+        prev, curr = recent[:, :-1], recent[:, 1:]
+        changed = ((curr != prev) & (prev != MISSING)).sum(axis=1)
+        observed = (curr != MISSING).sum(axis=1)
+        rates = changed / np.maximum(observed, 1)
+
+        last_fetch = _last_observed(history)
+        fetch_age = np.array(
+            [(today - fetch.date()).days for fetch in history.fetch_datetimes]
+        )
+
+        hut2idx = {name: idx for idx, name in enumerate(history.hut_names)}
+        offsets = np.array(
+            [(date - history.first_date).days for date in dates], dtype=int
+        )
+        num_hist_dates = history.num_available.shape[2]
+        in_history = (offsets >= 0) & (offsets < num_hist_dates)
+
+        for idx, hut in enumerate(huts):
+            if hut.name not in hut2idx:
+                continue
+
+            hut_idx = hut2idx[hut.name]
+            cols = np.flatnonzero(in_history)
+            last = last_fetch[hut_idx, offsets[cols]]
+            seen = last != MISSING
+            cols, last = cols[seen], last[seen]
+
+            change_rate[idx, cols] = rates[hut_idx, offsets[cols]]
+            stale_days[idx, cols] = fetch_age[last]
+
+        if self.last_fetched is not None:
+            for idx, hut in enumerate(huts):
+                for col, date in enumerate(dates):
+                    fetched = self.last_fetched.get((hut.name, date))
+                    if fetched is not None:
+                        stale_days[idx, col] = (today - fetched.date()).days
+
+        return change_rate, stale_days
+
+    def schedule(
+        self,
+        huts: list[Hut],
+        start: datetime.date,
+        end: datetime.date,
+        budget: float,
+        today: Optional[datetime.date] = None,
+    ) -> dict[str, list[datetime.date]]:
+        """
+        Selects the (hut, date) pairs to fetch within the request budget.
+
+        Parameters
+        ----------
+        huts
+            The huts to schedule.
+        start
+            The first booking date to consider.
+        end
+            The last booking date to consider (inclusive).
+        budget
+            The total number of requests that may be spent.
+        today
+            The current date, used for proximity and staleness. Defaults to
+            today.
+
+        Returns
+        -------
+        dict[str, list[datetime.date]]
+            A dictionary mapping hut names to the sorted dates to fetch. Huts
+            without selected dates are omitted.
+        """
+        dates = date_range(start, end)
+        priority = self.priorities(huts, dates, today)
+        costs = np.array(
+            [self.request_costs.get(hut.booking_type, 1) for hut in huts]
+        )
+        cost = np.broadcast_to(costs[:, None], priority.shape)
+
+        # Greedily take the pairs with the highest priority per request.
+        order = np.argsort(-(priority / cost), axis=None, kind="stable")
+        spent = np.cumsum(cost.ravel()[order])
+        chosen = order[spent <= budget]
+
+        schedule: dict[str, list[datetime.date]] = {}
+        for hut_idx, date_idx in zip(*np.unravel_index(chosen, cost.shape)):
+            name = huts[hut_idx].name
+            schedule.setdefault(name, []).append(dates[date_idx])
+
+        return {name: sorted(dates) for name, dates in schedule.items()}
+
+
+def _last_observed(history: History) -> np.ndarray:
+    """
+    Returns the ``(num_huts, num_dates)`` array with the index of the last
+    fetch that observed each hut and date, or ``MISSING`` if none did.
+    """
+    observed = history.num_available != MISSING
+    num_fetches = observed.shape[1]
+    last = num_fetches - 1 - np.argmax(observed[:, ::-1, :], axis=1)
+    return np.where(observed.any(axis=1), last, MISSING)
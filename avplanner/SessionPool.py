@@ -0,0 +1,170 @@
+import threading
+import time
+from dataclasses import dataclass
+from typing import Optional
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+@dataclass
+class HostStats:
+    """
+    Latency statistics of the requests sent to a single host.
+    """
+
+    num_requests: int = 0
+    num_errors: int = 0
+    total_time: float = 0
+    max_time: float = 0
+
+    @property
+    def mean_time(self) -> float:
+        return self.total_time / self.num_requests if self.num_requests else 0
+
+    def __str__(self) -> str:
+        return (
+            f"{self.num_requests} requests, {self.num_errors} errors, "
+            f"{self.total_time:.1f}s total, {self.mean_time:.2f}s mean, "
+            f"{self.max_time:.2f}s max"
+        )
+
+
+class SessionPool:
+    """
+    Pool of ``requests`` sessions, one per host, so that connections are kept
+    alive and reused instead of paying a new TCP and TLS handshake for every
+    request. Failed requests are retried with exponential backoff when the
+    server responds with 429 or a 5xx status, respecting any Retry-After
+    header. POST requests are retried as well, as the booking sites use them
+    for queries; requests with side effects, such as webhook posts, pass
+    ``retry=False`` so that they are sent at most once.
+
+    Parameters
+    ----------
+    max_connections
+        The maximum number of concurrent connections per host. Requests
+        beyond this limit wait for a connection to become available.
+    retries
+        The maximum number of retries per request.
+    backoff_factor
+        The backoff factor between retries; the n-th retry waits
+        ``backoff_factor * 2 ** (n - 1)`` seconds.
+    timeout
+        The default ``(connect, read)`` timeout in seconds of each request.
+    redirects
+        Maps hosts to the base URL (scheme and address) to which their
+        requests are sent instead, e.g., a local stand-in server. The
+        original host is kept in the Host header, and sessions and
+        statistics stay keyed by the original host.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = 4,
+        retries: int = 3,
+        backoff_factor: float = 1,
+        timeout: tuple[float, float] = (10, 60),
+        redirects: Optional[dict[str, str]] = None,
+    ):
+        self.max_connections = max_connections
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.timeout = timeout
+        self.redirects = redirects or {}
+
+        self._sessions: dict[tuple[str, bool], requests.Session] = {}
+        self._stats: dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+
+    def _make_session(self, retry: bool = True) -> requests.Session:
+        max_retries = Retry(
+            total=self.retries if retry else 0,
+            backoff_factor=self.backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=None,  # also retry POST requests
+            raise_on_status=False,
+        )
+        adapter = HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=self.max_connections,
+            pool_block=True,
+            max_retries=max_retries,
+        )
+
+        session = requests.Session()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        return session
+
+    def session(self, host: str, retry: bool = True) -> requests.Session:
+        """
+        Returns the session of the given host, creating it if needed. Hosts
+        have a separate session without retries.
+        """
+        with self._lock:
+            if (host, retry) not in self._sessions:
+                self._sessions[host, retry] = self._make_session(retry)
+                self._stats.setdefault(host, HostStats())
+
+            return self._sessions[host, retry]
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        timeout: Optional[float] = None,
+        retry: bool = True,
+        **kwargs,
+    ) -> requests.Response:
+        """
+        Sends a request using the session of the URL's host. Requests with
+        side effects pass ``retry=False`` to be sent at most once. Keyword
+        arguments are passed to ``requests.Session.request``.
+        """
+        parts = urlsplit(url)
+        host = parts.netloc
+        session = self.session(host, retry)
+
+        if target := self.redirects.get(host):
+            url = urlunsplit(urlsplit(target)[:2] + parts[2:])
+            kwargs["headers"] = {**(kwargs.get("headers") or {}), "Host": host}
+
+        start = time.perf_counter()
+
+        try:
+            return session.request(
+                method, url, timeout=timeout or self.timeout, **kwargs
+            )
+        except requests.RequestException:
+            with self._lock:
+                self._stats[host].num_errors += 1
+            raise
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                stats = self._stats[host]
+                stats.num_requests += 1
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
+
+    def stats(self) -> dict[str, HostStats]:
+        """
+        Returns a copy of the latency statistics per host.
+        """
+        with self._lock:
+            return {
+                host: HostStats(**vars(stats))
+                for host, stats in self._stats.items()
+            }
+
+    def close(self):
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+
+            self._sessions.clear()
@@ -1,16 +1,22 @@
+import asyncio
 import datetime
-from typing import Optional
-
-import requests
-from bs4 import BeautifulSoup
+from functools import partial
+from typing import AsyncGenerator, Awaitable, Callable, ClassVar, Optional
+from urllib.parse import urlsplit
 
+from . import transport
 from .AvailabilityFetcher import AvailabilityFetcher, Result
-from .RateLimiter import RateLimiter
-from .utils import date_range
+from .Metrics import get_metrics
+from .RangePlanner import get_range_planner, window_values
+from .RateLimiter import get_rate_limiter, rate_limited
+from .ResultCache import ResultCache
+from .parsers import parse_staulanza_detail, parse_staulanza_month
+from .utils import date_range, iter_completed
 
-# TODO the month in the query is w.r.t. 2024 but may be different
-# depending on the current year
+# The month in the query counts from January 2024 (prm=1), so later years
+# continue at 13, 25, ...
 QUERY = "?prm={month}&chm=0#TabDisp"
+FIRST_YEAR = 2024
 DETAIL_SUFFIX = "Booking/EN/prenotazione1.php"
 HUTS_OTHER_SUFFIX = ["tissi", "lagazuoi"]
 
@@ -35,41 +41,98 @@ MAX_ROOMS = 8
 
 
 class APIClient:
-    def __init__(self, calendar_url: str):
+    """
+    Client for the Staulanza-style booking pages.
+
+    Parameters
+    ----------
+    calendar_url
+        The URL of the ``disponibilita.php`` calendar page.
+    rate_limits
+        Optional overrides of ``RATE_LIMITS``, mapping endpoint names to
+        ``(max_calls, period)`` tuples. Limits apply per host.
+    """
+
+    # Endpoint name -> (max_calls, period in seconds).
+    RATE_LIMITS: ClassVar[dict[str, tuple[int, float]]] = {
+        "month": (2, 1),
+        "details": (4, 1),
+    }
+
+    def __init__(
+        self,
+        calendar_url: str,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+    ):
         self._calendar_url = calendar_url  # disponibilita.php
 
+        host = urlsplit(calendar_url).netloc
+        limits = self.RATE_LIMITS | (rate_limits or {})
+        self._rate_limiters = {
+            name: get_rate_limiter(("staulanza", host, name), *limit)
+            for name, limit in limits.items()
+        }
+
+    @rate_limited("month", "staulanza.month")
     def get_month_availability(
         self, date: datetime.date
-    ) -> list[datetime.date]:
+    ) -> Optional[list[datetime.date]]:
         """
-        Fetches the availability for a specific month from the API.
+        Fetches the availability for the month of the given date from the
+        API. Returns the available dates of the month, or None if the request
+        failed.
         """
-        url = (self._calendar_url + QUERY).format(month=date.month)
+        return self._get_month_availability(date)
 
-        try:
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
+    @rate_limited("month", "staulanza.month")
+    async def aget_month_availability(
+        self, date: datetime.date
+    ) -> Optional[list[datetime.date]]:
+        """
+        Async version of `get_month_availability`.
+        """
+        return await asyncio.to_thread(self._get_month_availability, date)
 
-            # Extracts the dates with green availability.
-            div_disponibilita = soup.find("div", class_="disponibilita")
-            libero_dates = div_disponibilita.find_all("td", class_="libero")
-            avail = [date.text for date in libero_dates]
+    def _get_month_availability(
+        self, date: datetime.date
+    ) -> Optional[list[datetime.date]]:
+        month = (date.year - FIRST_YEAR) * 12 + date.month
+        url = (self._calendar_url + QUERY).format(month=month)
 
+        try:
+            response = transport.request(
+                "GET", url, endpoint="staulanza.month", headers=headers
+            )
+            response.raise_for_status()
             # Returns the list of dates with green availability.
-            return [date.replace(day=int(date_str)) for date_str in avail]
+            with get_metrics().parsing("staulanza.month"):
+                return parse_staulanza_month(response.content, date)
 
         except Exception as e:
             print(e)
-            return []
+            return None
 
-    @RateLimiter(max_calls=4, period=1)
+    @rate_limited("details", "staulanza.details")
     def get_detailed_availability(
         self, date: datetime.date, num_guests: int = 1
     ):
         """
         Fetches the detailed availability for a specific date from the API.
         """
+        return self._get_detailed_availability(date, num_guests)
+
+    @rate_limited("details", "staulanza.details")
+    async def aget_detailed_availability(
+        self, date: datetime.date, num_guests: int = 1
+    ):
+        """
+        Async version of `get_detailed_availability`.
+        """
+        return await asyncio.to_thread(
+            self._get_detailed_availability, date, num_guests
+        )
+
+    def _get_detailed_availability(self, date: datetime.date, num_guests: int):
         if any(hut in self._calendar_url for hut in HUTS_OTHER_SUFFIX):
             SUFFIX = "EN/prenotazione1.php"
         else:
@@ -85,66 +148,183 @@ class APIClient:
         }
 
         try:
-            response = requests.post(url, headers=headers, data=payload)
+            response = transport.request(
+                "POST",
+                url,
+                endpoint="staulanza.details",
+                headers=headers,
+                data=payload,
+            )
             response.raise_for_status()
-            soup = BeautifulSoup(response.content, "html.parser")
-            quadro_camere = soup.find_all("div", class_="quadroCamere")
-            rooms = {}
-
-            for room in quadro_camere:
-                room_name = room.find("p").text.strip()
-
-                if select_element := room.find("select"):
-                    options = select_element.find_all("option")
-                    max_value = max(int(option["value"]) for option in options)
-                    rooms[room_name] = max_value
-
-            return rooms
+            with get_metrics().parsing("staulanza.details"):
+                return parse_staulanza_detail(response.content)
 
         except Exception:
             return {}
 
 
 class Staulanza(AvailabilityFetcher):
-    def __init__(self, base_url: str):
-        self._base_url = base_url
-        self._client = APIClient(base_url)
+    def __init__(
+        self,
+        base_url: str,
+        rate_limits: Optional[dict[str, tuple[int, float]]] = None,
+    ):
+        self._booking_id = base_url
+        self._client = APIClient(base_url, rate_limits)
 
-    def get_availability(
+    async def aget_available_dates(
+        self, dates: list[datetime.date], refresh: bool = False
+    ) -> dict[datetime.date, bool]:
+        """
+        Fetches the calendar of every month of the given dates, unless the
+        range planner knows them.
+        """
+
+        async def fetch_month(
+            first: datetime.date, last: datetime.date
+        ) -> dict[datetime.date, bool]:
+            found = await self._client.aget_month_availability(first)
+            if found is None:
+                return {}
+
+            return window_values(first, last, found)
+
+        key = ("staulanza.month", str(self._booking_id), None)
+        return await get_range_planner().afetch(
+            key, dates, 31, fetch_month, align=_month_of, refresh=refresh
+        )
+
+    async def aiter_availability(
         self,
         start: datetime.date,
         end: datetime.date,
-        cache: Optional[dict[datetime.date, Result]] = None,
-    ) -> dict[datetime.date, Result]:
+        cache: Optional[ResultCache | dict[datetime.date, Result]] = None,
+    ) -> AsyncGenerator[tuple[datetime.date, Result], None]:
         """
-        Gets the availability for a given date range.
+        Yields the availability for a given date range.
         """
-        availability = {}
-        total = self._client.get_month_availability(start)
+        dates = date_range(start, end)
+        availability = self._from_cache(dates, cache, MAX_ROOMS)
+        for item in availability.items():
+            yield item
+
+        missing = [date for date in dates if date not in availability]
+        if not missing:
+            return
+
+        # Dates whose calendar request failed are skipped.
+        total = await self.aget_available_dates(missing)
 
-        for date in date_range(start, end):
+        async def fetch(date: datetime.date) -> tuple[datetime.date, Result]:
             rooms: dict[int, int] = {}
-            if date in total:
-                # Keep fetching detailed availability until no new data is
-                # found, or until the maximum number of rooms is reached.
-                for idx in range(1, MAX_ROOMS + 1):
-                    res = self._client.get_detailed_availability(date, idx)
-                    rooms |= res
-                    if not res:  # no new availability
-                        break
+            if total[date]:
+                probe = partial(self._client.aget_detailed_availability, date)
+                rooms = await _search_rooms(probe, MAX_ROOMS)
 
             # TODO room sizes are not considered so it is not clear how to get
             # them from the API. we just sum all the room values for now
             num_available = sum(rooms.values())
 
-            availability[date] = Result(
+            return date, Result(
                 {
                     "num_available": num_available,
                     "rooms": rooms,
                 }
             )
 
-        return availability
+        # Dates are fetched concurrently, up to the rate limit of the host.
+        async for date, result in iter_completed(map(fetch, total)):
+            self._to_cache({date: result}, cache, MAX_ROOMS)
+            yield date, result
+
+
+async def _search_rooms(
+    probe: Callable[[int], Awaitable[dict]], max_guests: int
+) -> dict:
+    """
+    Finds the availability of each room as reported for the largest number
+    of guests (up to ``max_guests``) for which the room is offered, like
+    `_probe_rooms`, but with fewer round trips.
+
+    A page that offers rooms for some number of guests usually also offers
+    rooms for fewer guests, so the largest number of guests with any offer
+    is found with a galloping search (1, 2, 4, ...) followed by a binary
+    search. Rooms can still be offered only for numbers of guests in between
+    (e.g., a room for at least three guests), so every smaller number of
+    guests is then probed as well, concurrently instead of one after
+    another. As with `_probe_rooms`, numbers of guests after the first one
+    without offers are ignored.
+
+    Parameters
+    ----------
+    probe
+        Returns the rooms offered for the given number of guests, mapped to
+        their availability.
+    max_guests
+        The largest number of guests to probe.
+    """
+    probed: dict[int, dict] = {}
+
+    async def rooms_at(num_guests: int) -> dict:
+        if num_guests not in probed:
+            probed[num_guests] = await probe(num_guests)
+
+        return probed[num_guests]
+
+    if not await rooms_at(1):
+        return {}
+
+    low, high = 1, max_guests + 1
+    num_guests = 2
+    while num_guests <= max_guests:
+        if not await rooms_at(num_guests):
+            high = num_guests
+            break
+
+        low = num_guests
+        num_guests *= 2
+
+    while high - low > 1:
+        mid = (low + high) // 2
+        if await rooms_at(mid):
+            low = mid
+        else:
+            high = mid
+
+    await asyncio.gather(*map(rooms_at, range(2, low)))
+
+    result: dict = {}
+    for num_guests in range(1, low + 1):
+        if not probed[num_guests]:
+            break
+
+        result |= probed[num_guests]
+
+    return result
+
+
+async def _probe_rooms(
+    probe: Callable[[int], Awaitable[dict]], max_guests: int
+) -> dict:
+    """
+    Probes every number of guests from one up to ``max_guests``, until no
+    room is offered, and returns the availability of each room as reported
+    for the largest number of guests for which it is offered.
+    """
+    result: dict = {}
+    for num_guests in range(1, max_guests + 1):
+        if not (rooms := await probe(num_guests)):
+            break
+
+        result |= rooms
+
+    return result
+
+
+def _month_of(date: datetime.date) -> tuple[datetime.date, datetime.date]:
+    first = date.replace(day=1)
+    following = (first + datetime.timedelta(days=31)).replace(day=1)
+    return first, following - datetime.timedelta(days=1)
 
 
 def _get_base(url: str) -> str:
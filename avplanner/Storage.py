@@ -0,0 +1,446 @@
+import ast
+import csv
+import datetime
+import functools
+import os
+import sqlite3
+import sys
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, fields
+from typing import Iterable, Iterator, Optional
+
+
+@dataclass(slots=True)
+class Availability:
+    hut_name: str
+    fetch_datetime: datetime.datetime
+    booking_date: datetime.date
+    num_available: int
+    rooms: dict[int, int]
+
+
+FIELDNAMES = [field.name for field in fields(Availability)]
+
+
+@functools.lru_cache(maxsize=4096)
+def _parse_datetime(value: str) -> datetime.datetime:
+    # Records of the same fetch share one datetime object.
+    return datetime.datetime.fromisoformat(value)
+
+
+class Storage(ABC):
+    """
+    Protocol for classes that store availability records.
+    """
+
+    @abstractmethod
+    def write(self, availabilities: Iterable[Availability]):
+        """
+        Appends the given availability records to the storage.
+        """
+        raise NotImplementedError
+
+    @abstractmethod
+    def read(
+        self,
+        hut_name: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> Iterator[Availability]:
+        """
+        Yields the stored availability records, optionally only those of the
+        given hut and with booking dates in the given (inclusive) range.
+        Records are ordered by fetch datetime.
+        """
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class CSVStorage(Storage):
+    """
+    Stores availability records as rows of a CSV file. This is the original
+    format of ``data/daily.csv``.
+
+    Parameters
+    ----------
+    path
+        The path of the CSV file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def write(self, availabilities: Iterable[Availability]):
+        is_new = not os.path.exists(self.path) or not os.path.getsize(
+            self.path
+        )
+
+        with open(self.path, "a") as fh:
+            writer = csv.DictWriter(fh, fieldnames=FIELDNAMES)
+            if is_new:
+                writer.writeheader()
+
+            for availability in availabilities:
+                writer.writerow(
+                    {name: getattr(availability, name) for name in FIELDNAMES}
+                )
+
+    def read(
+        self,
+        hut_name: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> Iterator[Availability]:
+        if not os.path.exists(self.path):
+            return
+
+        with open(self.path, "r") as fh:
+            for row in csv.DictReader(fh):
+                if hut_name is not None and row["hut_name"] != hut_name:
+                    continue
+
+                booking_date = datetime.date.fromisoformat(row["booking_date"])
+                if start is not None and booking_date < start:
+                    continue
+                if end is not None and booking_date > end:
+                    continue
+
+                yield Availability(
+                    sys.intern(row["hut_name"]),
+                    _parse_datetime(row["fetch_datetime"]),
+                    booking_date,
+                    int(row["num_available"]),
+                    ast.literal_eval(row["rooms"]),
+                )
+
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS huts (
+    id INTEGER PRIMARY KEY,
+    name TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS fetches (
+    id INTEGER PRIMARY KEY,
+    fetch_datetime TEXT UNIQUE NOT NULL
+);
+CREATE TABLE IF NOT EXISTS availability (
+    hut_id INTEGER NOT NULL REFERENCES huts (id),
+    booking_date INTEGER NOT NULL,
+    fetch_id INTEGER NOT NULL REFERENCES fetches (id),
+    num_available INTEGER NOT NULL,
+    PRIMARY KEY (hut_id, booking_date, fetch_id)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS rooms (
+    hut_id INTEGER NOT NULL,
+    booking_date INTEGER NOT NULL,
+    fetch_id INTEGER NOT NULL,
+    room NOT NULL,
+    num_rooms INTEGER NOT NULL,
+    PRIMARY KEY (hut_id, booking_date, fetch_id, room)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS availability_fetch ON availability (fetch_id);
+"""
+
+
+class SQLiteStorage(Storage):
+    """
+    Stores availability records in an indexed SQLite database. Huts and fetch
+    datetimes are stored once and referenced by integer IDs, booking dates are
+    stored as day ordinals, and rooms are stored as rows of a separate table.
+    Records are keyed by (hut, booking date, fetch), so reading one hut's time
+    series only touches that hut's rows.
+
+    The ``room`` column has no declared type, so room sizes (integers) and
+    room names (strings) round-trip with their original type.
+
+    Parameters
+    ----------
+    path
+        The path of the SQLite database file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._conn = sqlite3.connect(path)
+        self._conn.executescript(_SCHEMA)
+        self._hut_ids: dict[str, int] = dict(
+            self._conn.execute("SELECT name, id FROM huts")
+        )
+        self._fetch_ids: dict[str, int] = dict(
+            self._conn.execute("SELECT fetch_datetime, id FROM fetches")
+        )
+
+    def close(self):
+        self._conn.close()
+
+    def _get_id(self, table: str, column: str, ids: dict, value: str) -> int:
+        if value not in ids:
+            cursor = self._conn.execute(
+                f"INSERT INTO {table} ({column}) VALUES (?)", (value,)
+            )
+            ids[value] = cursor.lastrowid
+
+        return ids[value]
+
+    def write(self, availabilities: Iterable[Availability]):
+        avail_rows: list[tuple[int, int, int, int]] = []
+        room_rows: list[tuple[int, int, int, int, int]] = []
+
+        with self._conn:
+            for avail in availabilities:
+                hut_id = self._get_id(
+                    "huts", "name", self._hut_ids, avail.hut_name
+                )
+                fetch_id = self._get_id(
+                    "fetches",
+                    "fetch_datetime",
+                    self._fetch_ids,
+                    avail.fetch_datetime.isoformat(sep=" "),
+                )
+                date = avail.booking_date.toordinal()
+
+                avail_rows.append(
+                    (hut_id, date, fetch_id, avail.num_available)
+                )
+                room_rows.extend(
+                    (hut_id, date, fetch_id, room, num_rooms)
+                    for room, num_rooms in avail.rooms.items()
+                )
+
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO availability VALUES (?, ?, ?, ?)",
+                avail_rows,
+            )
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO rooms VALUES (?, ?, ?, ?, ?)",
+                room_rows,
+            )
+
+    def read(
+        self,
+        hut_name: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> Iterator[Availability]:
+        where = []
+        params: list = []
+        if hut_name is not None:
+            where.append("h.name = ?")
+            params.append(hut_name)
+        if start is not None:
+            where.append("a.booking_date >= ?")
+            params.append(start.toordinal())
+        if end is not None:
+            where.append("a.booking_date <= ?")
+            params.append(end.toordinal())
+
+        clause = f"WHERE {' AND '.join(where)}" if where else ""
+        query = f"""
+            SELECT h.name, f.fetch_datetime, a.booking_date, a.num_available,
+                   r.room, r.num_rooms
+            FROM availability a
+            JOIN huts h ON h.id = a.hut_id
+            JOIN fetches f ON f.id = a.fetch_id
+            LEFT JOIN rooms r
+                ON r.hut_id = a.hut_id
+                AND r.booking_date = a.booking_date
+                AND r.fetch_id = a.fetch_id
+            {clause}
+            ORDER BY f.fetch_datetime, a.hut_id, a.booking_date
+        """
+
+        current: Optional[Availability] = None
+        key = None
+        for (
+            name,
+            fetched,
+            date,
+            num_avail,
+            room,
+            num_rooms,
+        ) in self._conn.execute(query, params):
+            if (name, fetched, date) != key:
+                if current is not None:
+                    yield current
+
+                key = (name, fetched, date)
+                current = Availability(
+                    sys.intern(name),
+                    _parse_datetime(fetched),
+                    datetime.date.fromordinal(date),
+                    num_avail,
+                    {},
+                )
+
+            if room is not None and current is not None:
+                current.rooms[room] = num_rooms
+
+        if current is not None:
+            yield current
+
+
+class ChangeLogStorage(Storage):
+    """
+    Wraps another storage and only writes records whose availability differs
+    from the last stored record of the same (hut, booking date). Most dates
+    do not change between daily fetches, so this stores a small change log
+    instead of full snapshots. Use `state_at` to rebuild the full state as of
+    a fetch datetime.
+
+    Since unchanged records are not stored, the change log alone does not
+    tell when a date was last fetched. The datetime of the last fetch of each
+    (hut, booking date) is therefore kept in a separate fetch log, see
+    `last_fetched`.
+
+    Parameters
+    ----------
+    storage
+        The storage in which the changed records are written.
+    fetch_log
+        The path of the CSV file with the last fetch datetime of each (hut,
+        booking date). It is rewritten on `close` if any records were
+        written. No fetch log is kept if not given.
+    """
+
+    def __init__(self, storage: Storage, fetch_log: Optional[str] = None):
+        self.storage = storage
+        self.fetch_log = fetch_log
+        self._latest: dict[tuple[str, datetime.date], Availability] = {}
+        self._fetched: dict[tuple[str, datetime.date], datetime.datetime] = {}
+        self._num_written = 0
+
+        for avail in storage.read():
+            self._latest[avail.hut_name, avail.booking_date] = avail
+
+        if fetch_log is not None and os.path.exists(fetch_log):
+            with open(fetch_log, "r") as fh:
+                for row in csv.DictReader(fh):
+                    key = (
+                        sys.intern(row["hut_name"]),
+                        datetime.date.fromisoformat(row["booking_date"]),
+                    )
+                    self._fetched[key] = _parse_datetime(row["fetch_datetime"])
+
+    def close(self):
+        if self.fetch_log is not None and self._num_written:
+            self._write_fetch_log(self.fetch_log)
+
+        self.storage.close()
+
+    def _write_fetch_log(self, path: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(["hut_name", "booking_date", "fetch_datetime"])
+            for (name, date), fetched in sorted(self._fetched.items()):
+                writer.writerow([name, date.isoformat(), fetched.isoformat()])
+
+        os.replace(tmp_path, path)
+
+    def write(self, availabilities: Iterable[Availability]):
+        changes = []
+        for avail in availabilities:
+            key = (avail.hut_name, avail.booking_date)
+            latest = self._latest.get(key)
+
+            fetched = self._fetched.get(key)
+            if fetched is None or fetched < avail.fetch_datetime:
+                self._fetched[key] = avail.fetch_datetime
+            self._num_written += 1
+
+            if (
+                latest is None
+                or latest.num_available != avail.num_available
+                or latest.rooms != avail.rooms
+            ):
+                self._latest[key] = avail
+                changes.append(avail)
+
+        self.storage.write(changes)
+
+    def last_fetched(
+        self,
+    ) -> dict[tuple[str, datetime.date], datetime.datetime]:
+        """
+        Returns the datetime of the last fetch of each (hut, booking date),
+        whether or not its availability changed. Dates that are missing from
+        the fetch log, e.g., those stored before it was kept, fall back to
+        their last change.
+        """
+        last = {
+            key: avail.fetch_datetime for key, avail in self._latest.items()
+        }
+        for key, fetched in self._fetched.items():
+            if key not in last or last[key] < fetched:
+                last[key] = fetched
+
+        return last
+
+    def read(
+        self,
+        hut_name: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> Iterator[Availability]:
+        """
+        Yields the stored change records.
+        """
+        return self.storage.read(hut_name, start, end)
+
+    def state_at(
+        self,
+        fetch_datetime: datetime.datetime,
+        hut_name: Optional[str] = None,
+        start: Optional[datetime.date] = None,
+        end: Optional[datetime.date] = None,
+    ) -> dict[tuple[str, datetime.date], Availability]:
+        """
+        Rebuilds the known availability of each (hut, booking date) as of the
+        given fetch datetime, i.e., the latest record fetched at or before
+        that datetime.
+
+        Parameters
+        ----------
+        fetch_datetime
+            The fetch datetime at which to rebuild the state.
+        hut_name
+            Only rebuild the state of this hut, if given.
+        start
+            Only rebuild the state of booking dates on or after this date.
+        end
+            Only rebuild the state of booking dates on or before this date.
+
+        Returns
+        -------
+        dict[tuple[str, datetime.date], Availability]
+            A dictionary mapping (hut name, booking date) to the availability
+            record that was current at the given datetime.
+        """
+        state = {}
+        for avail in self.storage.read(hut_name, start, end):
+            if avail.fetch_datetime > fetch_datetime:
+                break  # records are ordered by fetch datetime
+
+            state[avail.hut_name, avail.booking_date] = avail
+
+        return state
+
+
+def open_storage(path: str, changes_only: bool = False) -> Storage:
+    """
+    Opens the storage at the given path. Paths ending in ``.sqlite`` or
+    ``.db`` use `SQLiteStorage`, and all other paths use `CSVStorage`. If
+    ``changes_only`` is set, the storage is wrapped in a `ChangeLogStorage`
+    whose fetch log is stored next to it, at ``<path>.fetches.csv``.
+    """
+    if path.endswith((".sqlite", ".db")):
+        storage: Storage = SQLiteStorage(path)
+    else:
+        storage = CSVStorage(path)
+
+    if changes_only:
+        return ChangeLogStorage(storage, f"{path}.fetches.csv")
+
+    return storage
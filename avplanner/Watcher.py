@@ -0,0 +1,276 @@
+import asyncio
+import datetime
+import json
+import sys
+import time
+from abc import ABC, abstractmethod
+from dataclasses import asdict, dataclass
+from typing import Optional, TextIO
+
+from . import transport
+from .AvailabilityFetcher import AvailabilityFetcher, Result
+from .Metrics import hut_label
+
+
+@dataclass
+class WatchItem:
+    """
+    A date to watch at a hut, for a party of the given size.
+    """
+
+    hut_name: str
+    date: datetime.date
+    party_size: int = 1
+
+
+@dataclass
+class WatchEvent:
+    """
+    A change of whether a watched date has enough free beds for the party.
+    The first observation of each item is reported as well, with
+    ``previous`` set to None.
+    """
+
+    time: datetime.datetime
+    hut_name: str
+    date: datetime.date
+    party_size: int
+    available: bool
+    previous: Optional[bool]
+    num_available: int
+    rooms: dict[int, int]
+
+    def to_json(self) -> dict:
+        return asdict(self) | {
+            "time": self.time.isoformat(),
+            "date": self.date.isoformat(),
+            "rooms": {str(key): num for key, num in self.rooms.items()},
+        }
+
+
+class Sink(ABC):
+    """
+    Protocol for classes that receive watch events.
+    """
+
+    # Whether `emit` blocks on I/O, e.g., network requests, and is therefore
+    # called from a worker thread instead of the event loop.
+    blocking = False
+
+    @abstractmethod
+    def emit(self, event: WatchEvent):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class StdoutSink(Sink):
+    """
+    Prints a line per event.
+    """
+
+    def __init__(self, stream: TextIO = sys.stdout):
+        self.stream = stream
+
+    def emit(self, event: WatchEvent):
+        state = "available" if event.available else "not available"
+        print(
+            f"{event.time:%H:%M:%S} {event.hut_name} {event.date}: {state} "
+            f"for {event.party_size} ({event.num_available} beds free)",
+            file=self.stream,
+            flush=True,
+        )
+
+
+class FileSink(Sink):
+    """
+    Appends each event as a JSON line to a file, flushed immediately.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def emit(self, event: WatchEvent):
+        with open(self.path, "a") as fh:
+            fh.write(json.dumps(event.to_json()) + "\n")
+
+
+class WebhookSink(Sink):
+    """
+    Posts each event as JSON to a webhook URL. Failed posts are reported and
+    dropped, so that a broken webhook does not stop the watcher, and are not
+    retried, so that an event is posted at most once. Posts block
+    until the webhook responds, so the watcher emits to this sink from a
+    worker thread.
+    """
+
+    blocking = True
+
+    def __init__(self, url: str, timeout: float = 10):
+        self.url = url
+        self.timeout = timeout
+
+    def emit(self, event: WatchEvent):
+        try:
+            response = transport.request(
+                "POST",
+                self.url,
+                endpoint="watch.webhook",
+                use_cache=False,
+                retry=False,
+                json=event.to_json(),
+                timeout=self.timeout,
+            )
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Webhook error: {e}")
+
+
+class Watcher:
+    """
+    Polls watched dates for changes, e.g., to catch cancellations of sold-out
+    dates. Each hut is polled in its own loop, as fast as the rate limiters
+    of its site allow: the cheap calendar endpoints are requested for all
+    watched dates of the hut, and the room details are only fetched for the
+    dates that the calendar reports as available.
+
+    Parameters
+    ----------
+    fetchers
+        The fetcher of each watched hut, by hut name.
+    items
+        The watched dates.
+    sinks
+        The sinks that receive the events.
+    min_interval
+        The minimum number of seconds between the polls of a hut, on top of
+        the rate limits.
+    retry_interval
+        The number of seconds to wait before polling a hut again after a poll
+        failed.
+    """
+
+    def __init__(
+        self,
+        fetchers: dict[str, AvailabilityFetcher],
+        items: list[WatchItem],
+        sinks: list[Sink],
+        min_interval: float = 0,
+        retry_interval: float = 60,
+    ):
+        self.fetchers = fetchers
+        self.items = items
+        self.sinks = sinks
+        self.min_interval = min_interval
+        self.retry_interval = retry_interval
+
+        self.num_polls = 0
+        self._states: dict[tuple[str, datetime.date, int], bool] = {}
+
+    async def _emit(self, event: WatchEvent):
+        for sink in self.sinks:
+            if sink.blocking:
+                await asyncio.to_thread(sink.emit, event)
+            else:
+                sink.emit(event)
+
+    async def apoll(self, hut_name: str):
+        """
+        Polls the watched dates of the hut once, and emits the changes.
+        """
+        today = datetime.date.today()
+        items = [
+            item
+            for item in self.items
+            if item.hut_name == hut_name and item.date >= today
+        ]
+        if not items:
+            return
+
+        fetcher = self.fetchers[hut_name]
+        dates = sorted({item.date for item in items})
+        available = await fetcher.aget_available_dates(dates, refresh=True)
+
+        # The calendar answers are fresh, so fetching the details of the
+        # available dates only requests their detail pages.
+        hits = [date for date, found in available.items() if found]
+        details = await asyncio.gather(
+            *[fetcher.aget_availability(date, date) for date in hits]
+        )
+
+        # Only dates that a response covered are compared, as a failed
+        # request says nothing about whether a date is sold out.
+        results = {
+            date: Result({"num_available": 0, "rooms": {}})
+            for date, found in available.items()
+            if not found
+        }
+        for detail in details:
+            results |= detail
+
+        self.num_polls += 1
+        for item in items:
+            if item.date not in results:
+                continue
+
+            result = results[item.date]
+            fits = result["num_available"] >= item.party_size
+            key = (item.hut_name, item.date, item.party_size)
+            previous = self._states.get(key)
+            if fits == previous:
+                continue
+
+            self._states[key] = fits
+            await self._emit(
+                WatchEvent(
+                    datetime.datetime.now(),
+                    item.hut_name,
+                    item.date,
+                    item.party_size,
+                    fits,
+                    previous,
+                    result["num_available"],
+                    result["rooms"],
+                )
+            )
+
+    async def _watch(self, hut_name: str):
+        with hut_label(hut_name):
+            while True:
+                tic = time.monotonic()
+                try:
+                    await self.apoll(hut_name)
+                except Exception as e:
+                    print(f"Failed to poll {hut_name}: {e}")
+                    await asyncio.sleep(self.retry_interval)
+                    continue
+
+                elapsed = time.monotonic() - tic
+                await asyncio.sleep(max(self.min_interval - elapsed, 0))
+
+    async def arun(self, duration: Optional[float] = None):
+        """
+        Watches all huts until cancelled, or for the given number of seconds.
+        """
+        hut_names = dict.fromkeys(item.hut_name for item in self.items)
+        tasks = [
+            asyncio.create_task(self._watch(hut_name))
+            for hut_name in hut_names
+        ]
+
+        try:
+            await asyncio.wait(tasks, timeout=duration)
+        finally:
+            for task in tasks:
+                task.cancel()
+
+            await asyncio.gather(*tasks, return_exceptions=True)
+            for sink in self.sinks:
+                sink.close()
+
+    def run(self, duration: Optional[float] = None):
+        """
+        Synchronous wrapper around `arun`.
+        """
+        asyncio.run(self.arun(duration))
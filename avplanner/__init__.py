@@ -1,4 +1,31 @@
-from .AvailabilityFetcher import AvailabilityFetcher as AvailabilityFetcher
-from .BookingSuedTirol import BookingSuedTirol as BookingSuedTirol
-from .Bulky import Bulky as Bulky
-from .Staulanza import Staulanza as Staulanza
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .AvailabilityFetcher import AvailabilityFetcher as AvailabilityFetcher
+    from .BookingSuedTirol import BookingSuedTirol as BookingSuedTirol
+    from .Bulky import Bulky as Bulky
+    from .Staulanza import Staulanza as Staulanza
+
+# The fetchers are imported on first access, so that importing one backend
+# does not import the others and their dependencies.
+_LAZY_ATTRIBUTES = {
+    "AvailabilityFetcher": ".AvailabilityFetcher",
+    "BookingSuedTirol": ".BookingSuedTirol",
+    "Bulky": ".Bulky",
+    "Staulanza": ".Staulanza",
+}
+
+
+def __getattr__(name: str):
+    if name not in _LAZY_ATTRIBUTES:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+    module = importlib.import_module(_LAZY_ATTRIBUTES[name], __name__)
+    value = getattr(module, name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted(set(globals()) | set(_LAZY_ATTRIBUTES))
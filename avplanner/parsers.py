@@ -0,0 +1,459 @@
+import datetime
+from html.parser import HTMLParser
+from typing import Optional
+
+from bs4 import BeautifulSoup
+from bs4.dammit import UnicodeDammit
+
+# Extracts the relevant nodes of the scraped booking pages. The "stream"
+# backend extracts only the targeted nodes in a single pass over the page,
+# without building a document tree. The "bs4" backend builds the full
+# BeautifulSoup tree, and is kept as reference. Both backends only extract
+# the raw strings, which are converted by the same code.
+BACKENDS = ("stream", "bs4")
+
+_backend = "stream"
+
+MONTH_ABBREVS = {
+    "jan": 1,
+    "feb": 2,
+    "mar": 3,
+    "apr": 4,
+    "may": 5,
+    "jun": 6,
+    "jul": 7,
+    "aug": 8,
+    "sep": 9,
+    "oct": 10,
+    "nov": 11,
+    "dec": 12,
+}
+
+
+def set_parser_backend(name: str):
+    """
+    Sets the HTML parser backend that is used by all scrapers, one of
+    ``BACKENDS``. Defaults to "stream".
+    """
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown parser backend: {name}")
+
+    global _backend
+    _backend = name
+
+
+def get_parser_backend() -> str:
+    return _backend
+
+
+def month_abbrev_to_number(abbrev: str) -> int:
+    """
+    Returns the month number of an English month abbreviation, e.g., 7 for
+    "Jul".
+    """
+    return MONTH_ABBREVS[abbrev.strip()[:3].lower()]
+
+
+def parse_bulky_widget(
+    content: bytes, date: datetime.date
+) -> dict[datetime.date, bool]:
+    """
+    Parses the Bulky half month availability widget that was requested for
+    the given date, and returns whether any room has availability for each
+    date that the widget covers. The covered dates need not start at the
+    requested date.
+    """
+    if _backend == "bs4":
+        headers, rows = _bs4_bulky_widget(content)
+    else:
+        parser = _BulkyWidgetParser()
+        parser.feed(_decode(content))
+        headers, rows = parser.headers, parser.rows[1:]
+
+    dates = []
+    for month, day in headers:
+        number = month_abbrev_to_number(month)
+        # Windows around the turn of the year span two years.
+        year = (
+            date.year + (number < date.month - 6) - (number > date.month + 6)
+        )
+        dates.append(datetime.date(year, number, int(day)))
+
+    rows = [row[1:] for row in rows]  # skip name
+    return {datum: any(vals) for datum, *vals in zip(dates, *rows)}
+
+
+def parse_bulky_detail(content: bytes) -> dict[int, int]:
+    """
+    Parses the Bulky hotel page of a single night, and returns the number of
+    available rooms per room size. Rooms that are booked per bed count as
+    rooms of size one.
+    """
+    if _backend == "bs4":
+        rooms = _bs4_bulky_detail(content)
+    else:
+        parser = _BulkyDetailParser()
+        parser.feed(_decode(content))
+        rooms = parser.rooms
+
+    result: dict[int, int] = {}
+    for max_beds, quantities in rooms:
+        qty = ", ".join(quantities) if quantities is not None else "0"
+
+        # Find the maximum quantity that can be booked.
+        max_qty = max([int(char) for char in qty if char.isdigit()])
+
+        # If the quantity is specified in terms of rooms, we can only book
+        # the entire room. Otherwise, we can book individual beds.
+        size = int(max_beds or "Not specified") if "room" in qty else 1
+        result[size] = result.get(size, 0) + max_qty
+
+    return result
+
+
+def parse_staulanza_month(
+    content: bytes, date: datetime.date
+) -> list[datetime.date]:
+    """
+    Parses the Staulanza calendar of the month of the given date, and returns
+    the dates with green availability.
+    """
+    if _backend == "bs4":
+        days = _bs4_staulanza_month(content)
+    else:
+        parser = _StaulanzaMonthParser()
+        parser.feed(_decode(content))
+        days = parser.days if parser.found else None
+
+    if days is None:
+        raise ValueError("No availability calendar found.")
+
+    return [date.replace(day=int(day)) for day in days]
+
+
+def parse_staulanza_detail(content: bytes) -> dict[str, int]:
+    """
+    Parses the Staulanza booking page of a single night, and returns the
+    number of available places per room name.
+    """
+    if _backend == "bs4":
+        rooms = _bs4_staulanza_detail(content)
+    else:
+        parser = _StaulanzaDetailParser()
+        parser.feed(_decode(content))
+        rooms = parser.rooms
+
+    result = {}
+    for name, values in rooms:
+        if name is None:
+            raise ValueError("Room without name.")
+
+        if values is not None:
+            result[name.strip()] = max(int(value) for value in values)
+
+    return result
+
+
+def _decode(content: bytes) -> str:
+    # Detects the encoding the same way as BeautifulSoup. If no encoding
+    # fits, undecodable bytes are replaced.
+    markup = UnicodeDammit(content, is_html=True).unicode_markup
+    if markup is None:
+        return content.decode("utf-8", errors="replace")
+
+    return markup
+
+
+def _has_class(attrs: list[tuple[str, Optional[str]]], name: str) -> bool:
+    return any(
+        key == "class" and value is not None and name in value.split()
+        for key, value in attrs
+    )
+
+
+def _get_attr(
+    attrs: list[tuple[str, Optional[str]]], name: str
+) -> Optional[str]:
+    return next((value for key, value in attrs if key == name), None)
+
+
+def _bs4_bulky_widget(
+    content: bytes,
+) -> tuple[list[tuple[str, str]], list[list[str]]]:
+    table = BeautifulSoup(content, "html.parser").find("table")
+
+    headers = []
+    for th in table.find_all("th"):
+        month = th.find("span", class_="month")
+        day = th.find("span", class_="day")
+        if day:
+            headers.append((month.text, day.text))
+
+    rows = [
+        [cell.text.strip() for cell in tr.find_all("td")]
+        for tr in table.find_all("tr")[1:]  # skip the header row
+    ]
+    return headers, rows
+
+
+def _bs4_bulky_detail(
+    content: bytes,
+) -> list[tuple[Optional[str], Optional[list[str]]]]:
+    soup = BeautifulSoup(content, "html.parser")
+
+    rooms = []
+    for room in soup.find_all("div", {"class": "hotel-room__sub"}):
+        beds = room.find("input", {"name": lambda x: x and "beds" in x})
+        qty = room.find("select", {"name": lambda x: x and "qty" in x})
+        rooms.append(
+            (
+                beds.get("value") if beds else None,
+                [opt.text for opt in qty.find_all("option")] if qty else None,
+            )
+        )
+
+    return rooms
+
+
+def _bs4_staulanza_month(content: bytes) -> Optional[list[str]]:
+    soup = BeautifulSoup(content, "html.parser")
+    calendar = soup.find("div", class_="disponibilita")
+    if calendar is None:
+        return None
+
+    return [td.text for td in calendar.find_all("td", class_="libero")]
+
+
+def _bs4_staulanza_detail(
+    content: bytes,
+) -> list[tuple[Optional[str], Optional[list[str]]]]:
+    soup = BeautifulSoup(content, "html.parser")
+
+    rooms = []
+    for room in soup.find_all("div", class_="quadroCamere"):
+        name = room.find("p")
+        select = room.find("select")
+        rooms.append(
+            (
+                name.text if name else None,
+                (
+                    [opt["value"] for opt in select.find_all("option")]
+                    if select
+                    else None
+                ),
+            )
+        )
+
+    return rooms
+
+
+class _BulkyWidgetParser(HTMLParser):
+    """
+    Extracts the (month, day) header cells and the cell texts of each row of
+    the first table.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.headers: list[tuple[str, str]] = []
+        self.rows: list[list[str]] = []
+
+        self._depth = 0  # table nesting depth
+        self._done = False
+        self._header: Optional[dict[str, str]] = None
+        self._span: Optional[str] = None
+        self._cell: Optional[list[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if self._done:
+            return
+
+        if tag == "table":
+            self._depth += 1
+        elif not self._depth:
+            return
+        elif tag == "th":
+            self._header = {}
+        elif tag == "span" and self._header is not None:
+            for name in ("month", "day"):
+                if _has_class(attrs, name) and name not in self._header:
+                    self._span = name
+                    self._header[name] = ""
+        elif tag == "tr":
+            self.rows.append([])
+        elif tag == "td" and self.rows:
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if self._done or not self._depth:
+            return
+
+        if tag == "table":
+            self._depth -= 1
+            self._done = not self._depth
+        elif tag == "span":
+            self._span = None
+        elif tag == "th" and self._header is not None:
+            if self._header.get("day"):
+                self.headers.append(
+                    (self._header.get("month", ""), self._header["day"])
+                )
+            self._header = None
+        elif tag == "td" and self._cell is not None:
+            self.rows[-1].append("".join(self._cell).strip())
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._span is not None and self._header is not None:
+            self._header[self._span] += data
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+class _BulkyDetailParser(HTMLParser):
+    """
+    Extracts the number of beds and the quantity options of each room.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rooms: list[tuple[Optional[str], Optional[list[str]]]] = []
+
+        self._depth = 0  # div nesting depth within the current room
+        self._beds: Optional[str] = None
+        self._options: Optional[list[str]] = None
+        self._in_select = False
+        self._option: Optional[list[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self._depth:
+                self._depth += 1
+            elif _has_class(attrs, "hotel-room__sub"):
+                self._depth = 1
+                self._beds, self._options = None, None
+            return
+
+        if not self._depth:
+            return
+
+        name = _get_attr(attrs, "name") or ""
+        if tag == "input" and self._beds is None and "beds" in name:
+            self._beds = _get_attr(attrs, "value") or ""
+        elif tag == "select" and self._options is None and "qty" in name:
+            self._options = []
+            self._in_select = True
+        elif tag == "option" and self._in_select:
+            self._end_option()
+            self._option = []
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+
+        if tag in ("option", "select"):
+            self._end_option()
+            self._in_select &= tag != "select"
+        elif tag == "div":
+            self._depth -= 1
+            if not self._depth:
+                self.rooms.append((self._beds or None, self._options))
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option.append(data)
+
+    def _end_option(self):
+        if self._option is not None and self._options is not None:
+            self._options.append("".join(self._option))
+        self._option = None
+
+
+class _StaulanzaMonthParser(HTMLParser):
+    """
+    Extracts the day texts of the green cells of the first calendar.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.days: list[str] = []
+        self.found = False
+
+        self._depth = 0  # div nesting depth within the calendar
+        self._cell: Optional[list[str]] = None
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self._depth:
+                self._depth += 1
+            elif not self.found and _has_class(attrs, "disponibilita"):
+                self._depth = 1
+                self.found = True
+        elif tag == "td" and self._depth and _has_class(attrs, "libero"):
+            self._cell = []
+
+    def handle_endtag(self, tag):
+        if tag == "div" and self._depth:
+            self._depth -= 1
+        elif tag == "td" and self._cell is not None:
+            self.days.append("".join(self._cell))
+            self._cell = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+class _StaulanzaDetailParser(HTMLParser):
+    """
+    Extracts the name and the option values of each room.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.rooms: list[tuple[Optional[str], Optional[list[str]]]] = []
+
+        self._depth = 0  # div nesting depth within the current room
+        self._name: Optional[list[str]] = None
+        self._in_name = False
+        self._values: Optional[list[str]] = None
+        self._in_select = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == "div":
+            if self._depth:
+                self._depth += 1
+            elif _has_class(attrs, "quadroCamere"):
+                self._depth = 1
+                self._name, self._values = None, None
+            return
+
+        if not self._depth:
+            return
+
+        if tag == "p" and self._name is None:
+            self._name = []
+            self._in_name = True
+        elif tag == "select" and self._values is None:
+            self._values = []
+            self._in_select = True
+        elif tag == "option" and self._in_select:
+            self._values.append(_get_attr(attrs, "value"))
+
+    def handle_endtag(self, tag):
+        if not self._depth:
+            return
+
+        if tag == "p":
+            self._in_name = False
+        elif tag == "select":
+            self._in_select = False
+        elif tag == "div":
+            self._depth -= 1
+            if not self._depth:
+                name = "".join(self._name) if self._name is not None else None
+                self.rooms.append((name, self._values))
+
+    def handle_data(self, data):
+        if self._in_name:
+            self._name.append(data)
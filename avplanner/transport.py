@@ -0,0 +1,121 @@
+import time
+from typing import Optional
+
+import requests
+
+from .HTTPCache import HTTPCache
+from .Metrics import get_metrics
+from .SessionPool import SessionPool
+
+_http_cache: Optional[HTTPCache] = None
+_session_pool = SessionPool()
+
+
+def set_http_cache(cache: Optional[HTTPCache]):
+    """
+    Sets the persistent HTTP cache that is used by all API clients. Pass None
+    to disable caching, which is the default.
+    """
+    global _http_cache
+    _http_cache = cache
+
+
+def get_http_cache() -> Optional[HTTPCache]:
+    return _http_cache
+
+
+def set_session_pool(pool: SessionPool):
+    """
+    Sets the session pool that is used by all API clients.
+    """
+    global _session_pool
+    _session_pool = pool
+
+
+def get_session_pool() -> SessionPool:
+    return _session_pool
+
+
+def request(
+    method: str, url: str, endpoint: str, use_cache: bool = True, **kwargs
+) -> requests.Response:
+    """
+    Sends an HTTP request on behalf of an API client through the shared
+    session pool. When an HTTP cache is set, fresh cached responses of GET
+    requests and of query-only POST endpoints (see
+    ``HTTPCache.cacheable``) are returned directly, and stale ones are
+    revalidated using their ETag or Last-Modified validators.
+
+    Parameters
+    ----------
+    method
+        The HTTP method, e.g., "GET" or "POST".
+    url
+        The URL to request.
+    endpoint
+        The name of the endpoint, used to select the cache TTL.
+    use_cache
+        Whether the HTTP cache may be used. Pass False for requests with
+        side effects, e.g., webhook posts.
+    **kwargs
+        Keyword arguments passed to ``SessionPool.request``.
+    """
+    start = time.perf_counter()
+    try:
+        response, cached = _send(method, url, endpoint, use_cache, **kwargs)
+    except requests.RequestException as e:
+        elapsed = time.perf_counter() - start
+        get_metrics().record_request(endpoint, elapsed, error=type(e).__name__)
+        raise
+
+    retries = getattr(getattr(response.raw, "retries", None), "history", ())
+    get_metrics().record_request(
+        endpoint,
+        time.perf_counter() - start,
+        response.status_code,
+        len(response.content),
+        len(retries),
+        cached,
+    )
+    return response
+
+
+def _send(
+    method: str, url: str, endpoint: str, use_cache: bool, **kwargs
+) -> tuple[requests.Response, bool]:
+    """
+    Sends the request through the HTTP cache, if set and allowed, and
+    returns the response and whether it came from the cache.
+    """
+    cache = _http_cache if use_cache else None
+    if cache is None or not cache.cacheable(method, endpoint):
+        return _session_pool.request(method, url, **kwargs), False
+
+    key = cache.key(
+        method,
+        url,
+        kwargs.get("data"),
+        kwargs.get("params"),
+        kwargs.get("json"),
+    )
+    entry = cache.get(key)
+    if entry is not None and cache.is_fresh(entry, endpoint):
+        return entry.to_response(), True
+
+    headers = dict(kwargs.pop("headers", None) or {})
+    if entry is not None:
+        if entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+
+    response = _session_pool.request(method, url, headers=headers, **kwargs)
+
+    if response.status_code == 304 and entry is not None:
+        cache.touch(key)
+        return entry.to_response(), True
+
+    if response.status_code == 200:
+        cache.put(key, endpoint, response)
+
+    return response, False
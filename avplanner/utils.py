@@ -1,5 +1,9 @@
+import asyncio
 import datetime
 from datetime import timedelta
+from typing import AsyncIterator, Awaitable, Iterable, TypeVar
+
+T = TypeVar("T")
 
 
 def date_range(
@@ -10,3 +14,20 @@ def date_range(
     """
     delta = (end - start).days
     return [start + timedelta(days=idx) for idx in range(delta + 1)]
+
+
+async def iter_completed(
+    aws: Iterable[Awaitable[T]],
+) -> AsyncIterator[T]:
+    """
+    Runs the awaitables concurrently and yields their results in the order in
+    which they complete. Awaitables that are still pending when the consumer
+    stops iterating are cancelled.
+    """
+    tasks = [asyncio.ensure_future(aw) for aw in aws]
+    try:
+        for next_done in asyncio.as_completed(tasks):
+            yield await next_done
+    finally:
+        for task in tasks:
+            task.cancel()
@@ -0,0 +1,262 @@
+"""
+Benchmarks the crawl cost of every fetcher against the local stand-in server
+(see ``standin.py``), which renders the booking sites from recorded
+availability. For each season and hut, reports the number of requests, the
+number of throttled (429) responses, the wall time, the time spent waiting
+in rate limiters, and the CPU time spent parsing responses. The fetched
+results are checked against the recorded availability, so the benchmark
+also serves as regression test. Run it from the repository root, with the
+root on the module search path for the ``avplanner`` package:
+
+    PYTHONPATH=. python benchmarks/crawl.py \
+        --season 2024-09-10:2024-09-30 --season 2025-06-02:2025-09-28 \
+        --speedup 20 --latency 0.05
+
+Client rate limits are divided by ``--speedup`` to keep the runs short, so
+rate limiter waits are reported in scaled time. Waits of concurrent requests
+add up, so they can exceed the wall time.
+"""
+
+import datetime
+import importlib
+import os
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import requests
+from standin import Rooms, StandInServer, load_state
+
+from avplanner import transport
+from avplanner.AvailabilityFetcher import AvailabilityFetcher
+from avplanner.FetcherRegistry import get_fetcher, get_fetcher_registry
+from avplanner.Hut import HUTS_PATH, Hut, load_huts
+from avplanner.RangePlanner import RangePlanner, set_range_planner
+from avplanner.RateLimiter import get_rate_limiters
+from avplanner.SessionPool import SessionPool
+
+BOOKING_TYPES = ("bookingsuedtirol", "bulky", "staulanza")
+DATA_PATH = os.path.join("data", "changes.csv")
+
+# Functions that parse responses, by module.
+PARSE_FUNCTIONS = {
+    "avplanner.Bulky": ["parse_bulky_widget", "parse_bulky_detail"],
+    "avplanner.Staulanza": ["parse_staulanza_month", "parse_staulanza_detail"],
+}
+
+
+@dataclass
+class Measurement:
+    season: str
+    hut: Hut
+    num_requests: int = 0
+    num_throttled: int = 0
+    wall_time: float = 0
+    wait_time: float = 0
+    parse_time: float = 0
+    num_dates: int = 0
+    num_mismatches: int = 0
+
+    def row(self, name: str) -> str:
+        return (
+            f"{name:<36}{self.num_requests:>9}{self.num_throttled:>10}"
+            f"{self.wall_time:>9.1f}s{self.wait_time:>9.1f}s"
+            f"{self.parse_time:>9.2f}s{self.num_mismatches:>6}/{self.num_dates}"
+        )
+
+
+class _ParseTimer:
+    """
+    Accumulates the thread CPU time spent in the parse functions of the
+    scrapers and in decoding JSON responses.
+    """
+
+    def __init__(self):
+        self.total = 0.0
+        self._lock = threading.Lock()
+
+    def wrap(self, func):
+        def wrapper(*args, **kwargs):
+            start = time.thread_time()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = time.thread_time() - start
+                with self._lock:
+                    self.total += elapsed
+
+        return wrapper
+
+    def install(self):
+        for name, funcs in PARSE_FUNCTIONS.items():
+            module = importlib.import_module(name)
+            for func in funcs:
+                setattr(module, func, self.wrap(getattr(module, func)))
+
+        requests.Response.json = self.wrap(requests.Response.json)
+
+
+def _scaled(limits: dict[str, tuple[int, float]], speedup: float):
+    return {
+        name: (calls, period / speedup)
+        for name, (calls, period) in limits.items()
+    }
+
+
+def _get_fetcher(hut: Hut, speedup: float) -> AvailabilityFetcher:
+    cls = get_fetcher_registry().get_class(hut.booking_type)
+    module = importlib.import_module(cls.__module__)
+    limits = _scaled(module.APIClient.RATE_LIMITS, speedup)
+    return get_fetcher(hut, rate_limits=limits)
+
+
+def _total_wait() -> float:
+    return sum(limiter.waited for limiter in get_rate_limiters().values())
+
+
+def run_season(
+    huts: list[Hut],
+    start: datetime.date,
+    end: datetime.date,
+    timer: _ParseTimer,
+    speedup: float,
+    latency: float,
+    rate_limit: tuple[int, float] | None,
+    state: dict[str, dict[datetime.date, Rooms]] | None = None,
+) -> list[Measurement]:
+    """
+    Fetches the season of each hut, one hut after another, from a fresh
+    stand-in server and measures the cost of each hut. The server renders
+    the given state, which defaults to the recorded availability.
+    """
+    if state is None:
+        state = load_state(DATA_PATH, huts, start, end)
+
+    season = f"{start}:{end}"
+    measurements = []
+
+    with StandInServer(huts, state, latency, rate_limit) as server:
+        for hut in huts:
+            pool = SessionPool(redirects=server.redirects())
+            transport.set_session_pool(pool)
+            set_range_planner(RangePlanner())
+
+            fetcher = _get_fetcher(hut, speedup)
+            requests_before = server.num_requests.total()
+            throttled_before = server.num_throttled.total()
+            wait_before = _total_wait()
+            parse_before = timer.total
+
+            tic = time.perf_counter()
+            results = fetcher.get_availability(start, end)
+            wall_time = time.perf_counter() - tic
+            pool.close()
+
+            expected = state[hut.name]
+            mismatches = [
+                date
+                for date, rooms in expected.items()
+                if date not in results or results[date]["rooms"] != rooms
+            ]
+
+            measurements.append(
+                Measurement(
+                    season,
+                    hut,
+                    server.num_requests.total() - requests_before,
+                    server.num_throttled.total() - throttled_before,
+                    wall_time,
+                    _total_wait() - wait_before,
+                    timer.total - parse_before,
+                    len(expected),
+                    len(mismatches),
+                )
+            )
+
+    return measurements
+
+
+def _season(arg: str) -> tuple[datetime.date, datetime.date]:
+    start, end = arg.split(":")
+    return datetime.date.fromisoformat(start), datetime.date.fromisoformat(end)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--season",
+        type=_season,
+        action="append",
+        help="Booking date range START:END in YYYY-MM-DD format; repeatable",
+    )
+    parser.add_argument(
+        "--booking-type",
+        choices=BOOKING_TYPES,
+        action="append",
+        help="Only benchmark huts of this booking type; repeatable",
+    )
+    parser.add_argument(
+        "--speedup",
+        type=float,
+        default=20,
+        help="Factor by which client rate limit periods are shortened",
+    )
+    parser.add_argument(
+        "--latency",
+        type=float,
+        default=0,
+        help="Seconds the stand-in server waits before each response",
+    )
+    parser.add_argument(
+        "--server-rate-limit",
+        type=lambda s: (int(s.split("/")[0]), float(s.split("/")[1])),
+        default=None,
+        help="Rate limit per host of the stand-in server as CALLS/SECONDS",
+    )
+    args = parser.parse_args()
+
+    seasons = args.season or [_season("2025-06-02:2025-09-28")]
+    huts = load_huts(HUTS_PATH, args.booking_type or BOOKING_TYPES)
+
+    timer = _ParseTimer()
+    timer.install()
+
+    print(
+        f"{'hut':<36}{'requests':>9}{'throttled':>10}{'wall':>10}"
+        f"{'waiting':>10}{'parsing':>10}{'wrong':>6}/dates"
+    )
+
+    measurements = []
+    for start, end in seasons:
+        print(f"Season {start} to {end} (speedup {args.speedup:g}x):")
+        season = run_season(
+            huts,
+            start,
+            end,
+            timer,
+            args.speedup,
+            args.latency,
+            args.server_rate_limit,
+        )
+        for measurement in season:
+            print(measurement.row(measurement.hut.name))
+
+        for booking_type in dict.fromkeys(hut.booking_type for hut in huts):
+            total = Measurement(f"{start}:{end}", Hut("", booking_type, ""))
+            for measurement in season:
+                if measurement.hut.booking_type != booking_type:
+                    continue
+
+                for field in vars(total):
+                    value = getattr(measurement, field)
+                    if isinstance(value, (int, float)):
+                        setattr(total, field, getattr(total, field) + value)
+
+            print(total.row(f"total {booking_type}"))
+
+        measurements.extend(season)
+
+    sys.exit(1 if any(m.num_mismatches for m in measurements) else 0)
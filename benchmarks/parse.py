@@ -0,0 +1,75 @@
+"""
+Benchmarks the HTML parser backends on the saved fixture pages, and checks
+that all backends extract the same results. Run it from the repository
+root, with the root on the module search path for the ``avplanner`` package:
+
+    PYTHONPATH=. python benchmarks/parse.py --repeat 200
+"""
+
+import datetime
+import os
+import sys
+import time
+
+from avplanner import parsers
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+DATE = datetime.date(2026, 7, 10)
+
+PAGES = {
+    "bulky_widget.html": lambda content: parsers.parse_bulky_widget(
+        content, DATE
+    ),
+    "bulky_detail.html": parsers.parse_bulky_detail,
+    "staulanza_month.html": lambda content: parsers.parse_staulanza_month(
+        content, DATE
+    ),
+    "staulanza_detail.html": parsers.parse_staulanza_detail,
+}
+
+
+def _time(parse, content: bytes, repeat: int) -> float:
+    """
+    Returns the mean time in milliseconds to parse the content.
+    """
+    tic = time.perf_counter()
+    for _ in range(repeat):
+        parse(content)
+
+    return (time.perf_counter() - tic) / repeat * 1_000
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--repeat", type=int, default=100, help="Parses per page and backend"
+    )
+    args = parser.parse_args()
+
+    identical = True
+    print(f"{'page':<24}" + "".join(f"{b:>10}" for b in parsers.BACKENDS))
+
+    for page, parse in PAGES.items():
+        with open(os.path.join(FIXTURES, page), "rb") as fh:
+            content = fh.read()
+
+        results, timings = [], []
+        for backend in parsers.BACKENDS:
+            parsers.set_parser_backend(backend)
+            results.append(parse(content))
+            timings.append(_time(parse, content, args.repeat))
+
+        identical &= all(res == results[0] for res in results)
+        speedup = max(timings) / min(timings)
+        print(
+            f"{page:<24}"
+            + "".join(f"{ms:>8.2f}ms" for ms in timings)
+            + f"  ({speedup:.1f}x)"
+        )
+
+    if not identical:
+        print("Backends extracted different results.")
+
+    sys.exit(0 if identical else 1)
@@ -0,0 +1,394 @@
+"""
+Local stand-in for the booking sites of all fetchers. The server answers the
+BookingSuedTirol JSON API, the Bulky widget and hotel pages, and the
+Staulanza calendar and booking pages, rendering each response from recorded
+availability (e.g., ``data/changes.csv``) in the format that the scrapers
+expect. Requests are routed by their Host header, so fetchers run unchanged
+against the server through ``SessionPool(redirects=...)``.
+
+The server can add latency to every response and can enforce a rate limit
+per host, answering excess requests with 429 and a Retry-After header.
+"""
+
+import datetime
+import json
+import math
+import threading
+import time
+from collections import Counter, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, Self
+from urllib.parse import parse_qs, urlsplit
+
+from avplanner.BookingSuedTirol import GUEST_COUNTS
+from avplanner.Hut import Hut
+from avplanner.Storage import ChangeLogStorage, open_storage
+from avplanner.utils import date_range
+
+BOOKINGSUEDTIROL_HOST = "api.bookingsuedtirol.com"
+BULKY_HOST = "{slug}.bukly.com"
+
+# The address that the server listens on.
+SERVER_HOST = "127.0.0.1"
+
+# Each quantity select lists at most this many rooms, so larger counts are
+# spread over several rows, as on the Bulky pages.
+MAX_QUANTITY = 9
+
+Rooms = dict[int | str, int]
+
+
+def load_state(
+    path: str, huts: list[Hut], start: datetime.date, end: datetime.date
+) -> dict[str, dict[datetime.date, Rooms]]:
+    """
+    Loads the latest recorded rooms of each hut and booking date in the
+    range. Dates without records have no availability.
+    """
+    storage = ChangeLogStorage(open_storage(path))
+    state = storage.state_at(datetime.datetime.max, start=start, end=end)
+    storage.close()
+
+    return {
+        hut.name: {
+            date: (
+                Rooms(state[hut.name, date].rooms.items())
+                if (hut.name, date) in state
+                else {}
+            )
+            for date in date_range(start, end)
+        }
+        for hut in huts
+    }
+
+
+def host_of(hut: Hut) -> str:
+    match hut.booking_type:
+        case "bookingsuedtirol":
+            return BOOKINGSUEDTIROL_HOST
+        case "bulky":
+            return BULKY_HOST.format(slug=hut.booking_id)
+        case "staulanza":
+            return urlsplit(hut.booking_id).netloc
+        case _:
+            raise ValueError(f"Unknown hut: {hut.name}")
+
+
+class StandInServer(ThreadingHTTPServer):
+    """
+    Threaded HTTP server that renders the responses of the booking sites
+    from the given availability state.
+
+    Parameters
+    ----------
+    huts
+        The huts to serve.
+    state
+        The rooms of each hut name and booking date, see `load_state`.
+    latency
+        The number of seconds to wait before each response.
+    rate_limit
+        Optional ``(max_calls, period)`` limit per host. Requests beyond the
+        limit are answered with 429.
+    """
+
+    daemon_threads = True
+
+    def __init__(
+        self,
+        huts: list[Hut],
+        state: dict[str, dict[datetime.date, Rooms]],
+        latency: float = 0,
+        rate_limit: Optional[tuple[int, float]] = None,
+    ):
+        super().__init__((SERVER_HOST, 0), _Handler)
+        self.state = state
+        self.latency = latency
+        self.rate_limit = rate_limit
+
+        self.num_requests: Counter[str] = Counter()
+        self.num_throttled: Counter[str] = Counter()
+
+        self._huts: dict[tuple[str, str], Hut] = {}
+        for hut in huts:
+            # Only BookingSuedTirol serves several huts from one host.
+            multi = hut.booking_type == "bookingsuedtirol"
+            self._huts[host_of(hut), hut.booking_id if multi else ""] = hut
+
+        self._calls: dict[str, deque[float]] = {}
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{SERVER_HOST}:{self.server_port}"
+
+    def redirects(self) -> dict[str, str]:
+        """
+        Returns the ``SessionPool`` redirects of all served hosts.
+        """
+        return {host: self.url for host, _ in self._huts}
+
+    def __enter__(self) -> Self:
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
+
+    def throttle(self, host: str) -> Optional[float]:
+        """
+        Registers a request to the host, and returns the number of seconds
+        until the next allowed request if it exceeds the rate limit.
+        """
+        with self._lock:
+            self.num_requests[host] += 1
+            if self.rate_limit is None:
+                return None
+
+            max_calls, period = self.rate_limit
+            calls = self._calls.setdefault(host, deque())
+            now = time.perf_counter()
+            while calls and now - calls[0] >= period:
+                calls.popleft()
+
+            if len(calls) >= max_calls:
+                self.num_throttled[host] += 1
+                return calls[0] + period - now
+
+            calls.append(now)
+            return None
+
+    def respond(
+        self, method: str, host: str, path: str, params: dict[str, str]
+    ) -> tuple[int, str, bytes]:
+        """
+        Returns the status, content type and body of the response.
+        """
+        if host == BOOKINGSUEDTIROL_HOST:
+            # /widgets/v6/properties/<id>/<endpoint>
+            *_, booking_id, endpoint = path.strip("/").split("/")
+            hut = self._huts.get((host, booking_id))
+        else:
+            endpoint = "details" if method == "POST" else path
+            hut = self._huts.get((host, ""))
+
+        if hut is None:
+            return 404, "text/plain", b"Unknown property."
+
+        state = self.state[hut.name]
+        match hut.booking_type:
+            case "bookingsuedtirol":
+                data = _render_bookingsuedtirol(state, endpoint, params)
+                return 200, "application/json", json.dumps(data).encode()
+            case "bulky" if "ajax_widget" in path:
+                day = datetime.date.fromisoformat(params["day"])
+                body = _render_bulky_widget(state, day)
+            case "bulky":
+                # /en-us/hotel/<from>/<to>/
+                day = datetime.date.fromisoformat(path.split("/")[3])
+                body = _render_bulky_detail(state.get(day, {}))
+            case "staulanza" if endpoint == "details":
+                arrival = datetime.datetime.strptime(
+                    params["arrivo"], "%d-%m-%Y"
+                ).date()
+                body = _render_staulanza_detail(
+                    state.get(arrival, {}), int(params["persone"])
+                )
+            case "staulanza":
+                month = int(params["prm"]) - 1  # counts from January 2024
+                first = datetime.date(2024 + month // 12, month % 12 + 1, 1)
+                body = _render_staulanza_month(state, first)
+            case _:
+                return 404, "text/plain", b"Unknown endpoint."
+
+        return 200, "text/html; charset=utf-8", body
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server: StandInServer
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._handle("GET", {})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = parse_qs(self.rfile.read(length).decode())
+        self._handle("POST", {key: vals[0] for key, vals in form.items()})
+
+    def _handle(self, method: str, form: dict[str, str]):
+        host = self.headers.get("Host", "")
+        parts = urlsplit(self.path)
+        params = {key: vals[0] for key, vals in parse_qs(parts.query).items()}
+
+        if (retry := self.server.throttle(host)) is not None:
+            status, content_type, body = 429, "text/plain", b"Slow down."
+            headers = {"Retry-After": str(math.ceil(retry))}
+        else:
+            time.sleep(self.server.latency)
+            status, content_type, body = self.server.respond(
+                method, host, parts.path, params | form
+            )
+            headers = {}
+
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in headers.items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def _render_bookingsuedtirol(
+    state: dict[datetime.date, Rooms], endpoint: str, params: dict[str, str]
+):
+    # Rooms are recorded by size, so each size is served as one room type
+    # whose ID is its size. Rooms for three or more guests are only offered
+    # to parties that fill at least half of them, so that the guest count
+    # pruning is exercised with minimum occupancies above one.
+    if endpoint == "rooms":
+        sizes = sorted({size for rooms in state.values() for size in rooms})
+        return [
+            {
+                "room_id": size,
+                "occupancy": {"min": _min_occupancy(size), "max": size},
+            }
+            for size in sizes
+        ]
+
+    start = datetime.date.fromisoformat(params["from"])
+    end = datetime.date.fromisoformat(params["to"])
+    guest_count = int(params["guestCount"])
+
+    def free(date: datetime.date) -> dict:
+        rooms = state.get(date, {})
+        return {
+            size: num
+            for size, num in rooms.items()
+            if num > 0 and _min_occupancy(size) <= guest_count <= int(size)
+        }
+
+    if endpoint == "availabilities":
+        return [
+            {"date": date.isoformat()}
+            for date in date_range(start, end)
+            if free(date)
+        ]
+
+    return {
+        "rooms": [
+            {"room_id": size, "room_free": num}
+            for size, num in free(start).items()
+        ]
+    }
+
+
+def _min_occupancy(size: int | str) -> int:
+    # Capped at the largest guest count that the fetcher queries, so that
+    # every room can be found.
+    return min((int(size) + 1) // 2, max(GUEST_COUNTS))
+
+
+def _page(title: str, body: str) -> bytes:
+    """
+    Wraps the body in a page with navigation and text, like the real pages.
+    """
+    nav = "".join(
+        f'<li class="menu-item"><a href="/page{idx}.php">Page {idx}</a></li>'
+        for idx in range(40)
+    )
+    text = "<p>" + "Lorem ipsum dolor sit amet, consectetur. " * 40 + "</p>"
+    return (
+        f'<!DOCTYPE html><html><head><meta charset="utf-8">'
+        f"<title>{title}</title></head><body>"
+        f'<header><ul class="menu">{nav}</ul></header>'
+        f"<main>{text * 10}{body}{text * 10}</main></body></html>"
+    ).encode()
+
+
+def _render_bulky_widget(
+    state: dict[datetime.date, Rooms], start: datetime.date
+) -> bytes:
+    dates = date_range(start, start + datetime.timedelta(days=14))
+    sizes = sorted({size for rooms in state.values() for size in rooms})
+
+    header = "".join(
+        f'<th><span class="day">{date.day}</span>'
+        f'<span class="month">{date:%b}</span></th>'
+        for date in dates
+    )
+    rows = "".join(
+        f'<tr><td class="name">Room for {size}</td>'
+        + "".join(
+            f"<td>{state.get(date, {}).get(size) or ''}</td>" for date in dates
+        )
+        + "</tr>"
+        for size in sizes
+    )
+    return (
+        f'<div class="widget"><table><tr><th></th>{header}</tr>{rows}'
+        "</table></div>"
+    ).encode()
+
+
+def _render_bulky_detail(rooms: Rooms) -> bytes:
+    # Size one stands for beds that are booked individually.
+    subs = []
+    for size, num in rooms.items():
+        unit = "bed" if size == 1 else "room"
+        while num > 0:
+            qty = min(num, MAX_QUANTITY)
+            num -= qty
+            options = "".join(
+                f'<option value="{val}">{val} {unit}s</option>'
+                for val in range(qty + 1)
+            )
+            subs.append(
+                '<div class="hotel-room__sub">'
+                f'<h4 class="hotel-room__sub-title">Room for {size}</h4>'
+                f'<input type="hidden" name="rooms[{size}][beds]" '
+                f'value="{size}"><select name="rooms[{size}][qty]">'
+                f"{options}</select></div>"
+            )
+
+    return _page("Hotel", f"<form>{''.join(subs)}</form>")
+
+
+def _render_staulanza_month(
+    state: dict[datetime.date, Rooms], first: datetime.date
+) -> bytes:
+    days = []
+    date = first
+    while date.month == first.month:
+        available = any(state.get(date, {}).values())
+        cls = "libero" if available else "completo"
+        days.append(f'<td class="{cls}">{date.day}</td>')
+        date += datetime.timedelta(days=1)
+
+    rows = "".join(
+        f"<tr>{''.join(days[idx : idx + 7])}</tr>"
+        for idx in range(0, len(days), 7)
+    )
+    calendar = f'<div class="disponibilita"><table>{rows}</table></div>'
+    return _page("Disponibilità", calendar)
+
+
+def _render_staulanza_detail(rooms: Rooms, persone: int) -> bytes:
+    # A room is offered as long as the party fits in its free places.
+    offered = "".join(
+        f'<div class="quadroCamere"><p>{name}</p><select name="camera">'
+        + "".join(
+            f'<option value="{val}">{val}</option>' for val in range(num + 1)
+        )
+        + "</select></div>"
+        for name, num in rooms.items()
+        if num >= persone
+    )
+    return _page("Prenotazione", f"<form>{offered}</form>")
@@ -0,0 +1,91 @@
+"""
+Compares the batched detail queries of `BookingSuedTirol` with the original
+strategy that queries the details of every date for every guest count with
+availability:
+
+    python scripts/compare_detail_strategies.py 12345 \
+        --start 2025-07-01 --end 2025-07-31
+
+Both strategies are run against the live API, each with a fresh session pool
+and without caches, and the number of requests, the wall time and whether
+the results are identical are reported. Exits with status 1 if the results
+of any property differ.
+"""
+
+import datetime
+import sys
+import time
+
+from avplanner import BookingSuedTirol, transport
+from avplanner.AvailabilityFetcher import Result
+from avplanner.RangePlanner import RangePlanner, set_range_planner
+from avplanner.SessionPool import SessionPool
+
+
+def _run(
+    booking_id: str,
+    start: datetime.date,
+    end: datetime.date,
+    batch_details: bool,
+) -> tuple[dict[datetime.date, Result], int, float]:
+    pool = SessionPool()
+    transport.set_session_pool(pool)
+    set_range_planner(RangePlanner())
+
+    fetcher = BookingSuedTirol(booking_id, batch_details=batch_details)
+    tic = time.perf_counter()
+    results = fetcher.get_availability(start, end)
+    elapsed = time.perf_counter() - tic
+
+    num_requests = sum(stats.num_requests for stats in pool.stats().values())
+    pool.close()
+
+    return results, num_requests, elapsed
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "booking_ids", type=str, nargs="+", help="Property IDs to compare"
+    )
+    parser.add_argument(
+        "--start",
+        type=lambda s: datetime.datetime.strptime(s, "%Y-%m-%d").date(),
+        required=True,
+        help="Start date in YYYY-MM-DD format",
+    )
+    parser.add_argument(
+        "--end",
+        type=lambda s: datetime.datetime.strptime(s, "%Y-%m-%d").date(),
+        required=True,
+        help="End date in YYYY-MM-DD format",
+    )
+    args = parser.parse_args()
+
+    identical = True
+    for booking_id in args.booking_ids:
+        per_day, per_day_requests, per_day_time = _run(
+            booking_id, args.start, args.end, batch_details=False
+        )
+        batched, batched_requests, batched_time = _run(
+            booking_id, args.start, args.end, batch_details=True
+        )
+
+        mismatches = [
+            date
+            for date in sorted(per_day.keys() | batched.keys())
+            if per_day.get(date) != batched.get(date)
+        ]
+        identical &= not mismatches
+
+        print(
+            f"{booking_id}: per-day {per_day_requests} requests "
+            f"({per_day_time:.1f}s), batched {batched_requests} requests "
+            f"({batched_time:.1f}s), {len(mismatches)} mismatching dates."
+        )
+        for date in mismatches:
+            print(f"  {date}: {per_day.get(date)} != {batched.get(date)}")
+
+    sys.exit(0 if identical else 1)
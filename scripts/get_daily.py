@@ -1,95 +1,459 @@
-import csv
 import datetime
-from dataclasses import dataclass
+import logging
+import queue
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from typing import Generator, Iterator, Optional
 
-from avplanner import AvailabilityFetcher, BookingSuedTirol, Bulky, Staulanza
+from avplanner import transport
+from avplanner.AvailabilityFetcher import Result
+from avplanner.Checkpoint import Checkpoint
+from avplanner.FetcherRegistry import get_fetcher, get_fetcher_registry
+from avplanner.HTTPCache import HTTPCache
+from avplanner.History import History
+from avplanner.Hut import Hut
+from avplanner.Hut import load_huts as _load_huts
+from avplanner.Metrics import get_metrics, hut_label
+from avplanner.ResultCache import ResultCache
+from avplanner.Scheduler import Scheduler
+from avplanner.SessionPool import SessionPool
+from avplanner.Storage import (
+    Availability,
+    ChangeLogStorage,
+    Storage,
+    open_storage,
+)
+from avplanner.utils import date_range
 
 
-@dataclass
-class Hut:
-    name: str
-    booking_type: str
-    booking_id: str
+def load_huts() -> list[Hut]:
+    """
+    Loads the huts whose booking type has a registered fetcher.
+    """
+    return _load_huts("data/huts.csv", get_fetcher_registry().booking_types())
 
 
-@dataclass
-class Availability:
-    hut_name: str
-    fetch_datetime: datetime.datetime
-    booking_date: datetime.date
-    num_available: int
-    rooms: dict[int, int]
+def _iter_hut(
+    hut: Hut,
+    start: datetime.date,
+    end: datetime.date,
+    cache: ResultCache,
+    schedule: Optional[dict[str, list[datetime.date]]] = None,
+) -> Generator[tuple[datetime.date, Result], None, None]:
+    """
+    Yields the availability of each date of the hut as soon as it is fetched.
+    """
+    fetcher = get_fetcher(hut)
+    with hut_label(hut.name):
+        if schedule is None:
+            yield from fetcher.iter_availability(start, end, cache)
+            return
 
+        # Only fetch the scheduled dates: the fetcher skips all dates that
+        # are present in the (read-only) dictionary cache.
+        dates = [date for date in schedule[hut.name] if start <= date <= end]
+        if not dates:
+            return
 
-def _get_fetcher(hut: Hut) -> AvailabilityFetcher:
-    match hut.booking_type:
-        case "bulky":
-            return Bulky(hut.booking_id)
-        case "staulanza":
-            return Staulanza(hut.booking_id)
-        case "bookingsuedtirol":
-            return BookingSuedTirol(hut.booking_id)
-        case _:
-            raise ValueError(f"Unknown hut: {hut.name}")
-
-
-def load_huts():
-    LOC = "data/huts.csv"
-    huts = []
-    with open(LOC, "r") as fh:
-        reader = csv.DictReader(fh)
-        for row in reader:
-            if row["booking_type"] not in [
-                "staulanza",
-                "bookingsuedtirol",
-                "bulky",
-            ]:
+        skip = {
+            date: Result({"num_available": 0, "rooms": {}})
+            for date in date_range(dates[0], dates[-1])
+        }
+        for date in dates:
+            del skip[date]
+
+        for date, result in fetcher.iter_availability(
+            dates[0], dates[-1], skip
+        ):
+            if date not in skip:
+                yield date, result
+
+
+WorkUnit = tuple[Hut, datetime.date, datetime.date]
+
+# A fetched date of a work unit, or the end of the unit with its error (if
+# any) when the date is None.
+Event = tuple[WorkUnit, Optional[datetime.date], Result | Exception | None]
+
+
+def _work_units(
+    huts: list[Hut],
+    start: datetime.date,
+    end: datetime.date,
+    chunk_days: Optional[int] = None,
+) -> list[WorkUnit]:
+    """
+    Splits the crawl into work units of a hut and a date range of at most
+    ``chunk_days`` days. Defaults to one unit per hut.
+    """
+    chunk = datetime.timedelta(days=chunk_days or (end - start).days + 1)
+    units = []
+    for hut in huts:
+        current = start
+        while current <= end:
+            last = min(current + chunk - datetime.timedelta(days=1), end)
+            units.append((hut, current, last))
+            current = last + datetime.timedelta(days=1)
+
+    return units
+
+
+def _unit_key(unit: WorkUnit) -> tuple[str, datetime.date, datetime.date]:
+    hut, first, last = unit
+    return hut.name, first, last
+
+
+def _iter_units(
+    units: list[WorkUnit],
+    cache: ResultCache,
+    schedule: Optional[dict[str, list[datetime.date]]],
+) -> Iterator[Event]:
+    """
+    Fetches the availability of each work unit one after another. A unit
+    that raises is stopped, and its end is yielded with the error.
+    """
+    for unit in units:
+        try:
+            with closing(_iter_hut(*unit, cache, schedule)) as results:
+                for date, result in results:
+                    yield unit, date, result
+        except Exception as e:
+            yield unit, None, e
+        else:
+            yield unit, None, None
+
+
+def _stream_unit(
+    unit: WorkUnit,
+    cache: ResultCache,
+    schedule: Optional[dict[str, list[datetime.date]]],
+    timeout: Optional[float],
+    deadlines: dict[tuple, float],
+    events: queue.SimpleQueue[Event],
+):
+    deadline = time.monotonic() + timeout if timeout is not None else None
+    if deadline is not None:
+        deadlines[_unit_key(unit)] = deadline
+
+    try:
+        with closing(_iter_hut(*unit, cache, schedule)) as results:
+            for date, result in results:
+                events.put((unit, date, result))
+                # The consumer already gave up on the unit.
+                if deadline is not None and time.monotonic() > deadline:
+                    raise TimeoutError
+
+        events.put((unit, None, None))
+    except Exception as e:
+        events.put((unit, None, e))
+
+
+def _crawl(
+    units: list[WorkUnit],
+    cache: ResultCache,
+    schedule: Optional[dict[str, list[datetime.date]]],
+    workers: int,
+    timeout: Optional[float],
+) -> Iterator[Event]:
+    """
+    Fetches the availability of each work unit using a pool of worker
+    threads and yields each date as soon as any worker fetched it. Each
+    fetcher keeps its own rate limits, so huts on different hosts run in
+    parallel. A unit that raises is stopped, and its end is yielded with the
+    error. A unit that runs longer than ``timeout`` seconds after a worker
+    started it is yielded as timed out at its deadline, even if its worker
+    still waits for a response, and the dates that the worker fetches
+    afterwards are dropped.
+    """
+    events: queue.SimpleQueue[Event] = queue.SimpleQueue()
+    # Deadline of each started unit; set by the workers.
+    deadlines: dict[tuple, float] = {}
+    executor = ThreadPoolExecutor(max_workers=workers)
+    for unit in units:
+        executor.submit(
+            _stream_unit, unit, cache, schedule, timeout, deadlines, events
+        )
+
+    by_key = {_unit_key(unit): unit for unit in units}
+    ended: set[tuple] = set()
+    try:
+        while len(ended) < len(units):
+            now = time.monotonic()
+            running = {
+                key: deadline
+                for key, deadline in list(deadlines.items())
+                if key not in ended
+            }
+            expired = [key for key, at in running.items() if at <= now]
+            for key in expired:
+                ended.add(key)
+                yield by_key[key], None, TimeoutError()
+
+            if expired:
                 continue
 
-            hut = Hut(
-                name=row["name"],
-                booking_type=row["booking_type"],
-                booking_id=row["booking_id"],
-            )
-            huts.append(hut)
+            # Units without a deadline yet are checked again every second.
+            wait: Optional[float] = None
+            if timeout is not None:
+                wait = min(running.values(), default=now + 1) - now
+
+            try:
+                event = events.get(timeout=wait)
+            except queue.Empty:
+                continue
 
-    return huts
+            key = _unit_key(event[0])
+            if key in ended:
+                continue
+
+            if event[1] is None:
+                ended.add(key)
 
+            yield event
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
 
-def get_daily(start: datetime.date, end: datetime.date, cache=None):
+
+def get_daily(
+    start: datetime.date,
+    end: datetime.date,
+    storage: Storage,
+    cache: Optional[ResultCache] = None,
+    workers: int = 1,
+    timeout: Optional[float] = None,
+    schedule: Optional[dict[str, list[datetime.date]]] = None,
+    checkpoint: Optional[Checkpoint] = None,
+    chunk_days: Optional[int] = None,
+) -> int:
     """
-    Get the availability for all huts.
+    Get the availability for all huts and write it to the storage. The
+    records of each work unit are written in date order, and the units are
+    written in order, so the output does not depend on which worker finishes
+    first. Records of the earliest unfinished unit are written as soon as
+    all earlier dates of the unit arrived; records of later units wait for
+    it. Memory use thus grows with the dates that arrive out of order and
+    the date range of the units in flight behind the earliest one, not with
+    the number of huts; use ``chunk_days`` to bound it.
+
+    Parameters
+    ----------
+    start
+        The start date of the date range.
+    end
+        The end date of the date range (inclusive).
+    storage
+        The storage in which the availability records are written.
+    cache
+        Cache of previously fetched results that is shared by all fetchers.
+        Dates with fresh results are not fetched again. Defaults to an empty
+        cache.
+    workers
+        The number of work units to fetch concurrently. The default of one
+        fetches the units one after another.
+    timeout
+        The number of seconds after which a work unit is given up when
+        fetching concurrently. The dates that it fetched until then are
+        still written. Ignored when ``workers`` is one.
+    schedule
+        Dates to fetch per hut name, e.g., as selected by a `Scheduler`. If
+        given, only these dates are fetched, and huts without scheduled dates
+        are skipped. Defaults to all dates of all huts.
+    checkpoint
+        If given, work units that the checkpoint marks as done are skipped,
+        and each unit is marked as done once all its records are written.
+        The records use the fetch datetime of the checkpoint, so a resumed
+        run writes the same records as an uninterrupted run.
+    chunk_days
+        The maximum number of days of a work unit. Defaults to one unit per
+        hut with the full date range.
+
+    Returns
+    -------
+    int
+        The number of records written.
     """
-    availabilities = []
-    today = datetime.datetime.today()
+    today = (
+        checkpoint.fetch_datetime
+        if checkpoint is not None
+        else datetime.datetime.today()
+    )
+    huts = load_huts()
+    cache = cache if cache is not None else ResultCache()
+
+    if schedule is not None:
+        huts = [hut for hut in huts if schedule.get(hut.name)]
 
-    for hut in load_huts():
-        fetcher = _get_fetcher(hut)
-        cache = cache if cache else {}
-        results = fetcher.get_availability(start, end, cache)
+    units = _work_units(huts, start, end, chunk_days)
+    if checkpoint is not None:
+        units = [
+            (hut, first, last)
+            for hut, first, last in units
+            if not checkpoint.is_done(hut.name, first, last)
+        ]
 
-        for booking_date, result in results.items():
-            num_avail = result["num_available"]
-            rooms = result["rooms"]
-            availabilities.append(
-                Availability(hut.name, today, booking_date, num_avail, rooms)
+    if workers > 1:
+        events = _crawl(units, cache, schedule, workers, timeout)
+    else:
+        events = _iter_units(units, cache, schedule)
+
+    num_records = 0
+    buffers: dict[tuple, _ReorderBuffer] = {}
+    ended: dict[tuple, tuple[WorkUnit, Optional[Exception]]] = {}
+    order = [_unit_key(unit) for unit in units]
+    position = 0
+    for unit, booking_date, result in events:
+        key = _unit_key(unit)
+        if key not in buffers:
+            buffers[key] = _ReorderBuffer(_expected_dates(unit, schedule))
+
+        if booking_date is not None and isinstance(result, dict):
+            buffers[key].add(
+                Availability(
+                    unit[0].name,
+                    today,
+                    booking_date,
+                    result["num_available"],
+                    result["rooms"],
+                )
             )
+        else:
+            error = result if isinstance(result, Exception) else None
+            ended[key] = (unit, error)
+
+        # Units are written in order: ended units in full, and the earliest
+        # unit that has not ended up to its first missing date. Later units
+        # wait for it.
+        while position < len(order):
+            key = order[position]
+            if key not in ended:
+                if key in buffers:
+                    num_records += _write(storage, buffers[key].pop_ready())
+                break
+
+            buffer = buffers.pop(key)
+            num_records += _write(storage, buffer.pop_all())
+            _end_unit(*ended.pop(key), buffer, checkpoint)
+            position += 1
+
+    return num_records
+
+
+def _expected_dates(
+    unit: WorkUnit, schedule: Optional[dict[str, list[datetime.date]]]
+) -> list[datetime.date]:
+    """
+    Returns the dates that the work unit fetches, in date order.
+    """
+    hut, first, last = unit
+    if schedule is None:
+        return date_range(first, last)
+
+    return sorted(date for date in schedule[hut.name] if first <= date <= last)
+
+
+class _ReorderBuffer:
+    """
+    Reorders the records of a work unit, which fetchers yield as soon as
+    they resolve, into date order. Records are held until all earlier
+    expected dates arrived, so a unit whose dates arrive in order is not
+    buffered at all.
 
-        num_days = len(results)
-        num_avail = sum(res["num_available"] > 0 for res in results.values())
-        print(
-            f"Processed {hut.name} ({hut.booking_type}): "
-            f"{num_avail}/{num_days} days available."
+    Parameters
+    ----------
+    dates
+        The expected booking dates of the unit, in date order.
+    """
+
+    def __init__(self, dates: list[datetime.date]):
+        self._dates = dates
+        self._next = 0
+        self._pending: dict[datetime.date, Availability] = {}
+        self.num_records = 0
+        self.num_available = 0
+
+    def add(self, record: Availability):
+        self._pending[record.booking_date] = record
+
+    def pop_ready(self) -> list[Availability]:
+        """
+        Removes and returns the records of the expected dates up to the
+        first date that did not arrive yet.
+        """
+        ready = []
+        while (
+            self._next < len(self._dates)
+            and self._dates[self._next] in self._pending
+        ):
+            ready.append(self._pending.pop(self._dates[self._next]))
+            self._next += 1
+
+        return self._count(ready)
+
+    def pop_all(self) -> list[Availability]:
+        """
+        Removes and returns all records in date order, skipping the expected
+        dates that did not arrive, e.g., as the unit failed.
+        """
+        ready = sorted(
+            self._pending.values(), key=lambda record: record.booking_date
+        )
+        self._pending.clear()
+        self._next = len(self._dates)
+        return self._count(ready)
+
+    def _count(self, records: list[Availability]) -> list[Availability]:
+        self.num_records += len(records)
+        self.num_available += sum(
+            record.num_available > 0 for record in records
         )
+        return records
+
+
+def _write(storage: Storage, records: list[Availability]) -> int:
+    if records:
+        storage.write(records)
+
+    return len(records)
 
-    return availabilities
+
+def _end_unit(
+    unit: WorkUnit,
+    error: Optional[Exception],
+    buffer: _ReorderBuffer,
+    checkpoint: Optional[Checkpoint],
+):
+    """
+    Reports an ended work unit whose records are all written, and marks it
+    as done if it did not fail.
+    """
+    hut, first, last = unit
+    match error:
+        case TimeoutError():
+            print(f"Timed out {hut.name} ({hut.booking_type}).")
+        case Exception():
+            print(f"Failed {hut.name} ({hut.booking_type}): {error}")
+        case _:
+            if checkpoint is not None:
+                checkpoint.mark_done(hut.name, first, last)
+
+            print(
+                f"Processed {hut.name} ({hut.booking_type}) {first} to "
+                f"{last}: {buffer.num_available}/{buffer.num_records} days "
+                "available."
+            )
 
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser()
-    parser.add_argument("--out", type=str, default="data/daily.csv")
+    parser.add_argument(
+        "--out",
+        type=str,
+        default="data/daily.csv",
+        help="Output path; use a .sqlite or .db suffix for SQLite storage",
+    )
     parser.add_argument(
         "--start",
         type=lambda s: datetime.datetime.strptime(s, "%Y-%m-%d").date(),
@@ -102,11 +466,129 @@ if __name__ == "__main__":
         required=True,
         help="End date in YYYY-MM-DD format",
     )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Number of huts to fetch concurrently",
+    )
+    parser.add_argument(
+        "--timeout",
+        type=float,
+        default=None,
+        help="Seconds to wait for a single hut when fetching concurrently",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=str,
+        default=None,
+        help="Path of a persistent HTTP response cache (SQLite) to reuse",
+    )
+    parser.add_argument(
+        "--changes-only",
+        action="store_true",
+        help="Only store records that changed since the previous fetch",
+    )
+    parser.add_argument(
+        "--budget",
+        type=float,
+        default=None,
+        help="Request budget; only refresh the highest-priority dates based "
+        "on the history in --out",
+    )
+    parser.add_argument(
+        "--request-timeout",
+        type=float,
+        default=60,
+        help="Seconds to wait for a single HTTP response",
+    )
+    parser.add_argument(
+        "--metrics",
+        type=str,
+        default=None,
+        help="Path of the metrics summary; use a .prom suffix for the "
+        "Prometheus text format, and JSON otherwise",
+    )
+    parser.add_argument(
+        "--fetcher-config",
+        type=str,
+        default=None,
+        help="JSON file with the fetcher options of each booking type and "
+        "hut, e.g., rate limits or guest counts",
+    )
+    parser.add_argument(
+        "--run-id",
+        type=str,
+        default=None,
+        help="Checkpoint the run under this ID; rerunning with the same ID "
+        "skips the work that was already completed",
+    )
+    parser.add_argument(
+        "--chunk-days",
+        type=int,
+        default=None,
+        help="Maximum number of days per checkpointed work unit",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Log every request, rate limiter wait and parse as JSON to "
+        "stderr",
+    )
     args = parser.parse_args()
 
+    if args.trace:
+        logging.basicConfig(format="%(message)s")
+        logging.getLogger("avplanner.Metrics").setLevel(logging.DEBUG)
+
+    if args.fetcher_config:
+        get_fetcher_registry().load_config(args.fetcher_config)
+
+    pool = SessionPool(timeout=(10, args.request_timeout))
+    transport.set_session_pool(pool)
+
+    if args.http_cache:
+        transport.set_http_cache(HTTPCache(args.http_cache))
+
     start = max(args.start, datetime.date.today())  # no later than today
-    availabilities = get_daily(start, args.end)
-    with open(args.out, "a") as fh:
-        writer = csv.DictWriter(fh, fieldnames=Availability.__annotations__)
-        for availability in availabilities:
-            writer.writerow(availability.__dict__)
+    storage = open_storage(args.out, args.changes_only)
+
+    schedule = None
+    if args.budget is not None:
+        last_fetched = None
+        if isinstance(storage, ChangeLogStorage):
+            last_fetched = storage.last_fetched()
+
+        scheduler = Scheduler(
+            History.from_storage(storage, start, args.end),
+            last_fetched=last_fetched,
+        )
+        schedule = scheduler.schedule(
+            load_huts(), start, args.end, args.budget
+        )
+
+    checkpoint = None
+    if args.run_id is not None:
+        checkpoint = Checkpoint.for_run(args.out, args.run_id)
+        print(f"Run {args.run_id}: {len(checkpoint)} work units done.")
+
+    # Records are written as soon as each work unit ends.
+    num_records = get_daily(
+        start,
+        args.end,
+        storage,
+        None,
+        args.workers,
+        args.timeout,
+        schedule,
+        checkpoint,
+        args.chunk_days,
+    )
+    print(f"Wrote {num_records} records.")
+    storage.close()
+
+    for host, stats in sorted(pool.stats().items()):
+        print(f"{host}: {stats}")
+
+    if args.metrics:
+        get_metrics().write(args.metrics)
@@ -0,0 +1,34 @@
+"""
+Copies all availability records from one storage to another, e.g., to
+migrate the CSV history to SQLite:
+
+    python scripts/migrate_storage.py data/daily.csv data/daily.sqlite
+
+or to a change log that only keeps records that differ from the previous
+fetch:
+
+    python scripts/migrate_storage.py data/daily.csv data/changes.csv \
+        --changes-only
+"""
+
+from avplanner.Storage import open_storage
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("source", type=str, help="Storage to read from")
+    parser.add_argument("target", type=str, help="Storage to write to")
+    parser.add_argument(
+        "--changes-only",
+        action="store_true",
+        help="Only write records that changed since the previous fetch",
+    )
+    args = parser.parse_args()
+
+    source = open_storage(args.source)
+    target = open_storage(args.target, args.changes_only)
+    target.write(source.read())
+
+    source.close()
+    target.close()
@@ -0,0 +1,155 @@
+"""
+Watches dates at huts and reports when they become available or sold out,
+e.g., to catch cancellations:
+
+    python scripts/watch.py --watch "Rifugio Lagazuòi:2025-07-12:2" \
+        --watchlist data/watchlist.csv --out data/watch.jsonl
+
+A watchlist is a CSV file with the columns ``hut_name``, ``date`` (in
+YYYY-MM-DD format) and ``party_size``. Events are printed, and appended as
+JSON lines to ``--out`` and posted to ``--webhook`` if given.
+"""
+
+import contextlib
+import csv
+import datetime
+import logging
+
+from avplanner import transport
+from avplanner.FetcherRegistry import get_fetcher, get_fetcher_registry
+from avplanner.HTTPCache import HTTPCache
+from avplanner.Hut import load_huts
+from avplanner.SessionPool import SessionPool
+from avplanner.Watcher import (
+    FileSink,
+    Sink,
+    StdoutSink,
+    WatchItem,
+    Watcher,
+    WebhookSink,
+)
+
+
+def _parse_item(value: str) -> WatchItem:
+    hut_name, date, party_size = value.rsplit(":", 2)
+    return WatchItem(
+        hut_name, datetime.date.fromisoformat(date), int(party_size)
+    )
+
+
+def load_watchlist(path: str) -> list[WatchItem]:
+    with open(path, "r") as fh:
+        return [
+            WatchItem(
+                row["hut_name"],
+                datetime.date.fromisoformat(row["date"]),
+                int(row.get("party_size") or 1),
+            )
+            for row in csv.DictReader(fh)
+        ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--watchlist",
+        type=str,
+        default=None,
+        help="CSV file with the columns hut_name, date and party_size",
+    )
+    parser.add_argument(
+        "--watch",
+        type=_parse_item,
+        action="append",
+        default=[],
+        help="Date to watch in HUT:YYYY-MM-DD:PARTY_SIZE format; repeatable",
+    )
+    parser.add_argument(
+        "--out",
+        type=str,
+        default=None,
+        help="Append events as JSON lines to this path",
+    )
+    parser.add_argument(
+        "--webhook",
+        type=str,
+        default=None,
+        help="Post events as JSON to this URL",
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=None,
+        help="Seconds to watch for; watches until interrupted by default",
+    )
+    parser.add_argument(
+        "--min-interval",
+        type=float,
+        default=60,
+        help="Minimum seconds between polls of a hut, on top of the rate "
+        "limits",
+    )
+    parser.add_argument(
+        "--fetcher-config",
+        type=str,
+        default=None,
+        help="JSON file with the fetcher options of each booking type and "
+        "hut, e.g., rate limits or guest counts",
+    )
+    parser.add_argument(
+        "--http-cache",
+        type=str,
+        default=None,
+        help="Path of a persistent HTTP response cache (SQLite) to reuse",
+    )
+    parser.add_argument(
+        "--trace",
+        action="store_true",
+        help="Log every request, rate limiter wait and parse as JSON to "
+        "stderr",
+    )
+    args = parser.parse_args()
+
+    if args.trace:
+        logging.basicConfig(format="%(message)s")
+        logging.getLogger("avplanner.Metrics").setLevel(logging.DEBUG)
+
+    registry = get_fetcher_registry()
+    if args.fetcher_config:
+        registry.load_config(args.fetcher_config)
+
+    transport.set_session_pool(SessionPool())
+    if args.http_cache:
+        transport.set_http_cache(HTTPCache(args.http_cache))
+
+    items = list(args.watch)
+    if args.watchlist:
+        items += load_watchlist(args.watchlist)
+    if not items:
+        parser.error("nothing to watch; pass --watch or --watchlist")
+
+    huts = {
+        hut.name: hut
+        for hut in load_huts(booking_types=registry.booking_types())
+    }
+    for item in items:
+        if item.hut_name not in huts:
+            parser.error(f"unknown hut: {item.hut_name}")
+
+    sinks: list[Sink] = [StdoutSink()]
+    if args.out:
+        sinks.append(FileSink(args.out))
+    if args.webhook:
+        sinks.append(WebhookSink(args.webhook))
+
+    fetchers = {
+        name: get_fetcher(huts[name])
+        for name in dict.fromkeys(item.hut_name for item in items)
+    }
+    watcher = Watcher(fetchers, items, sinks, args.min_interval)
+    with contextlib.suppress(KeyboardInterrupt):
+        watcher.run(args.duration)
+
+    print(f"Polled {watcher.num_polls} times.")
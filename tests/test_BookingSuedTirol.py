@@ -0,0 +1,171 @@
+import itertools
+import json
+import os
+import random
+
+import pytest
+
+from avplanner.BookingSuedTirol import (
+    GLOBAL_SPAN,
+    BookingSuedTirol,
+    _covering_guest_counts,
+    _implies,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _load_offers() -> tuple[dict[int, tuple[int, int]], dict[int, dict]]:
+    """
+    Loads the room types and the offers per guest count of a property with
+    rooms whose occupancy range does not start at one, in the format of the
+    rooms and offers endpoints.
+    """
+    path = os.path.join(FIXTURES, "bookingsuedtirol_offers.json")
+    with open(path, "r") as fh:
+        data = json.load(fh)
+
+    occupancy = {
+        room["room_id"]: (
+            room["occupancy"].get("min", 1),
+            room["occupancy"]["max"],
+        )
+        for room in data["rooms"]
+    }
+    offers = {
+        int(count): {
+            room["room_id"]: room["room_free"] for room in offer["rooms"]
+        }
+        for count, offer in data["offers"].items()
+    }
+    return occupancy, offers
+
+
+def _offered(
+    count: int, occupancy: dict[int, tuple[int, int]], free: dict[int, int]
+) -> dict[int, int]:
+    """
+    Returns the offers for the guest count: the free rooms whose occupancy
+    range contains it.
+    """
+    return {
+        room: free[room]
+        for room, (low, high) in occupancy.items()
+        if low <= count <= high and free[room]
+    }
+
+
+def _random_property(rng: random.Random, max_count: int = 8):
+    occupancy = {}
+    for room in range(rng.randint(1, 6)):
+        low = rng.randint(1, max_count)
+        occupancy[room] = (low, rng.randint(low, max_count))
+
+    free = {room: rng.choice([0, 0, 1, 2]) for room in occupancy}
+    return occupancy, free
+
+
+def test_fixture_offers_match_occupancy():
+    occupancy, offers = _load_offers()
+    free = {room: 0 for room in occupancy}
+    for offer in offers.values():
+        free.update(offer)
+
+    for count, offer in offers.items():
+        assert offer == _offered(count, occupancy, free)
+
+
+def test_covering_guest_counts_returns_all_offered_rooms():
+    occupancy, offers = _load_offers()
+    candidates = [count for count, offer in offers.items() if offer]
+    selected = _covering_guest_counts(candidates, list(occupancy.values()))
+
+    assert set(selected) <= set(candidates)
+
+    expected: dict[int, int] = {}
+    for count in candidates:
+        expected |= offers[count]
+
+    found: dict[int, int] = {}
+    for count in selected:
+        found |= offers[count]
+
+    assert found == expected
+
+
+def test_covering_guest_counts_rooms_without_single_occupancy():
+    # Only rooms for three or more guests, none of which fit one guest.
+    occupancy = [(3, 6), (5, 8), (4, 4)]
+    assert _covering_guest_counts([1, 2], occupancy) == []
+    assert _covering_guest_counts([3, 4, 5, 6], occupancy) == [4, 6]
+    assert _covering_guest_counts([5, 6, 7, 8], occupancy) == [6]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_covering_guest_counts_is_minimal_cover(seed: int):
+    rng = random.Random(seed)
+    occupancy, _ = _random_property(rng)
+    ranges = list(occupancy.values())
+    candidates = sorted(rng.sample(range(1, 9), rng.randint(1, 8)))
+
+    def covers(counts) -> bool:
+        return all(
+            any(low <= count <= high for count in counts)
+            for low, high in ranges
+            if any(low <= count <= high for count in candidates)
+        )
+
+    selected = _covering_guest_counts(candidates, ranges)
+    assert set(selected) <= set(candidates)
+    assert covers(selected)
+
+    smallest = next(
+        size
+        for size in range(len(candidates) + 1)
+        if any(
+            covers(subset)
+            for subset in itertools.combinations(candidates, size)
+        )
+    )
+    assert len(selected) == smallest
+
+
+def test_implies():
+    occupancy = [(1, 2), (2, 4), (3, 6)]
+    assert not _implies(1, 2, occupancy)  # (2, 4) does not fit one guest
+    assert _implies(2, 2, occupancy)
+    assert not _implies(2, 3, occupancy)  # (3, 6) does not fit two guests
+    assert _implies(3, 4, occupancy)
+    assert _implies(3, 6, occupancy)
+    assert _implies(1, 7, occupancy)  # no room fits seven guests
+
+
+def test_implies_fixture():
+    occupancy, offers = _load_offers()
+    ranges = list(occupancy.values())
+    for smaller, larger in itertools.combinations(sorted(offers), 2):
+        if _implies(smaller, larger, ranges) and offers[larger]:
+            assert offers[smaller]
+
+
+@pytest.mark.parametrize("seed", range(200))
+def test_implies_availability(seed: int):
+    # If the smaller guest count has no offers, neither has the larger one.
+    rng = random.Random(seed)
+    occupancy, free = _random_property(rng)
+    ranges = list(occupancy.values())
+
+    for smaller, larger in itertools.combinations(range(1, 9), 2):
+        if not _implies(smaller, larger, ranges):
+            continue
+
+        if _offered(larger, occupancy, free):
+            assert _offered(smaller, occupancy, free)
+
+
+@pytest.mark.parametrize("global_span", [0, GLOBAL_SPAN + 1])
+def test_global_span_is_validated(global_span: int):
+    # Invalid spans are rejected before the rate limiters of the property,
+    # which are shared by all of its fetchers, are created.
+    with pytest.raises(ValueError, match="Global span"):
+        BookingSuedTirol(90001, global_span=global_span)
@@ -0,0 +1,52 @@
+import json
+
+from avplanner import FetcherRegistry as registry_module
+from avplanner.AvailabilityFetcher import AvailabilityFetcher
+from avplanner.FetcherRegistry import FetcherRegistry, get_fetcher
+from avplanner.Hut import Hut
+
+
+class OptionsFetcher(AvailabilityFetcher):
+    def __init__(self, booking_id: str, **options):
+        self._booking_id = booking_id
+        self.options = options
+
+    async def aiter_availability(self, start, end, cache=None):
+        return
+        yield
+
+
+FANES = Hut("Rifugio Fanes", "fake", "1")
+LAVAREDO = Hut("Rifugio Lavaredo", "fake", "2")
+
+
+def test_hut_options_override_booking_type_options(tmp_path, monkeypatch):
+    path = tmp_path / "fetchers.json"
+    path.write_text(
+        json.dumps(
+            {
+                "fake": {"guest_counts": [1, 2, 3], "batch_details": True},
+                "huts": {"Rifugio Fanes": {"guest_counts": [2, 4, 6]}},
+            }
+        )
+    )
+    registry = FetcherRegistry({})
+    registry.register("fake", OptionsFetcher)
+    registry.load_config(str(path))
+    monkeypatch.setattr(registry_module, "_registry", registry)
+
+    fanes = get_fetcher(FANES)
+    assert isinstance(fanes, OptionsFetcher)
+    assert fanes.options == {"guest_counts": [2, 4, 6], "batch_details": True}
+
+    lavaredo = get_fetcher(LAVAREDO)
+    assert isinstance(lavaredo, OptionsFetcher)
+    assert lavaredo.options == {
+        "guest_counts": [1, 2, 3],
+        "batch_details": True,
+    }
+
+    # Options that are passed to the fetcher take precedence.
+    fanes = get_fetcher(FANES, guest_counts=[8])
+    assert isinstance(fanes, OptionsFetcher)
+    assert fanes.options["guest_counts"] == [8]
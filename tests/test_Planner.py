@@ -0,0 +1,69 @@
+import datetime
+
+import pytest
+
+from avplanner.AvailabilityFetcher import Result
+from avplanner.Hut import Hut, Stage
+from avplanner.Planner import Planner
+from avplanner.ResultSeries import ResultSeries
+
+START = datetime.date(2025, 7, 1)
+
+
+def _day(offset: int) -> datetime.date:
+    return START + datetime.timedelta(days=offset)
+
+
+def _dormitory(num_beds: int) -> Result:
+    # Like fetchers that report rooms by name.
+    rooms: dict = {"Dormitory": num_beds}
+    return Result({"num_available": num_beds, "rooms": rooms})
+
+
+STAGES = [
+    Stage("Stage 1", [Hut("Biella", "planyo", ""), Hut("Sennes", "bst", "")]),
+    Stage("Stage 2", [Hut("Fanes", "bst", "")]),
+]
+
+AVAILABILITY = {
+    # Rooms reported by name: only the number of beds is known.
+    "Biella": {
+        _day(0): _dormitory(4),
+        _day(1): _dormitory(2),
+    },
+    # Rooms reported by size: beds left in partially booked rooms are not
+    # offered, so the rooms hold fewer guests than the number of beds.
+    "Sennes": {
+        _day(0): Result({"num_available": 5, "rooms": {2: 1}}),
+        _day(1): Result({"num_available": 6, "rooms": {2: 1, 4: 1}}),
+    },
+    # No room details, e.g., from the history.
+    "Fanes": {
+        _day(1): Result({"num_available": 3, "rooms": {}}),
+        _day(2): Result({"num_available": 4, "rooms": {}}),
+    },
+}
+
+
+@pytest.mark.parametrize("packed", [False, True])
+def test_plan_uses_rooms_when_present(packed):
+    availability = AVAILABILITY
+    if packed:
+        availability = {
+            name: ResultSeries.from_results(results)
+            for name, results in AVAILABILITY.items()
+        }
+
+    planner = Planner(STAGES, availability)
+    # Sennes has five free beds on the first night, but only a double room.
+    plans = planner.plan(START, _day(1), 3)
+    assert [(plan.start, plan.options) for plan in plans] == [
+        (_day(0), [["Biella"], ["Fanes"]]),
+        (_day(1), [["Sennes"], ["Fanes"]]),
+    ]
+
+    plans = planner.plan(START, _day(1), 4)
+    assert [(plan.start, plan.options) for plan in plans] == [
+        (_day(1), [["Sennes"], ["Fanes"]]),
+    ]
+    assert planner.plan(START, _day(1), 5) == []
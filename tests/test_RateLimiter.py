@@ -0,0 +1,82 @@
+import asyncio
+import time
+
+import pytest
+
+from avplanner.Metrics import get_metrics, hut_label
+from avplanner.RateLimiter import RateLimiter, rate_limited
+
+
+def test_sliding_window():
+    limiter = RateLimiter(2, 0.2)
+    tic = time.perf_counter()
+    waits = [limiter.acquire() for _ in range(5)]
+    elapsed = time.perf_counter() - tic
+
+    # Two calls per window: the third and fifth call wait a full period,
+    # and the fourth shares the window of the third.
+    assert waits[:2] == [0, 0]
+    assert waits[2] == pytest.approx(0.2, abs=0.02)
+    assert waits[3] == pytest.approx(0, abs=0.02)
+    assert waits[4] == pytest.approx(0.2, abs=0.02)
+    assert elapsed == pytest.approx(0.4, abs=0.05)
+
+
+def test_window_slides_after_period():
+    limiter = RateLimiter(1, 0.1)
+    limiter.acquire()
+    time.sleep(0.1)
+    assert limiter.acquire() == 0
+
+
+def test_cancelled_waiters_release_their_slots():
+    limiter = RateLimiter(1, 0.2)
+
+    async def main() -> float:
+        await limiter.acquire_async()
+        waiters = [
+            asyncio.create_task(limiter.acquire_async()) for _ in range(10)
+        ]
+        await asyncio.sleep(0)
+        for waiter in waiters:
+            waiter.cancel()
+
+        await asyncio.gather(*waiters, return_exceptions=True)
+        return await limiter.acquire_async()
+
+    # Only the call before the cancelled waiters still counts.
+    assert asyncio.run(main()) == pytest.approx(0.2, abs=0.02)
+    assert len(limiter.timestamps) == 2
+    assert limiter.waited == pytest.approx(0.2, abs=0.02)
+
+
+class Client:
+    def __init__(self):
+        self._rate_limiters = {"api": RateLimiter(1, 0.1)}
+
+    @rate_limited("api", "test.resources")
+    def get_resources(self):
+        get_metrics().record_request("test.resources", 0.01, status=200)
+
+    @rate_limited("api", "test.usage")
+    async def aget_usage(self):
+        get_metrics().record_request("test.usage", 0.01, status=200)
+
+
+def test_waits_are_recorded_under_the_endpoint_of_the_requests():
+    client = Client()
+    with hut_label("Rate limited hut"):
+        client.get_resources()
+        client.get_resources()
+        asyncio.run(client.aget_usage())
+
+    stats = {
+        endpoint: stats
+        for (hut, endpoint), stats in get_metrics().stats().items()
+        if hut == "Rate limited hut"
+    }
+    assert sorted(stats) == ["test.resources", "test.usage"]
+    assert stats["test.resources"].num_requests == 2
+    assert stats["test.resources"].wait_time == pytest.approx(0.1, abs=0.02)
+    assert stats["test.usage"].num_requests == 1
+    assert stats["test.usage"].wait_time == pytest.approx(0.1, abs=0.02)
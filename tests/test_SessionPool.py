@@ -0,0 +1,45 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from avplanner.SessionPool import SessionPool
+
+
+class _FailingHandler(BaseHTTPRequestHandler):
+    server: "_CountingServer"
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        self.server.num_requests += 1
+        self.send_response(500)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, format, *args):
+        pass
+
+
+class _CountingServer(ThreadingHTTPServer):
+    num_requests = 0
+
+
+@pytest.fixture
+def server():
+    server = _CountingServer(("127.0.0.1", 0), _FailingHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.mark.parametrize("retry, expected", [(True, 3), (False, 1)])
+def test_post_retries(server, retry: bool, expected: int):
+    pool = SessionPool(retries=2, backoff_factor=0)
+    url = f"http://127.0.0.1:{server.server_port}/hook"
+    response = pool.request("POST", url, retry=retry, json={"a": 1})
+    pool.close()
+
+    assert response.status_code == 500
+    assert server.num_requests == expected
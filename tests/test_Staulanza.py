@@ -0,0 +1,123 @@
+import asyncio
+import datetime
+import json
+import os
+
+import pytest
+
+from avplanner.RangePlanner import RangePlanner
+from avplanner.Staulanza import (
+    MAX_ROOMS,
+    APIClient,
+    Staulanza,
+    _probe_rooms,
+    _search_rooms,
+)
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures")
+
+
+def _load_rooms() -> dict[str, dict[int, dict[str, int]]]:
+    """
+    Loads the rooms offered per number of guests of a booking page, as
+    parsed from the detail pages.
+    """
+    path = os.path.join(FIXTURES, "staulanza_rooms.json")
+    with open(path, "r") as fh:
+        data = json.load(fh)
+
+    return {
+        case: {int(count): rooms for count, rooms in offers.items()}
+        for case, offers in data.items()
+    }
+
+
+def _search(offers: dict[int, dict[str, int]], search) -> tuple[dict, list]:
+    probes = []
+
+    async def probe(num_guests: int) -> dict:
+        probes.append(num_guests)
+        return offers.get(num_guests, {})
+
+    return asyncio.run(search(probe, MAX_ROOMS)), probes
+
+
+@pytest.mark.parametrize(
+    "case", ["nested", "larger_parties", "between_probes"]
+)
+def test_search_rooms_matches_probing_every_guest_count(case: str):
+    offers = _load_rooms()[case]
+    expected, _ = _search(offers, _probe_rooms)
+    assert expected == {
+        room: free for rooms in offers.values() for room, free in rooms.items()
+    }
+
+    result, _ = _search(offers, _search_rooms)
+    assert result == expected
+
+
+def test_search_rooms_probes_guest_counts_between_searches():
+    # The triple room is only offered for three guests, which neither the
+    # galloping nor the binary search probes.
+    offers = _load_rooms()["between_probes"]
+    result, probes = _search(offers, _search_rooms)
+    assert result == {"Camera doppia": 2, "Camera tripla": 1}
+    assert sorted(probes) == [1, 2, 3, 4, 5, 6, 8]
+
+
+def test_search_rooms_probes_smaller_guest_counts_concurrently():
+    offers = _load_rooms()["nested"]
+    in_flight = 0
+    most_in_flight = 0
+
+    async def probe(num_guests: int) -> dict:
+        nonlocal in_flight, most_in_flight
+        in_flight += 1
+        most_in_flight = max(most_in_flight, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return offers.get(num_guests, {})
+
+    result = asyncio.run(_search_rooms(probe, MAX_ROOMS))
+    assert result == {
+        "Camera doppia": 2,
+        "Camera quadrupla": 1,
+        "Dormitorio": 6,
+    }
+    # One, two, four and eight guests are probed by the galloping search.
+    assert most_in_flight == 4
+
+
+def test_search_rooms_without_offers():
+    result, probes = _search({}, _search_rooms)
+    assert result == {}
+    assert probes == [1]
+
+
+def test_failed_month_is_unknown(monkeypatch):
+    async def aget_month_availability(self, date):
+        return None if date.month == 8 else [date.replace(day=2)]
+
+    async def aget_detailed_availability(self, date, num_guests=1):
+        return {"Dormitorio": 3} if num_guests == 1 else {}
+
+    monkeypatch.setattr(
+        APIClient, "aget_month_availability", aget_month_availability
+    )
+    monkeypatch.setattr(
+        APIClient, "aget_detailed_availability", aget_detailed_availability
+    )
+    monkeypatch.setattr(
+        "avplanner.RangePlanner._range_planner", RangePlanner()
+    )
+    fetcher = Staulanza("https://www.example.it/disponibilita.php")
+
+    dates = [datetime.date(2025, 7, 2), datetime.date(2025, 7, 3)]
+    dates += [datetime.date(2025, 8, 2)]
+    available = asyncio.run(fetcher.aget_available_dates(dates))
+    assert available == {dates[0]: True, dates[1]: False}
+
+    results = fetcher.get_availability(dates[0], dates[-1])
+    assert results[dates[0]]["rooms"] == {"Dormitorio": 3}
+    assert results[dates[1]]["num_available"] == 0
+    assert not any(date.month == 8 for date in results)
@@ -0,0 +1,206 @@
+import datetime
+
+import pytest
+
+from avplanner.Checkpoint import Checkpoint
+from avplanner.Storage import (
+    Availability,
+    CSVStorage,
+    ChangeLogStorage,
+    open_storage,
+)
+
+FIRST = datetime.datetime(2025, 6, 1, 6, 30)
+SECOND = datetime.datetime(2025, 6, 2, 6, 30)
+THIRD = datetime.datetime(2025, 6, 3, 6, 30, 15)
+DATES = [datetime.date(2025, 7, day) for day in (1, 2, 3)]
+
+
+def _records(fetch_datetime: datetime.datetime, **changes) -> list:
+    """
+    Returns the records of two huts fetched at the given datetime. The number
+    of free places of Lagazuòi on July 2nd can be changed.
+    """
+    lagazuoi = changes.get("lagazuoi", 4)
+    return [
+        Availability(
+            "Rifugio Lagazuòi",
+            fetch_datetime,
+            DATES[0],
+            0,
+            {},
+        ),
+        Availability(
+            "Rifugio Lagazuòi",
+            fetch_datetime,
+            DATES[1],
+            lagazuoi,
+            {7: lagazuoi} if lagazuoi else {},
+        ),
+        Availability(
+            "Rifugio Staulanza",
+            fetch_datetime,
+            DATES[0],
+            3,
+            {12: 1, 14: 0},
+        ),
+        Availability(
+            "Rifugio Staulanza",
+            fetch_datetime,
+            DATES[2],
+            6,
+            {12: 3},
+        ),
+    ]
+
+
+def test_csv_sqlite_csv_round_trip(tmp_path):
+    records = _records(FIRST) + _records(SECOND, lagazuoi=2)
+    source = CSVStorage(str(tmp_path / "daily.csv"))
+    source.write(records)
+
+    sqlite = open_storage(str(tmp_path / "daily.sqlite"))
+    sqlite.write(source.read())
+    sqlite.close()
+
+    target = open_storage(str(tmp_path / "copy.csv"))
+    target.write(open_storage(str(tmp_path / "daily.sqlite")).read())
+
+    assert list(target.read()) == list(source.read())
+    assert (tmp_path / "copy.csv").read_text() == (
+        tmp_path / "daily.csv"
+    ).read_text()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".sqlite"])
+def test_read_filters(tmp_path, suffix):
+    storage = open_storage(str(tmp_path / f"daily{suffix}"))
+    storage.write(_records(FIRST))
+
+    staulanza = list(storage.read(hut_name="Rifugio Staulanza"))
+    assert [record.booking_date for record in staulanza] == [
+        DATES[0],
+        DATES[2],
+    ]
+    assert staulanza[0].rooms == {12: 1, 14: 0}
+
+    dates = [
+        record.booking_date
+        for record in storage.read(start=DATES[1], end=DATES[1])
+    ]
+    assert dates == [DATES[1]]
+    storage.close()
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".sqlite"])
+def test_change_log_state_at(tmp_path, suffix):
+    path = str(tmp_path / f"daily{suffix}")
+    storage = open_storage(path, changes_only=True)
+    assert isinstance(storage, ChangeLogStorage)
+    storage.write(_records(FIRST))
+    storage.write(_records(SECOND, lagazuoi=2))
+    storage.write(_records(THIRD, lagazuoi=0))
+    storage.close()
+
+    # Only the first snapshot and the two changes are stored.
+    changes = ChangeLogStorage(open_storage(path))
+    assert len(list(changes.read())) == 6
+
+    for fetch_datetime, lagazuoi in [
+        (FIRST, 4),
+        (SECOND, 2),
+        (THIRD, 0),
+        (THIRD + datetime.timedelta(days=1), 0),
+    ]:
+        state = changes.state_at(fetch_datetime)
+        expected = _records(fetch_datetime, lagazuoi=lagazuoi)
+        assert sorted(state) == sorted(
+            (record.hut_name, record.booking_date) for record in expected
+        )
+        for record in expected:
+            stored = state[record.hut_name, record.booking_date]
+            assert stored.num_available == record.num_available
+            assert stored.rooms == record.rooms
+
+    # Unchanged dates keep the record of their first fetch.
+    state = changes.state_at(THIRD)
+    assert state["Rifugio Staulanza", DATES[0]].fetch_datetime == FIRST
+    assert state["Rifugio Lagazuòi", DATES[1]].fetch_datetime == THIRD
+
+    assert changes.state_at(FIRST - datetime.timedelta(seconds=1)) == {}
+    assert sorted(
+        changes.state_at(SECOND, hut_name="Rifugio Staulanza", end=DATES[1])
+    ) == [("Rifugio Staulanza", DATES[0])]
+
+
+def test_fetch_log_last_fetched(tmp_path):
+    path = str(tmp_path / "daily.csv")
+    storage = open_storage(path, changes_only=True)
+    assert isinstance(storage, ChangeLogStorage)
+    storage.write(_records(FIRST))
+    storage.write(_records(SECOND)[:2])
+    storage.close()
+
+    reopened = open_storage(path, changes_only=True)
+    assert isinstance(reopened, ChangeLogStorage)
+    assert reopened.last_fetched() == {
+        ("Rifugio Lagazuòi", DATES[0]): SECOND,
+        ("Rifugio Lagazuòi", DATES[1]): SECOND,
+        ("Rifugio Staulanza", DATES[0]): FIRST,
+        ("Rifugio Staulanza", DATES[2]): FIRST,
+    }
+
+    # Without the fetch log only the last changes are known.
+    (tmp_path / "daily.csv.fetches.csv").unlink()
+    without_log = open_storage(path, changes_only=True)
+    assert isinstance(without_log, ChangeLogStorage)
+    assert set(without_log.last_fetched().values()) == {FIRST}
+
+
+def test_fetch_log_is_kept_when_nothing_was_written(tmp_path):
+    path = str(tmp_path / "daily.csv")
+    storage = open_storage(path, changes_only=True)
+    storage.write(_records(FIRST))
+    storage.close()
+    log = (tmp_path / "daily.csv.fetches.csv").read_text()
+
+    open_storage(path, changes_only=True).close()
+    assert (tmp_path / "daily.csv.fetches.csv").read_text() == log
+
+
+def test_checkpoint_resume(tmp_path):
+    out = str(tmp_path / "daily.csv")
+    checkpoint = Checkpoint.for_run(out, "nightly")
+    fetch_datetime = checkpoint.fetch_datetime
+    checkpoint.mark_done("Rifugio Lagazuòi", DATES[0], DATES[2])
+    assert len(checkpoint) == 1
+
+    resumed = Checkpoint.for_run(out, "nightly")
+    assert resumed.path == str(tmp_path / "daily.csv.nightly.checkpoint")
+    assert resumed.fetch_datetime == fetch_datetime
+    assert resumed.is_done("Rifugio Lagazuòi", DATES[0], DATES[2])
+    assert not resumed.is_done("Rifugio Lagazuòi", DATES[0], DATES[1])
+    assert not resumed.is_done("Rifugio Staulanza", DATES[0], DATES[2])
+
+    resumed.mark_done("Rifugio Staulanza", DATES[0], DATES[2])
+    assert len(Checkpoint.for_run(out, "nightly")) == 2
+    assert len(Checkpoint.for_run(out, "weekly")) == 0
+
+
+def test_checkpoint_skips_partially_written_line(tmp_path):
+    path = str(tmp_path / "run.checkpoint")
+    checkpoint = Checkpoint(path, FIRST)
+    checkpoint.mark_done("Rifugio Lagazuòi", DATES[0], DATES[0])
+
+    # A run that is killed while writing a line.
+    with open(path, "a") as fh:
+        fh.write('{"hut_name": "Rifugio Staul')
+
+    resumed = Checkpoint(path, SECOND)
+    assert resumed.fetch_datetime == FIRST
+    assert len(resumed) == 1
+
+    resumed.mark_done("Rifugio Staulanza", DATES[0], DATES[0])
+    again = Checkpoint(path)
+    assert again.is_done("Rifugio Lagazuòi", DATES[0], DATES[0])
+    assert again.is_done("Rifugio Staulanza", DATES[0], DATES[0])
@@ -0,0 +1,113 @@
+import asyncio
+import datetime
+import threading
+
+from avplanner.AvailabilityFetcher import AvailabilityFetcher, Result
+from avplanner.Watcher import Sink, WatchEvent, WatchItem, Watcher
+
+DATES = [datetime.date.today() + datetime.timedelta(days=i) for i in (1, 2)]
+
+
+class FakeFetcher(AvailabilityFetcher):
+    """
+    Reports the given free beds per date, and fails the calendar request
+    of the dates that are set to None.
+    """
+
+    def __init__(self, free: dict[datetime.date, int | None]):
+        self._booking_id = "fake"
+        self.free = free
+
+    async def aget_available_dates(self, dates, refresh=False):
+        return {
+            date: bool(self.free[date])
+            for date in dates
+            if self.free[date] is not None
+        }
+
+    async def aiter_availability(self, start, end, cache=None):
+        for date, num in self.free.items():
+            if num is not None and start <= date <= end:
+                yield date, Result({"num_available": num, "rooms": {}})
+
+
+class ListSink(Sink):
+    def __init__(self, blocking: bool = False):
+        self.blocking = blocking
+        self.events: list[WatchEvent] = []
+        self.threads: set[int] = set()
+
+    def emit(self, event: WatchEvent):
+        self.threads.add(threading.get_ident())
+        self.events.append(event)
+
+
+def test_failed_dates_are_not_reported_as_sold_out():
+    fetcher = FakeFetcher({DATES[0]: 2, DATES[1]: 3})
+    sink = ListSink()
+    items = [WatchItem("Hut", date, 2) for date in DATES]
+    watcher = Watcher({"Hut": fetcher}, items, [sink])
+
+    asyncio.run(watcher.apoll("Hut"))
+    assert [event.available for event in sink.events] == [True, True]
+
+    # The calendar request of the second date fails.
+    fetcher.free = {DATES[0]: 0, DATES[1]: None}
+    asyncio.run(watcher.apoll("Hut"))
+    assert len(sink.events) == 3
+    assert sink.events[-1].date == DATES[0]
+    assert not sink.events[-1].available
+
+    # The second date is still available once it is covered again.
+    fetcher.free = {DATES[0]: 0, DATES[1]: 3}
+    asyncio.run(watcher.apoll("Hut"))
+    assert len(sink.events) == 3
+
+
+def test_blocking_sinks_emit_from_worker_threads():
+    fetcher = FakeFetcher({DATES[0]: 2, DATES[1]: 0})
+    sink = ListSink()
+    blocking = ListSink(blocking=True)
+    items = [WatchItem("Hut", date) for date in DATES]
+    watcher = Watcher({"Hut": fetcher}, items, [sink, blocking])
+
+    asyncio.run(watcher.apoll("Hut"))
+    assert len(blocking.events) == 2
+    assert sink.threads == {threading.get_ident()}
+    assert threading.get_ident() not in blocking.threads
+
+
+class DetailsOnlyFetcher(AvailabilityFetcher):
+    """
+    Has no calendar endpoint, and only reports the full availability of the
+    dates it is asked for.
+    """
+
+    def __init__(self, free: dict[datetime.date, int]):
+        self._booking_id = "details"
+        self.free = free
+        self.fetched: list[datetime.date] = []
+
+    async def aiter_availability(self, start, end, cache=None):
+        for date, num in self.free.items():
+            if start <= date <= end and date not in (cache or {}):
+                self.fetched.append(date)
+                yield date, Result({"num_available": num, "rooms": {}})
+
+
+def test_available_dates_default_to_the_fetched_availability():
+    first, last = DATES[0], DATES[0] + datetime.timedelta(days=2)
+    fetcher = DetailsOnlyFetcher({first: 0, DATES[1]: 4, last: 2})
+
+    available = asyncio.run(fetcher.aget_available_dates([first, last]))
+    assert available == {first: False, last: True}
+    assert fetcher.fetched == [first, last]
+
+    sink = ListSink()
+    items = [WatchItem("Hut", date, 2) for date in (first, last)]
+    watcher = Watcher({"Hut": fetcher}, items, [sink])
+    asyncio.run(watcher.apoll("Hut"))
+    assert [(event.date, event.available) for event in sink.events] == [
+        (first, False),
+        (last, True),
+    ]
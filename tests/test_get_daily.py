@@ -0,0 +1,188 @@
+import asyncio
+import datetime
+import time
+
+import get_daily
+import pytest
+
+from avplanner.AvailabilityFetcher import AvailabilityFetcher, Result
+from avplanner.Checkpoint import Checkpoint
+from avplanner.Hut import Hut
+from avplanner.Storage import Availability, CSVStorage, Storage
+from avplanner.utils import date_range
+
+START = datetime.date(2025, 7, 1)
+END = datetime.date(2025, 7, 6)
+
+
+class FakeFetcher(AvailabilityFetcher):
+    """
+    Yields the dates in reverse order (or in order) after a delay per date,
+    and raises or stalls on the given date.
+    """
+
+    def __init__(
+        self,
+        booking_id: str,
+        delay: float = 0,
+        fail_on: datetime.date | None = None,
+        stall_on: datetime.date | None = None,
+        in_order: bool = False,
+    ):
+        self._booking_id = booking_id
+        self.delay = delay
+        self.fail_on = fail_on
+        self.stall_on = stall_on
+        self.in_order = in_order
+
+    async def aiter_availability(self, start, end, cache=None):
+        dates = date_range(start, end)
+        for date in dates if self.in_order else reversed(dates):
+            if date == self.fail_on:
+                raise ValueError("Broken page.")
+
+            if date == self.stall_on:
+                # Blocks the worker like a request that hangs.
+                time.sleep(2)
+
+            await asyncio.sleep(self.delay)
+            yield date, Result({"num_available": date.day, "rooms": {}})
+
+
+class ListStorage(Storage):
+    def __init__(self):
+        self.records: list[Availability] = []
+        self.num_writes = 0
+
+    def write(self, availabilities):
+        self.records.extend(availabilities)
+        self.num_writes += 1
+
+    def read(self, hut_name=None, start=None, end=None):
+        yield from self.records
+
+
+def _run(
+    monkeypatch,
+    fetchers: dict[str, FakeFetcher],
+    storage: ListStorage | None = None,
+    **kwargs,
+):
+    huts = [Hut(name, "fake", name) for name in fetchers]
+    monkeypatch.setattr(get_daily, "load_huts", lambda: huts)
+    monkeypatch.setattr(
+        get_daily, "get_fetcher", lambda hut: fetchers[hut.name]
+    )
+
+    storage = storage if storage is not None else ListStorage()
+    num_records = get_daily.get_daily(START, END, storage, **kwargs)
+    assert num_records == len(storage.records)
+    return [
+        (record.hut_name, record.booking_date) for record in storage.records
+    ]
+
+
+@pytest.mark.parametrize("workers", [1, 3])
+def test_records_are_written_in_unit_and_date_order(monkeypatch, workers):
+    fetchers = {
+        "Slow": FakeFetcher("slow", delay=0.01),
+        "Fast": FakeFetcher("fast"),
+    }
+    rows = _run(monkeypatch, fetchers, workers=workers, chunk_days=4)
+    dates = date_range(START, END)
+    assert rows == [("Slow", date) for date in dates] + [
+        ("Fast", date) for date in dates
+    ]
+
+
+def test_dates_are_written_as_soon_as_they_are_in_order(monkeypatch):
+    storage = ListStorage()
+    fetchers = {
+        "Ordered": FakeFetcher("ordered", in_order=True),
+        "Reversed": FakeFetcher("reversed"),
+    }
+    rows = _run(monkeypatch, fetchers, storage)
+    dates = date_range(START, END)
+    assert rows == [("Ordered", date) for date in dates] + [
+        ("Reversed", date) for date in dates
+    ]
+    # One write per date of the ordered unit; the reversed unit is only in
+    # order once its first date arrived last.
+    assert storage.num_writes == len(dates) + 1
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_failed_units_do_not_stop_the_crawl(monkeypatch, capsys, workers):
+    fetchers = {
+        "Broken": FakeFetcher("broken", fail_on=datetime.date(2025, 7, 4)),
+        "Fine": FakeFetcher("fine"),
+    }
+    rows = _run(monkeypatch, fetchers, workers=workers)
+    # The dates before the error are still written.
+    assert rows == [
+        ("Broken", datetime.date(2025, 7, 5)),
+        ("Broken", datetime.date(2025, 7, 6)),
+    ] + [("Fine", date) for date in date_range(START, END)]
+    assert "Failed Broken (fake): Broken page." in capsys.readouterr().out
+
+
+def test_timeout_is_enforced_while_a_request_hangs(monkeypatch, capsys):
+    fetchers = {
+        "Stalled": FakeFetcher("stalled", stall_on=datetime.date(2025, 7, 4)),
+        "Fine": FakeFetcher("fine"),
+    }
+    tic = time.monotonic()
+    rows = _run(monkeypatch, fetchers, workers=2, timeout=0.5)
+    assert time.monotonic() - tic < 1.5
+
+    assert rows == [
+        ("Stalled", datetime.date(2025, 7, 5)),
+        ("Stalled", datetime.date(2025, 7, 6)),
+    ] + [("Fine", date) for date in date_range(START, END)]
+    assert "Timed out Stalled (fake)." in capsys.readouterr().out
+
+
+def test_resumed_run_writes_the_same_records(monkeypatch, tmp_path):
+    def run(fetchers, checkpoint):
+        huts = [Hut(name, "fake", name) for name in fetchers]
+        monkeypatch.setattr(get_daily, "load_huts", lambda: huts)
+        monkeypatch.setattr(
+            get_daily, "get_fetcher", lambda hut: fetchers[hut.name]
+        )
+        get_daily.get_daily(
+            START, END, storage, checkpoint=checkpoint, chunk_days=3
+        )
+
+    out = str(tmp_path / "daily.csv")
+    storage = CSVStorage(out)
+
+    # The first run is interrupted in the second unit of the first hut.
+    run(
+        {
+            "First": FakeFetcher("first", fail_on=datetime.date(2025, 7, 5)),
+            "Second": FakeFetcher("second"),
+        },
+        Checkpoint.for_run(out, "run"),
+    )
+    checkpoint = Checkpoint.for_run(out, "run")
+    assert len(checkpoint) == 3
+    assert not checkpoint.is_done("First", datetime.date(2025, 7, 4), END)
+
+    run(
+        {"First": FakeFetcher("first"), "Second": FakeFetcher("second")},
+        checkpoint,
+    )
+    assert len(Checkpoint.for_run(out, "run")) == 4
+
+    # The dates of the failed unit that were written before are written
+    # again, with the same fetch datetime.
+    records = list(storage.read())
+    assert {record.fetch_datetime for record in records} == {
+        checkpoint.fetch_datetime
+    }
+    assert sorted({(r.hut_name, r.booking_date) for r in records}) == sorted(
+        (name, date)
+        for name in ("First", "Second")
+        for date in date_range(START, END)
+    )
+    assert len(records) == 12 + 1
@@ -0,0 +1,97 @@
+import datetime
+import random
+
+import crawl
+import pytest
+from crawl import _ParseTimer
+from standin import _render_bookingsuedtirol
+
+from avplanner.Hut import Hut
+from avplanner.utils import date_range
+
+# Future dates across a month boundary, as the fetchers only crawl ahead.
+START = datetime.date.today().replace(day=1) + datetime.timedelta(days=40)
+END = START + datetime.timedelta(days=44)
+
+HUTS = {
+    "bookingsuedtirol": Hut("Test Suedtirol", "bookingsuedtirol", "90001"),
+    "bulky": Hut("Test Bulky", "bulky", "testbulky"),
+    "staulanza": Hut(
+        "Test Staulanza",
+        "staulanza",
+        "https://www.teststaulanza.it/Booking/EN/disponibilita.php",
+    ),
+}
+
+# Room keys as recorded by each fetcher: sizes, or names.
+ROOM_KEYS: dict[str, list[int] | list[str]] = {
+    "bookingsuedtirol": [2, 4, 6],
+    "bulky": [1, 2, 3, 5],
+    "staulanza": ["Camera doppia", "Camera quadrupla", "Dormitorio"],
+}
+
+
+def _random_state(booking_type: str, seed: int = 0):
+    """
+    Returns random rooms of each date, with some sold-out dates.
+    """
+    rng = random.Random(seed)
+    state = {}
+    for date in date_range(START, END):
+        rooms = {}
+        if rng.random() > 0.2:
+            for key in ROOM_KEYS[booking_type]:
+                if rng.random() > 0.4:
+                    rooms[key] = rng.randint(1, 8)
+
+        state[date] = rooms
+
+    return {HUTS[booking_type].name: state}
+
+
+@pytest.mark.parametrize("booking_type", crawl.BOOKING_TYPES)
+def test_fetchers_match_standin(booking_type: str):
+    hut = HUTS[booking_type]
+    state = _random_state(booking_type)
+    [measurement] = crawl.run_season(
+        [hut],
+        START,
+        END,
+        _ParseTimer(),
+        speedup=100,
+        latency=0,
+        rate_limit=None,
+        state=state,
+    )
+
+    assert measurement.num_dates == len(date_range(START, END))
+    assert measurement.num_requests > 0
+    assert measurement.num_mismatches == 0
+
+
+def test_bookingsuedtirol_rooms_above_single_occupancy():
+    hut = HUTS["bookingsuedtirol"]
+    # No room is offered to a single guest.
+    state = {
+        hut.name: {
+            date: {4: 1, 6: 2} if date.day % 3 else {6: 1}
+            for date in date_range(START, END)
+        }
+    }
+    rooms = _render_bookingsuedtirol(state[hut.name], "rooms", {})
+    assert [room["occupancy"] for room in rooms] == [
+        {"min": 2, "max": 4},
+        {"min": 3, "max": 6},
+    ]
+
+    [measurement] = crawl.run_season(
+        [hut],
+        START,
+        END,
+        _ParseTimer(),
+        speedup=100,
+        latency=0,
+        rate_limit=None,
+        state=state,
+    )
+    assert measurement.num_mismatches == 0